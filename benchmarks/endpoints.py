@@ -0,0 +1,230 @@
+# endpoints.py
+"""
+Throughput and latency of every router of http_server/http.py, plus the statements behind them.
+
+    python benchmarks/endpoints.py [--rows 10k] [--requests 200] [--concurrency 8]
+                                   [--baseline FILE] [--compare FILE] [--tolerance 0.5]
+
+Fills a throwaway database with generate_data.generate (same rows and seed -> same data), then
+sends --requests requests per endpoint through an in-process ASGI client, --concurrency at a
+time, and calls the statement functions directly. Prints req/s, p50 and p99 for each and writes
+them to --baseline as JSON. With --compare, every endpoint whose p50 got more than --tolerance
+slower than in an earlier baseline is listed and the exit code is 1, so CI-sized runs catch
+regressions. Read endpoints run first: the writes at the end invalidate the caches.
+
+bcrypt runs with 4 rounds unless ERP_BCRYPT_ROUNDS says otherwise, the login timing is about the
+route, not the cost factor.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("ERP_BCRYPT_ROUNDS", "4")
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+import database  # noqa: E402
+from generate_data import generate, parse_rows  # noqa: E402
+from http_server.http import api_router  # noqa: E402
+
+# (name, method, path, body) builders, called with a random.Random and the rows per table
+Endpoint = tuple[str, str, Callable[[random.Random, int], str], Callable[[random.Random, int], dict] | None]
+
+
+def _read(name: str, path: Callable[[random.Random, int], str]) -> Endpoint:
+    return name, "GET", path, None
+
+
+def _page(rng: random.Random, rows: int) -> str:
+    return f"page={rng.randint(0, max(0, rows // 50 - 1))}-50"
+
+
+READS: list[Endpoint] = [
+    _read("GET /login (verify token)", lambda rng, rows: "/login"),
+]
+for table in ("users", "centers", "stocks", "suppliers", "products", "transactions"):
+    READS += [
+        _read(f"GET /{table}?page", lambda rng, rows, t=table: f"/{t}?{_page(rng, rows)}"),
+        _read(f"GET /{table}?after", lambda rng, rows, t=table: f"/{t}?after={rng.randint(0, rows)}&page=0-50"),
+        _read(f"GET /{table}/{{id}}",
+              lambda rng, rows, t=table: f"/{t}/{rng.randint(1, 50 if t == 'users' else rows)}"),
+    ]
+READS += [
+    _read("GET /centers?filter", lambda rng, rows: f"/centers?filter=Center-{rng.randint(0, rows)}&page=0-50"),
+    _read("GET /stocks?filter", lambda rng, rows: f"/stocks?filter={rng.choice(['Oran', 'Blida'])}&page=0-50"),
+    _read("GET /suppliers?filter", lambda rng, rows: f"/suppliers?filter={rng.choice(['Ali', 'Sara'])}&page=0-50"),
+    _read("GET /products?filter", lambda rng, rows: f"/products?filter={rng.choice(['Milk', 'Tea'])}&page=0-50"),
+    _read("GET /suppliers/consumers", lambda rng, rows: f"/suppliers/consumers?{_page(rng, rows // 3)}"),
+    _read("GET /suppliers/providers", lambda rng, rows: f"/suppliers/providers?{_page(rng, rows // 3)}"),
+    _read("GET /transactions/incomes", lambda rng, rows: f"/transactions/incomes?{_page(rng, rows // 2)}"),
+    _read("GET /transactions/outcomes", lambda rng, rows: f"/transactions/outcomes?{_page(rng, rows // 2)}"),
+    _read("GET /products?ids", lambda rng, rows: "/products?ids=" + ",".join(str(rng.randint(1, rows))
+                                                                             for _ in range(50))),
+    _read("GET /transactions?expand", lambda rng, rows: f"/transactions?expand=product,supplier&{_page(rng, rows)}"),
+    _read("GET /transactions?filter&expand",
+          lambda rng, rows: f"/transactions?filter={rng.choice(['Milk', 'Tea'])}&expand=product&page=0-50"),
+    _read("GET /transactions/summary", lambda rng, rows: "/transactions/summary?group_by=month"),
+    _read("GET /stocks/inventory", lambda rng, rows: f"/stocks/inventory?center_id={rng.randint(1, rows)}"),
+    _read("GET /stocks/{id}/inventory", lambda rng, rows: f"/stocks/{rng.randint(1, rows)}/inventory"),
+    _read("GET /centers/{id}/inventory", lambda rng, rows: f"/centers/{rng.randint(1, rows)}/inventory"),
+]
+
+WRITES: list[Endpoint] = [
+    ("POST /login", "POST", lambda rng, rows: "/login",
+     lambda rng, rows: {"username": f"user{rng.randint(2, 50)}", "password": "password"}),
+    ("POST /centers", "POST", lambda rng, rows: "/centers",
+     lambda rng, rows: {"name": f"Bench center {rng.random()}", "city": "Oran", "address": "Street 1"}),
+    ("PUT /products", "PUT", lambda rng, rows: "/products",
+     lambda rng, rows: {"id": rng.randint(1, rows), "name": f"Product {rng.random()}", "stock_id": 1,
+                        "quantity": 0, "expiration_date": "2027-01-01T00:00:00", "purchase_price": 10,
+                        "sale_price": 12}),
+    ("POST /transactions", "POST", lambda rng, rows: "/transactions",
+     lambda rng, rows: {"supplier_id": rng.randint(1, rows), "date": "2026-01-01T12:00:00",
+                        "product_id": rng.randint(1, rows), "type": -1, "price": 10, "quantity": 1}),
+]
+
+# Statements timed without HTTP: what the database costs on its own
+STATEMENTS: list[tuple[str, Callable[[random.Random, int], object]]] = [
+    ("list_products page", lambda rng, rows: database.list_products(rng.randint(0, max(0, rows - 50)), 50)),
+    ("list_products page as_json", lambda rng, rows: database.list_products(rng.randint(0, max(0, rows - 50)), 50,
+                                                                            as_json=True)),
+    ("list_products filter", lambda rng, rows: database.list_products(0, 50, rng.choice(["Milk", "Tea"]))),
+    ("list_transactions keyset", lambda rng, rows: database.list_transactions(0, 50, after=rng.randint(0, rows))),
+    ("get_product", lambda rng, rows: database.get_product(rng.randint(1, rows))),
+    ("get_transaction", lambda rng, rows: database.get_transaction(rng.randint(1, rows))),
+    ("get_products 50 ids", lambda rng, rows: database.get_products([rng.randint(1, rows) for _ in range(50)])),
+    ("summarize_transactions month", lambda rng, rows: database.summarize_transactions("month")),
+    ("list_stock_inventory center", lambda rng, rows: database.list_stock_inventory(rng.randint(1, rows))),
+]
+
+
+def summary(latencies: list[float], elapsed: float, errors: int) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 3),
+    }
+
+
+async def run_endpoint(client: httpx.AsyncClient, endpoint: Endpoint, rows: int, seed: int, requests: int,
+                       concurrency: int) -> dict:
+    name, method, path, body = endpoint
+    rng = random.Random(f"{seed}-{name}")
+    calls = [(path(rng, rows), body(rng, rows) if body else None) for _ in range(requests)]
+    latencies: list[float] = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while calls:
+            url, payload = calls.pop()
+            started = time.perf_counter()
+            response = await client.request(method, url, json=payload)
+            latencies.append(time.perf_counter() - started)
+            # A random id may well have nothing behind it (a stock without products has no inventory)
+            errors += response.status_code >= 400 and response.status_code != 404
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summary(latencies, time.perf_counter() - started, errors)
+
+
+async def run_endpoints(rows: int, seed: int, requests: int, concurrency: int) -> dict[str, dict]:
+    app = FastAPI()
+    app.include_router(api_router)
+    results = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        login = await client.post("/login", json={"username": "Manager", "password": "123456789"})
+        client.headers["Authorization"] = login.json()["token"]
+        for endpoint in READS + WRITES:
+            await run_endpoint(client, endpoint, rows, seed + 1, min(requests, 10), concurrency)  # warm up
+            results[endpoint[0]] = await run_endpoint(client, endpoint, rows, seed, requests, concurrency)
+            print_result(endpoint[0], results[endpoint[0]])
+    return results
+
+
+def run_statements(rows: int, seed: int, requests: int) -> dict[str, dict]:
+    results = {}
+    for name, call in STATEMENTS:
+        rng = random.Random(f"{seed}-{name}")
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(requests):
+            t = time.perf_counter()
+            call(rng, rows)
+            latencies.append(time.perf_counter() - t)
+        results[f"sql {name}"] = summary(latencies, time.perf_counter() - started, 0)
+        print_result(f"sql {name}", results[f"sql {name}"])
+    return results
+
+
+def print_result(name: str, result: dict):
+    errors = f"  {result['errors']} errors" if result["errors"] else ""
+    print(f"  {name:<34} {result['rps']:9.1f} req/s  p50 {result['p50_ms']:8.2f} ms  "
+          f"p99 {result['p99_ms']:8.2f} ms{errors}")
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[str]:
+    """Names of the results whose p50 is more than `tolerance` (0.5 = 50%) above the baseline."""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before and result["p50_ms"] > before["p50_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p50 {before['p50_ms']:.2f} -> {result['p50_ms']:.2f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every endpoint and the statements behind them.")
+    parser.add_argument("--rows", type=parse_rows, default=10_000, help="rows per table (default 10k)")
+    parser.add_argument("--seed", type=int, default=42, help="data and request seed (default 42)")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint (default 200)")
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight (default 8)")
+    parser.add_argument("--baseline", default="benchmark-baseline.json",
+                        help="where to write the results (default benchmark-baseline.json)")
+    parser.add_argument("--compare", help="earlier results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="p50 slowdown reported as a regression (default 0.5 = 50%%)")
+    args = parser.parse_args()
+    baseline_path = Path(args.baseline).resolve()
+    compare_path = Path(args.compare).resolve() if args.compare else None
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # one line per request otherwise
+    os.chdir(tempfile.mkdtemp())
+    generate("bench.db", args.rows, args.seed)
+
+    print(f"{args.rows:,} rows per table, {args.requests} requests per endpoint, {args.concurrency} in flight")
+    results = run_statements(args.rows, args.seed, args.requests)
+    results.update(asyncio.run(run_endpoints(args.rows, args.seed, args.requests, args.concurrency)))
+    database.shutdown_executor()
+    database.shutdown_hash_pool()
+
+    baseline_path.write_text(json.dumps({"rows": args.rows, "seed": args.seed, "requests": args.requests,
+                                         "concurrency": args.concurrency, "results": results}, indent=2))
+    print(f"Results written to {baseline_path}")
+
+    if compare_path:
+        regressions = compare(results, json.loads(compare_path.read_text())["results"], args.tolerance)
+        for regression in regressions:
+            print(f"  REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regression")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# list_encoding.py
+"""
+Per-row cost of a list response, model path against the as_json fast path.
+
+    python benchmarks/list_encoding.py [rows] [repeat]
+
+Seeds a throwaway database with `rows` products, then times GET /products for one page of
+every row, through the real router. The model path is what the route did before (rows ->
+Product models -> response_model validation -> JSON); the fast path encodes the page from the
+rows directly. Both responses are checked to be identical.
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi import FastAPI, Depends  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from database import get_connection, init_db, write_connection  # noqa: E402
+from database import list_products  # noqa: E402
+from entities import HttpListResponse, Product  # noqa: E402
+from http_server.authorization import check_authorization, create_token  # noqa: E402
+from http_server.http import api_router  # noqa: E402
+
+
+def seed(rows: int):
+    with write_connection("centers", "stocks", "products") as (conn, cursor):
+        cursor.execute("INSERT INTO centers (name, city, address) VALUES ('Center', 'Oran', 'Street 1')")
+        cursor.execute("INSERT INTO stocks (name, city, address, center_id) VALUES ('Stock', 'Oran', 'Road 1', 1)")
+        start = datetime(2026, 1, 1)
+        cursor.executemany("""
+                           INSERT INTO products (name, description, stock_id, quantity, expiration_date,
+                                                 purchase_price, sale_price)
+                           VALUES (?, ?, 1, ?, ?, ?, ?)
+                           """, [(f"Product {i}", f"Description of product {i}", i % 500 + 0.5,
+                                  start + timedelta(days=i % 365), 10 + i % 90, 20 + i % 90) for i in range(rows)])
+
+
+def best(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return min(times)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # one line per request otherwise
+    os.chdir(tempfile.mkdtemp())
+    get_connection("bench.db")
+    init_db()
+    seed(rows)
+
+    app = FastAPI()
+    app.include_router(api_router)
+
+    # The route as it was before the fast path: models validated again by response_model
+    @app.get("/model/products", response_model=HttpListResponse[Product])
+    def model_products(_=Depends(check_authorization)):
+        return list_products(0, -1)
+
+    client = TestClient(app)
+    headers = {"Authorization": create_token({"user_id": 1, "username": "bench"})}
+    model = client.get("/model/products", headers=headers)
+    fast = client.get("/products", headers=headers)
+    assert model.content == fast.content, "fast path and model path responses differ"
+
+    results = {
+        "list_products() -> models": best(lambda: list_products(0, -1), repeat),
+        "list_products(as_json=True)": best(lambda: list_products(0, -1, as_json=True), repeat),
+        "GET model path": best(lambda: client.get("/model/products", headers=headers), repeat),
+        "GET fast path": best(lambda: client.get("/products", headers=headers), repeat),
+    }
+    print(f"{rows} rows, best of {repeat}")
+    for name, seconds in results.items():
+        print(f"  {name:<30} {seconds * 1000:9.1f} ms  {seconds / rows * 1e6:7.2f} us/row")
+    speedup = results["GET model path"] / results["GET fast path"]
+    print(f"  end-to-end speedup: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,47 @@
-from .sql import get_connection, init_db, DB_FILE, db_lock
-
-from .statements.user_statements import add_user, update_user, get_user, list_users, delete_user, get_user_by_username
-from .statements.center_statements import add_center, update_center, get_center, list_centers, delete_center
-from .statements.stock_statements import add_stock, update_stock, get_stock, list_stocks, delete_stock
-from .statements.product_statements import add_product, update_product, get_product, list_products, delete_product
-from .statements.supplier_statements import add_supplier, update_supplier, get_supplier, list_suppliers, list_consumers, \
-    list_providers, \
-    delete_supplier
-from .statements.transaction_statements import add_transaction, update_transaction, get_transaction, list_transactions, \
-    list_income_transactions, list_outcome_transactions, delete_transaction
-from .hash import verify_password, hash_password
-
-__all__ = ["get_connection", "init_db", "DB_FILE", "db_lock", "add_user", "add_center", "add_stock", "add_product", "add_supplier",
-           "add_transaction", "get_user", "get_user_by_username", "get_center", "get_stock", "get_product",
-           "update_user", "update_center", "update_stock", "update_product", "update_supplier", "update_transaction",
-           "get_supplier", "get_transaction",
-           "list_users", "list_centers", "list_stocks", "list_products", "list_suppliers", "list_consumers",
-           "list_providers", "list_transactions", "list_income_transactions", "list_outcome_transactions",
-           "delete_user", "delete_center", "delete_stock", "delete_product", "delete_supplier", "delete_transaction",
-           "verify_password", "hash_password"]
+from .sql import get_connection, open_connection, write_connection, close_connections, init_db, DB_FILE, db_lock, \
+    table_versions
+from .write_queue import execute_write, submit_write, WriteResult
+
+from .statements.user_statements import add_user, update_user, get_user, get_users, list_users, delete_user, \
+    get_user_by_username, upsert_users, export_users, update_user_password
+from .statements.center_statements import add_center, update_center, get_center, get_centers, list_centers, \
+    delete_center, upsert_centers, export_centers
+from .statements.stock_statements import add_stock, update_stock, get_stock, get_stocks, list_stocks, delete_stock, \
+    upsert_stocks, export_stocks
+from .statements.product_statements import add_product, update_product, get_product, get_products, list_products, \
+    delete_product, upsert_products, export_products
+from .statements.supplier_statements import add_supplier, update_supplier, get_supplier, get_suppliers, \
+    list_suppliers, list_consumers, list_providers, delete_supplier, upsert_suppliers, export_suppliers
+from .statements.transaction_statements import add_transaction, update_transaction, get_transaction, get_transactions, \
+    list_transactions, list_income_transactions, list_outcome_transactions, delete_transaction, upsert_transactions, \
+    export_transactions, summarize_transactions, archive_transactions, list_transaction_archives, \
+    is_archived_transaction
+from .statements.inventory_statements import list_stock_inventory, get_stock_inventory, list_center_inventory, \
+    get_center_inventory, rebuild_inventory
+from .statements.pagination import CountMode
+from .statements.product_statements import PRODUCT_RELATIONS
+from .statements.stock_statements import STOCK_RELATIONS
+from .statements.transaction_statements import TRANSACTION_RELATIONS
+from .executor import shutdown_executor
+from .row_cache import row_cache_stats
+from .slow_queries import slow_queries, reset_slow_queries
+from .hash import verify_password, hash_password, needs_rehash, verify_password_async, hash_password_async, \
+    shutdown_hash_pool
+
+__all__ = ["get_connection", "open_connection", "write_connection", "close_connections", "init_db", "DB_FILE", "db_lock", "add_user", "add_center", "add_stock", "add_product", "add_supplier",
+           "add_transaction", "get_user", "get_user_by_username", "get_center", "get_stock", "get_product",
+           "update_user", "update_center", "update_stock", "update_product", "update_supplier", "update_transaction",
+           "get_supplier", "get_transaction",
+           "list_users", "list_centers", "list_stocks", "list_products", "list_suppliers", "list_consumers",
+           "list_providers", "list_transactions", "list_income_transactions", "list_outcome_transactions",
+           "delete_user", "delete_center", "delete_stock", "delete_product", "delete_supplier", "delete_transaction",
+           "upsert_users", "upsert_centers", "upsert_stocks", "upsert_products", "upsert_suppliers",
+           "upsert_transactions", "export_users", "export_centers", "export_stocks", "export_products",
+           "export_suppliers", "export_transactions", "summarize_transactions",
+           "verify_password", "hash_password", "needs_rehash", "verify_password_async", "hash_password_async",
+           "shutdown_hash_pool", "update_user_password", "CountMode", "list_stock_inventory", "get_stock_inventory",
+           "list_center_inventory", "get_center_inventory", "rebuild_inventory", "shutdown_executor", "row_cache_stats",
+           "table_versions", "slow_queries", "reset_slow_queries", "get_users", "get_centers", "get_stocks",
+           "get_products", "get_suppliers", "get_transactions", "PRODUCT_RELATIONS", "STOCK_RELATIONS",
+           "TRANSACTION_RELATIONS", "execute_write", "submit_write", "WriteResult", "archive_transactions",
+           "list_transaction_archives", "is_archived_transaction"]
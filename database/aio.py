@@ -0,0 +1,137 @@
+# aio.py
+# Async versions of the statement functions, for `async def` route handlers.
+# Each call runs the regular statement function on the database workers (see executor.py),
+# so a request waiting on SQLite costs a coroutine, not a request thread. Those calls are timed
+# per statement for GET /metrics (see metrics.py).
+# The add_* / update_* / delete_* writes don't use a worker: they are queued to the writer thread
+# (see write_queue.py) and their commit is awaited on the event loop.
+# The export_* functions become async iterators of chunks.
+import asyncio
+import functools
+import time
+from typing import AsyncIterator, Awaitable, Callable, Iterator, TypeVar
+
+from . import executor, metrics
+from .write_queue import submit_write
+from .statements import user_statements as users
+from .statements import center_statements as centers
+from .statements import stock_statements as stocks
+from .statements import product_statements as products
+from .statements import supplier_statements as suppliers
+from .statements import transaction_statements as transactions
+from .statements import inventory_statements as inventory
+
+T = TypeVar("T")
+
+
+def _run(fn: Callable[..., T]) -> Callable[..., Awaitable[T]]:
+    timed = metrics.timed(fn)
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs) -> T:
+        return await executor.run(timed, time.perf_counter(), *args, **kwargs)
+    return wrapper
+
+
+def _write(fn: Callable[..., T]) -> Callable[..., Awaitable[T]]:
+    """
+    Async version of a statement decorated with write_queue.queued_write. The write is built on the
+    event loop and queued to the writer thread, then its commit is awaited as a future: a write waiting
+    for its batch holds no database worker, so a batch isn't capped at DB_WORKERS writes and reads
+    keep the workers during a burst of writes. Timed per statement from queueing to commit.
+    """
+    build = fn.write
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs) -> T:
+        write = build(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wrap_future(submit_write(write.table, write.statement, write.params))
+        except Exception:
+            metrics.statement_errors.inc(name)
+            raise
+        finally:
+            metrics.statement_seconds.observe(time.perf_counter() - started, name)
+        return write.result(result)
+    return wrapper
+
+
+def _iterate(fn: Callable[..., Iterator[T]]) -> Callable[..., AsyncIterator[T]]:
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs) -> AsyncIterator[T]:
+        return executor.iterate(fn(*args, **kwargs))  # generators don't touch the database before the first next()
+    return wrapper
+
+
+add_user = _write(users.add_user)
+update_user = _write(users.update_user)
+get_user = _run(users.get_user)
+get_users = _run(users.get_users)
+list_users = _run(users.list_users)
+delete_user = _write(users.delete_user)
+get_user_by_username = _run(users.get_user_by_username)
+upsert_users = _run(users.upsert_users)
+update_user_password = _write(users.update_user_password)
+export_users = _iterate(users.export_users)
+
+add_center = _write(centers.add_center)
+update_center = _write(centers.update_center)
+get_center = _run(centers.get_center)
+get_centers = _run(centers.get_centers)
+list_centers = _run(centers.list_centers)
+delete_center = _write(centers.delete_center)
+upsert_centers = _run(centers.upsert_centers)
+export_centers = _iterate(centers.export_centers)
+
+add_stock = _write(stocks.add_stock)
+update_stock = _write(stocks.update_stock)
+get_stock = _run(stocks.get_stock)
+get_stocks = _run(stocks.get_stocks)
+list_stocks = _run(stocks.list_stocks)
+delete_stock = _write(stocks.delete_stock)
+upsert_stocks = _run(stocks.upsert_stocks)
+export_stocks = _iterate(stocks.export_stocks)
+
+add_product = _write(products.add_product)
+update_product = _write(products.update_product)
+get_product = _run(products.get_product)
+get_products = _run(products.get_products)
+list_products = _run(products.list_products)
+delete_product = _write(products.delete_product)
+upsert_products = _run(products.upsert_products)
+export_products = _iterate(products.export_products)
+
+add_supplier = _write(suppliers.add_supplier)
+update_supplier = _write(suppliers.update_supplier)
+get_supplier = _run(suppliers.get_supplier)
+get_suppliers = _run(suppliers.get_suppliers)
+list_suppliers = _run(suppliers.list_suppliers)
+list_consumers = _run(suppliers.list_consumers)
+list_providers = _run(suppliers.list_providers)
+delete_supplier = _write(suppliers.delete_supplier)
+upsert_suppliers = _run(suppliers.upsert_suppliers)
+export_suppliers = _iterate(suppliers.export_suppliers)
+
+add_transaction = _write(transactions.add_transaction)
+update_transaction = _write(transactions.update_transaction)
+get_transaction = _run(transactions.get_transaction)
+get_transactions = _run(transactions.get_transactions)
+list_transactions = _run(transactions.list_transactions)
+list_income_transactions = _run(transactions.list_income_transactions)
+list_outcome_transactions = _run(transactions.list_outcome_transactions)
+delete_transaction = _write(transactions.delete_transaction)
+upsert_transactions = _run(transactions.upsert_transactions)
+summarize_transactions = _run(transactions.summarize_transactions)
+export_transactions = _iterate(transactions.export_transactions)
+archive_transactions = _run(transactions.archive_transactions)
+list_transaction_archives = _run(transactions.list_transaction_archives)
+check_transactions_range = _run(transactions.check_transactions_range)
+is_archived_transaction = _run(transactions.is_archived_transaction)
+
+list_stock_inventory = _run(inventory.list_stock_inventory)
+get_stock_inventory = _run(inventory.get_stock_inventory)
+list_center_inventory = _run(inventory.list_center_inventory)
+get_center_inventory = _run(inventory.get_center_inventory)
+rebuild_inventory = _run(inventory.rebuild_inventory)
@@ -0,0 +1,46 @@
+# count_cache.py
+import threading
+from collections import OrderedDict
+
+# Maximum number of (table, filter) totals kept in memory
+MAX_ENTRIES = 1024
+
+_lock = threading.Lock()
+_counts: OrderedDict[tuple, int] = OrderedDict()
+# Bumped on every committed write to a table; a count computed under an older
+# generation is never stored, so a reader racing a writer can't cache a stale total.
+_generations: dict[str, int] = {}
+
+
+def generation(table: str) -> int:
+    """Return the write generation of a table."""
+    with _lock:
+        return _generations.get(table, 0)
+
+
+def get(table: str, key: tuple) -> int | None:
+    """Return the cached total for a table/filter, or None on a miss."""
+    with _lock:
+        total = _counts.get((table, key))
+        if total is not None:
+            _counts.move_to_end((table, key))
+        return total
+
+
+def put(table: str, key: tuple, total: int, gen: int):
+    """Cache a total computed while the table was at generation `gen`."""
+    with _lock:
+        if _generations.get(table, 0) != gen:
+            return
+        _counts[(table, key)] = total
+        _counts.move_to_end((table, key))
+        while len(_counts) > MAX_ENTRIES:
+            _counts.popitem(last=False)
+
+
+def invalidate(table: str):
+    """Drop every cached total of a table. Called after each committed write."""
+    with _lock:
+        _generations[table] = _generations.get(table, 0) + 1
+        for cache_key in [k for k in _counts if k[0] == table]:
+            del _counts[cache_key]
@@ -0,0 +1,61 @@
+# executor.py
+import asyncio
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+# Threads running database statements for the async layer. Each keeps its own pooled
+# connection (see sql.get_connection), so this is also the number of open connections.
+DB_WORKERS = int(os.getenv("ERP_DB_WORKERS", "8"))
+
+# Calls handed to the workers but not started yet. Past DB_WORKERS + DB_QUEUE_DEPTH the
+# next callers wait as coroutines on the event loop instead of piling up in the executor.
+DB_QUEUE_DEPTH = int(os.getenv("ERP_DB_QUEUE_DEPTH", "64"))
+
+_pool: ThreadPoolExecutor | None = None
+# One semaphore per event loop (asyncio primitives can't be shared between loops)
+_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="erp-db")
+    return _pool
+
+
+def _get_slots() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    slots = _slots.get(loop)
+    if slots is None:
+        slots = _slots[loop] = asyncio.Semaphore(DB_WORKERS + DB_QUEUE_DEPTH)
+    return slots
+
+
+async def run(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Run a blocking database function on the database workers and await its result."""
+    async with _get_slots():
+        return await asyncio.wrap_future(_get_pool().submit(fn, *args, **kwargs))
+
+
+async def iterate(iterator: Iterator[T]) -> AsyncIterator[T]:
+    """Consume a blocking iterator (an export_* generator) on the database workers, one item per call."""
+    done = object()
+    try:
+        while (item := await run(next, iterator, done)) is not done:
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            await run(close)  # a client that disconnects mid-export releases the export connection
+
+
+def shutdown_executor():
+    """Stop the database worker threads. Call when the app stops."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
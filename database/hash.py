@@ -1,33 +1,83 @@
-# hash.py
-import bcrypt
-
-
-def hash_password(password: str) -> str:
-    """
-    Hash a password with a custom salt using bcrypt.
-
-    Args:
-        password (str): The plain password.
-    Returns:
-        str: Hashed password (utf-8 string) to store in database.
-    """
-    # Combine password and custom salt
-    # encode("utf-8") is a Python string method that converts a string into bytes using the UTF-8 encoding.
-    # Hash with bcrypt
-    hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
-    return hashed.decode("utf-8")
-
-
-def verify_password(password: str, hashed_password: str) -> bool:
-    """
-    Verify if a password matches the hashed password using the same salt.
-
-    Args:
-        password (str): Password entered by user.
-        hashed_password (str): Hashed password stored in database.
-
-    Returns:
-        bool: True if password matches, False otherwise.
-    """
-    password_with_salt = (password).encode("utf-8")
-    return bcrypt.checkpw(password_with_salt, hashed_password.encode("utf-8"))
+# hash.py
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+
+# bcrypt cost factor for new hashes (2^rounds iterations). Stored hashes with another
+# cost are upgraded/downgraded on the next successful login.
+BCRYPT_ROUNDS = int(os.getenv("ERP_BCRYPT_ROUNDS", "12"))
+
+# Worker processes dedicated to hashing, so a login storm can't starve the request threadpool
+HASH_WORKERS = int(os.getenv("ERP_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def hash_password(password: str, rounds: int | None = None) -> str:
+    """
+    Hash a password with a custom salt using bcrypt.
+
+    Args:
+        password (str): The plain password.
+        rounds (int): Cost factor, defaults to BCRYPT_ROUNDS.
+    Returns:
+        str: Hashed password (utf-8 string) to store in database.
+    """
+    # Combine password and custom salt
+    # encode("utf-8") is a Python string method that converts a string into bytes using the UTF-8 encoding.
+    # Hash with bcrypt
+    hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds or BCRYPT_ROUNDS))
+    return hashed.decode("utf-8")
+
+
+def verify_password(password: str, hashed_password: str) -> bool:
+    """
+    Verify if a password matches the hashed password using the same salt.
+
+    Args:
+        password (str): Password entered by user.
+        hashed_password (str): Hashed password stored in database.
+
+    Returns:
+        bool: True if password matches, False otherwise.
+    """
+    password_with_salt = (password).encode("utf-8")
+    return bcrypt.checkpw(password_with_salt, hashed_password.encode("utf-8"))
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """
+    True if a stored hash ("$2b$<rounds>$<salt+hash>") was made with another cost than BCRYPT_ROUNDS.
+    """
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=HASH_WORKERS)
+    return _pool
+
+
+async def hash_password_async(password: str) -> str:
+    """hash_password() run in the hashing process pool."""
+    # rounds passed explicitly: worker processes may have been started with another configuration
+    return await asyncio.get_running_loop().run_in_executor(_get_pool(), hash_password, password, BCRYPT_ROUNDS)
+
+
+async def verify_password_async(password: str, hashed_password: str) -> bool:
+    """verify_password() run in the hashing process pool."""
+    return await asyncio.get_running_loop().run_in_executor(_get_pool(), verify_password, password, hashed_password)
+
+
+def shutdown_hash_pool():
+    """Stop the hashing worker processes. Call when the app stops."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
@@ -0,0 +1,178 @@
+# metrics.py
+# In-process metrics in the Prometheus text format: histograms, counters and gauges with labels,
+# and the database instruments (statement latency, executor queue wait, write lock wait, write
+# batch size, rows returned, statements in flight). The HTTP instruments live in
+# http_server/metrics.py and the whole registry is rendered by GET /metrics.
+import functools
+import threading
+import time
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+# Upper bounds (seconds) of the latency buckets, from a cached row to a multi-second scan
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0)
+
+_registry: list["_Metric"] = []
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self._lock = threading.Lock()
+        self._values: dict[tuple[str, ...], object] = {}
+        if not labels:
+            self._values[()] = self._zero()  # shown at 0 before the first observation
+        _registry.append(self)
+
+    def _zero(self):
+        return 0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            lines.extend(self._samples(label_values, value))
+        return lines
+
+    def _samples(self, label_values: tuple[str, ...], value) -> list[str]:
+        return [f"{self.name}{_labels(self.label_names, label_values)} {value}"]
+
+
+class Counter(_Metric):
+    """A value that only goes up (requests served, rows returned)."""
+    type = "counter"
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    """A value that goes up and down (requests in flight)."""
+    type = "gauge"
+
+    def add(self, amount: float, *labels: str):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Histogram(_Metric):
+    """Observations counted in cumulative LATENCY_BUCKETS, with their sum and count."""
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        super().__init__(name, help, labels)
+
+    def _zero(self) -> list:
+        return [0] * (len(self.buckets) + 1) + [0.0]  # one count per bucket, then +Inf, then the sum
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = self._zero()
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[len(self.buckets)] += 1
+            counts[-1] += value
+
+    def _samples(self, label_values: tuple[str, ...], counts: list) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, "+Inf"), counts):
+            cumulative += count
+            labels = _labels((*self.label_names, "le"), (*label_values, str(bound)))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _labels(self.label_names, label_values)
+        lines.append(f"{self.name}_sum{labels} {counts[-1]}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def render_metrics() -> str:
+    """Every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# -----------------------------
+# Database instruments
+# -----------------------------
+statement_seconds = Histogram("erp_db_statement_seconds",
+                              "Time spent running a statement function on a database worker.", ("statement",))
+statement_queue_seconds = Histogram("erp_db_statement_queue_seconds",
+                                    "Time a statement waited for a free database worker.", ("statement",))
+statement_errors = Counter("erp_db_statement_errors_total", "Statement functions that raised.", ("statement",))
+statements_in_flight = Gauge("erp_db_statements_in_flight", "Statements running on a database worker.")
+rows_returned = Counter("erp_db_rows_returned_total", "Rows returned by statement functions.", ("statement",))
+lock_wait_seconds = Histogram("erp_db_lock_wait_seconds",
+                              "Time spent waiting for the write lock (db_lock, then SQLite's across processes).")
+write_batch_size = Histogram("erp_db_write_batch_size", "Single-row writes committed together by the writer thread.",
+                             buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024))
+serialization_seconds = Histogram("erp_db_serialization_seconds",
+                                  "Time spent encoding a list page to JSON from its rows.", ("model",))
+
+# Rows fetched by paginate() during the statement running on this thread, None when it didn't page
+_local = threading.local()
+
+
+def count_rows(rows: int):
+    """Report the rows a list statement fetched (called by paginate, counted on its statement)."""
+    _local.rows = (getattr(_local, "rows", None) or 0) + rows
+
+
+def _result_rows(result) -> int:
+    """Rows in a statement result that didn't go through paginate(): a model, a list, or None."""
+    if result is None or isinstance(result, (int, bool, str, bytes)):
+        return 0
+    if isinstance(result, list):
+        return len(result)
+    return 1
+
+
+def timed(fn: Callable[..., T]) -> Callable[..., T]:
+    """
+    Instrument a statement function run by the database workers. The wrapper takes the
+    perf_counter() of the moment the call was submitted as its first argument and records how
+    long the call waited for a worker, how long it ran, whether it raised and the rows it returned.
+    """
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(submitted: float, *args, **kwargs) -> T:
+        started = time.perf_counter()
+        statement_queue_seconds.observe(started - submitted, name)
+        statements_in_flight.add(1)
+        _local.rows = None
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            statement_errors.inc(name)
+            raise
+        finally:
+            statements_in_flight.add(-1)
+            statement_seconds.observe(time.perf_counter() - started, name)
+        rows_returned.inc(name, amount=_local.rows if _local.rows is not None else _result_rows(result))
+        return result
+    return wrapper
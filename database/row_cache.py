@@ -0,0 +1,143 @@
+# row_cache.py
+import functools
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable, TypeVar
+
+from pydantic import BaseModel
+
+from . import sql  # circular (sql imports this module), only used once both are loaded
+
+M = TypeVar("M", bound=BaseModel)
+
+# Maximum number of rows kept in memory per table
+MAX_ENTRIES = int(os.getenv("ERP_ROW_CACHE_SIZE", "4096"))
+
+# Tables with a cached get_<entity>(id), registered by the decorators below
+TABLES: set[str] = set()
+
+_lock = threading.Lock()
+_rows: dict[str, OrderedDict[int, BaseModel | None]] = {}
+# Same scheme as count_cache, per row: the generation of a table is bumped by every invalidation,
+# of the whole table or of some of its rows, and a row read under an older generation than its
+# last invalidation is never stored.
+_generations: dict[str, int] = {}
+# row id -> generation of its last invalidation, the most recent MAX_ENTRIES rows of each table
+_invalidated: dict[str, OrderedDict[int, int]] = {}
+# Generation of the last whole-table invalidation, or of the newest row dropped from _invalidated:
+# a row read before it is never stored
+_floors: dict[str, int] = {}
+_hits: dict[str, int] = {}
+_misses: dict[str, int] = {}
+
+_MISS = object()
+
+
+def _get(table: str, row_id: int):
+    with _lock:
+        rows = _rows.get(table)
+        if rows is None or row_id not in rows:
+            _misses[table] = _misses.get(table, 0) + 1
+            return _MISS, _generations.get(table, 0)
+        rows.move_to_end(row_id)
+        _hits[table] = _hits.get(table, 0) + 1
+        return rows[row_id], None
+
+
+def _put(table: str, row_id: int, value: BaseModel | None, gen: int):
+    with _lock:
+        if _floors.get(table, 0) > gen or _invalidated.get(table, {}).get(row_id, 0) > gen:
+            return
+        rows = _rows.setdefault(table, OrderedDict())
+        rows[row_id] = value
+        rows.move_to_end(row_id)
+        while len(rows) > MAX_ENTRIES:
+            rows.popitem(last=False)
+
+
+def invalidate(table: str):
+    """Drop every cached row of a table. Called after the commit of a write that can change any row."""
+    with _lock:
+        gen = _generations[table] = _generations.get(table, 0) + 1
+        _floors[table] = gen
+        _rows.pop(table, None)
+        _invalidated.pop(table, None)
+
+
+def invalidate_rows(table: str, row_ids: Iterable[int]):
+    """Drop the cached rows of a table whose id is in `row_ids`: those a committed write changed."""
+    with _lock:
+        gen = _generations[table] = _generations.get(table, 0) + 1
+        rows = _rows.get(table, {})
+        invalidated = _invalidated.setdefault(table, OrderedDict())
+        for row_id in row_ids:
+            rows.pop(row_id, None)
+            invalidated[row_id] = gen
+            invalidated.move_to_end(row_id)
+        while len(invalidated) > MAX_ENTRIES:
+            _, dropped = invalidated.popitem(last=False)
+            _floors[table] = max(_floors.get(table, 0), dropped)
+
+
+def cached(table: str) -> Callable[[Callable[[int], M | None]], Callable[[int], M | None]]:
+    """
+    Read-through cache for a get_<entity>(id) function. Unknown ids are cached too (as None),
+    until a write adds them. Callers get a copy, the cached model is never shared.
+    """
+    TABLES.add(table)
+
+    def decorator(fn: Callable[[int], M | None]) -> Callable[[int], M | None]:
+        @functools.wraps(fn)
+        def wrapper(row_id: int) -> M | None:
+            sql.get_connection()  # catches up with the writes of other processes first
+            value, gen = _get(table, row_id)
+            if value is _MISS:
+                value = fn(row_id)
+                _put(table, row_id, value, gen)
+            return value.model_copy() if value is not None else None
+        return wrapper
+    return decorator
+
+
+def cached_many(table: str) -> Callable[[Callable[[list[int]], list[M]]], Callable[[list[int]], list[M]]]:
+    """
+    Read-through cache for a get_<entities>(ids) function reading many rows in one query, sharing the
+    rows of get_<entity>(id): only the ids missing from the cache are passed on, what it returns is
+    cached, the ids it doesn't return are cached as unknown. Callers get copies in the order of `ids`,
+    without duplicates or unknown ids.
+    """
+    TABLES.add(table)
+
+    def decorator(fn: Callable[[list[int]], list[M]]) -> Callable[[list[int]], list[M]]:
+        @functools.wraps(fn)
+        def wrapper(row_ids: list[int]) -> list[M]:
+            sql.get_connection()  # catches up with the writes of other processes first
+            row_ids = list(dict.fromkeys(row_ids))
+            values: dict[int, BaseModel | None] = {}
+            missing: dict[int, int] = {}  # id -> generation it was missed under
+            for row_id in row_ids:
+                value, gen = _get(table, row_id)
+                if value is _MISS:
+                    missing[row_id] = gen
+                else:
+                    values[row_id] = value
+            if missing:
+                fetched = {row.id: row for row in fn(list(missing))}
+                for row_id, gen in missing.items():
+                    values[row_id] = fetched.get(row_id)
+                    _put(table, row_id, values[row_id], gen)
+            return [values[i].model_copy() for i in row_ids if values[i] is not None]
+        return wrapper
+    return decorator
+
+
+def row_cache_stats() -> dict[str, dict]:
+    """Hits, misses, hit rate and size of the cache of every table read so far."""
+    with _lock:
+        stats = {}
+        for table in sorted(set(_hits) | set(_misses)):
+            hits, misses = _hits.get(table, 0), _misses.get(table, 0)
+            stats[table] = {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses),
+                            "size": len(_rows.get(table, ()))}
+        return stats
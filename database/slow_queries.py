@@ -0,0 +1,137 @@
+# slow_queries.py
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from typing import Literal
+
+from entities import SlowQuery
+from .file_lock import file_lock
+
+# Queries taking at least this long (fetching the rows included) are logged, in milliseconds
+SLOW_QUERY_MS = float(os.getenv("ERP_SLOW_QUERY_MS", "100"))
+# One JSON object per slow run, rotated at SLOW_QUERY_LOG_BYTES with SLOW_QUERY_LOG_BACKUPS old files
+SLOW_QUERY_LOG = os.getenv("ERP_SLOW_QUERY_LOG", "slow-queries.log")
+SLOW_QUERY_LOG_BYTES = int(os.getenv("ERP_SLOW_QUERY_LOG_BYTES", str(5 * 1024 * 1024)))
+SLOW_QUERY_LOG_BACKUPS = 3
+# Text parameters (filters typed by users) are masked unless set to 0: letters become "a", digits "9",
+# the rest is kept, so the shape of a filter ("%aaa%", '"aaa"* "aaa"*') still shows which path it took.
+REDACT = os.getenv("ERP_SLOW_QUERY_REDACT", "1") != "0"
+# Distinct SQL texts kept for the top offenders, the one with the least total time goes first
+MAX_ENTRIES = 256
+
+
+class _SharedRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler for a log every server process (--workers N) writes to: each record is written
+    holding a lock file next to the log, on a file opened for it and closed right after. One process at
+    a time appends or rotates, and none keeps writing to a file another one has rotated away
+    (nor keeps it open, which would make the rename fail on Windows).
+    """
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            with file_lock(self.baseFilename + ".lock"):
+                try:
+                    super().emit(record)
+                finally:
+                    if self.stream is not None:
+                        self.stream.close()
+                        self.stream = None
+        except Exception:
+            self.handleError(record)
+
+
+_log = logging.getLogger("erp.slow_queries")
+_log.propagate = False
+_log.setLevel(logging.INFO)
+_handler = _SharedRotatingFileHandler(SLOW_QUERY_LOG, maxBytes=SLOW_QUERY_LOG_BYTES,
+                                      backupCount=SLOW_QUERY_LOG_BACKUPS, encoding="utf-8",
+                                      delay=True)  # the file is only created by the first slow query
+_log.addHandler(_handler)
+
+_lock = threading.Lock()
+_offenders: dict[str, SlowQuery] = {}
+
+
+def _redact(value):
+    if not REDACT or value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return f"<{len(value)} bytes>"
+    return re.sub(r"\d", "9", re.sub(r"[^\W\d_]", "a", str(value)))
+
+
+def _plan(conn: sqlite3.Connection, sql: str, params) -> list[str]:
+    """EXPLAIN QUERY PLAN of a query, one line per step indented by its depth in the plan tree."""
+    try:
+        steps = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    except sqlite3.Error as e:
+        return [f"(no plan: {e})"]
+    depths: dict[int, int] = {}
+    lines = []
+    for step_id, parent, _, detail in steps:
+        depths[step_id] = depths.get(parent, -1) + 1
+        lines.append("  " * depths[step_id] + detail)
+    return lines
+
+
+def _record(cursor: sqlite3.Cursor, sql: str, params, elapsed_ms: float, rows: int):
+    key = " ".join(sql.split())
+    redacted = [_redact(p) for p in params]
+    now = datetime.now()
+    with _lock:
+        entry = _offenders.get(key)
+    # The plan is taken once per SQL text, outside the lock (it runs a statement)
+    plan = entry.plan if entry is not None else _plan(cursor.connection, sql, params)
+
+    with _lock:
+        entry = _offenders.get(key)
+        if entry is None:
+            if len(_offenders) >= MAX_ENTRIES:
+                del _offenders[min(_offenders, key=lambda k: _offenders[k].total_ms)]
+            entry = _offenders[key] = SlowQuery(sql=key, plan=plan, last_seen=now)
+        entry.calls += 1
+        entry.total_ms += elapsed_ms
+        entry.max_ms = max(entry.max_ms, elapsed_ms)
+        entry.avg_ms = entry.total_ms / entry.calls
+        entry.rows = rows
+        entry.params = redacted
+        entry.last_seen = now
+
+    _log.info(json.dumps({"time": now.isoformat(timespec="milliseconds"), "ms": round(elapsed_ms, 3), "rows": rows,
+                          "sql": key, "params": redacted, "plan": plan}, default=str))
+
+
+def fetch_all(cursor: sqlite3.Cursor, sql: str, params=()) -> list[sqlite3.Row]:
+    """
+    cursor.execute(sql, params).fetchall(), timed. A run of SLOW_QUERY_MS or more is written to the
+    slow-query log with its redacted parameters, row count and query plan, and counted in slow_queries().
+    """
+    started = time.perf_counter()
+    rows = cursor.execute(sql, params).fetchall()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if elapsed_ms >= SLOW_QUERY_MS:
+        _record(cursor, sql, params, elapsed_ms, len(rows))
+    return rows
+
+
+def slow_queries(limit: int = 20, order: Literal["total", "max", "calls"] = "total") -> list[SlowQuery]:
+    """The worst offenders since the start, by total time, longest run or number of slow runs."""
+    key = {"total": lambda q: q.total_ms, "max": lambda q: q.max_ms, "calls": lambda q: q.calls}[order]
+    with _lock:
+        entries = sorted(_offenders.values(), key=key, reverse=True)[:limit]
+        return [q.model_copy() for q in entries]
+
+
+def reset_slow_queries():
+    """Forget the offenders counted so far (the log file is kept)."""
+    with _lock:
+        _offenders.clear()
@@ -1,162 +1,543 @@
-# sql.py
-import sqlite3
-import threading
-
-from .hash import hash_password
-
-DB_FILE = "erp.db"
-
-
-# Global lock instance
-db_lock = threading.Lock()
-
-# -----------------------------
-# Persistent connection
-# -----------------------------
-conn = None
-cursor = None
-
-
-def get_connection(name: str = DB_FILE) -> sqlite3.Connection:
-    """Return the persistent connection and cursor."""
-    global conn, cursor
-    if conn is None:
-        conn = sqlite3.connect(name, check_same_thread=False)
-        conn.row_factory = sqlite3.Row  # optional, dict-like access
-        cursor = conn.cursor()
-    return conn, cursor
-
-
-def init_db():
-    """Initialize the database if it doesn't exist."""
-    # if os.path.exists(DB_FILE):
-    #     print(f"Database {DB_FILE} already exists, skipping initialization.")
-    #     return
-
-    conn, cursor = get_connection()
-
-    # -----------------------------
-    # Users table
-    # -----------------------------
-    cursor.execute("""
-                   CREATE TABLE IF NOT EXISTS users
-                   (
-                       id       INTEGER PRIMARY KEY AUTOINCREMENT,
-                       name     TEXT NOT NULL,
-                       username TEXT NOT NULL UNIQUE,
-                       password TEXT NOT NULL,
-                       rank     INTEGER DEFAULT 1
-                   )
-                   """)
-
-    # Hash the initial password
-    password_plain = "123456789"
-    hashed_pw = hash_password(password_plain)
-
-    # Insert default Manager user only if table is empty
-    cursor.execute("SELECT COUNT(*) as count FROM users")
-    if cursor.fetchone()["count"] == 0:
-        password_hashed = hash_password("123456789")
-        cursor.execute("""
-                       INSERT INTO users (name, username, password, rank)
-                       VALUES (?, ?, ?, ?)
-                       """, ("Admin", "Manager", password_hashed, 3))
-
-    # # Insert initial Manager user
-    # cursor.execute("""
-    #                INSERT INTO users (name, username, password, rank)
-    #                VALUES (?, ?, ?, ?) WHERE NOT EXISTS (SELECT 1 FROM users);
-    #                """, ("Admin", "Manager", hashed_pw, 3))
-    #
-    # # -----------------------------
-    # Suppliers table
-    # -----------------------------
-    cursor.execute("""
-                   CREATE TABLE IF NOT EXISTS suppliers
-                   (
-                       id            INTEGER PRIMARY KEY AUTOINCREMENT,
-                       firstname     TEXT NOT NULL,
-                       lastname      TEXT NOT NULL,
-                       type          TEXT NOT NULL CHECK (type IN ('provider', 'consumer', 'both')),
-                       contract_date DATE NOT NULL
-                   )
-                   """)
-
-    # -----------------------------
-    # Centers table
-    # -----------------------------
-    cursor.execute("""
-                   CREATE TABLE IF NOT EXISTS centers
-                   (
-                       id      INTEGER PRIMARY KEY AUTOINCREMENT,
-                       name    TEXT NOT NULL,
-                       city    TEXT NOT NULL,
-                       address TEXT NOT NULL,
-                       phone   TEXT,
-                       email   TEXT
-                   )
-                   """)
-
-    # -----------------------------
-    # Stocks table  #ON DELETE CASCADE
-    # -----------------------------
-    cursor.execute("""
-                   CREATE TABLE IF NOT EXISTS stocks
-                   (
-                       id        INTEGER PRIMARY KEY AUTOINCREMENT,
-                       name      TEXT    NOT NULL,
-                       city      TEXT    NOT NULL,
-                       address   TEXT    NOT NULL,
-                       center_id INTEGER NOT NULL,
-                       FOREIGN KEY (center_id) REFERENCES centers (id)
-                   )
-                   """)
-
-    # -----------------------------
-    # Products table
-    # -----------------------------
-    cursor.execute("""
-                   CREATE TABLE IF NOT EXISTS products
-                   (
-                       id             INTEGER PRIMARY KEY AUTOINCREMENT,
-                       name           TEXT    NOT NULL,
-                       description    TEXT,
-                       stock_id       INTEGER NOT NULL,
-                       quantity       REAL DEFAULT 0,
-                       expiration_date     DATE    NOT NULL,
-                       purchase_price REAL DEFAULT 0,
-                       sale_price     REAL DEFAULT 0,
-                       FOREIGN KEY (stock_id) REFERENCES stocks (id)
-                   )
-                   """)
-
-    # -----------------------------
-    # Transactions table
-    # -----------------------------
-    cursor.execute("""
-                   CREATE TABLE IF NOT EXISTS transactions
-                   (
-                       id       INTEGER PRIMARY KEY AUTOINCREMENT,
-                       supplier_id  INTEGER  NOT NULL,
-                       date     DATETIME NOT NULL,
-                       product_id  INTEGER NOT NULL,
-                       type     INTEGER  NOT NULL CHECK (type IN (1, -1)),
-                       price    REAL  NOT NULL,
-                       quantity REAL  NOT NULL,
-                       tax      REAL DEFAULT 0,
-                       discount REAL DEFAULT 0,
-                       FOREIGN KEY (supplier_id) REFERENCES users (id),
-                       FOREIGN KEY (product_id) REFERENCES products (id)
-                   )
-                   """)
-
-    conn.commit()
-    print(f"Database {DB_FILE} initialized successfully.")
-
-# def close_connection():
-#     """Close the persistent connection when the app stops."""
-#     global conn
-#     if conn:
-#         conn.commit()
-#         conn.close()
-#         conn = None
+# sql.py
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from . import count_cache, metrics, row_cache, versions
+from .file_lock import file_lock
+from .hash import hash_password
+
+DB_FILE = "erp.db"
+
+# Seconds a connection waits on a locked database before raising "database is locked".
+# With several server processes this is how long a write waits for the others' writes.
+BUSY_TIMEOUT = float(os.getenv("ERP_BUSY_TIMEOUT", "5"))
+
+
+# Write lock of this process. SQLite only allows one writer at a time: across processes,
+# write_connection takes SQLite's own write lock (BEGIN IMMEDIATE, waiting up to BUSY_TIMEOUT);
+# the threads of one process queue here first, a lock handover being much quicker than
+# SQLite's busy retries. Reads never take it: in WAL mode they run concurrently with each
+# other and with the single writer.
+db_lock = threading.Lock()
+
+# -----------------------------
+# Per-thread connection pool
+# -----------------------------
+# Every worker thread (FastAPI runs sync handlers on a threadpool) gets its own
+# connection and cursor, so no cursor is ever shared between two requests.
+_local = threading.local()
+_connections: list[sqlite3.Connection] = []
+_connections_lock = threading.Lock()
+_db_file: str = DB_FILE
+
+
+def open_connection(name: str | None = None) -> sqlite3.Connection:
+    """
+    Open a new connection configured for concurrent access, outside the pool.
+    Defaults to the pool's database file. The caller closes it.
+    """
+    conn = sqlite3.connect(name or _db_file, timeout=BUSY_TIMEOUT, check_same_thread=False)
+    conn.row_factory = sqlite3.Row  # optional, dict-like access
+    conn.execute("PRAGMA journal_mode=WAL")  # readers don't block the writer and vice versa
+    conn.execute("PRAGMA synchronous=NORMAL")  # safe with WAL, one fsync per checkpoint instead of per commit
+    return conn
+
+
+def get_connection(name: str | None = None) -> tuple[sqlite3.Connection, sqlite3.Cursor]:
+    """
+    Return the connection and cursor owned by the calling thread.
+
+    Passing a name switches the pool to that database file; every later call
+    without a name (statement modules, init_db) uses the same file.
+    """
+    global _db_file
+    if name is not None:
+        _db_file = name
+
+    pool = getattr(_local, "pool", None)
+    if pool is None:
+        pool = _local.pool = {}
+
+    if _db_file not in pool:
+        conn = open_connection(_db_file)
+        pool[_db_file] = (conn, conn.cursor())
+        with _connections_lock:
+            _connections.append(conn)
+    conn, cursor = pool[_db_file]
+    _catch_up(conn)
+    return conn, cursor
+
+
+def _catch_up(conn: sqlite3.Connection):
+    """
+    Drop the cached counts and rows of the tables written by other connections (another server
+    process, or another thread here) since this connection last looked. PRAGMA data_version only
+    moves when another connection commits, so most calls stop after it.
+    """
+    seen = getattr(_local, "data_versions", None)
+    if seen is None:
+        seen = _local.data_versions = {}
+    # conn.execute: the thread's cursor may be in the middle of an export
+    data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+    if seen.get(_db_file) == data_version:
+        return
+    try:
+        versions.refresh(conn.execute("SELECT name, version FROM table_versions").fetchall())
+    except sqlite3.OperationalError:  # not created yet, init_db is running
+        return
+    seen[_db_file] = data_version
+
+
+def table_versions(*tables: str) -> str:
+    """Return a token that changes whenever one of the tables is written, e.g. "3f9a1c2e:12.4"."""
+    get_connection()  # catches up with the writes of other processes first
+    return versions.table_versions(*tables)
+
+
+# Tables that triggers write to when a table is written (see the inventory ledger below)
+TRIGGERED_WRITES: dict[str, tuple[str, ...]] = {
+    "transactions": ("products",),
+    "products": ("stock_inventory", "center_inventory"),
+    "stocks": ("center_inventory",),
+}
+
+
+def written_tables(tables: tuple[str, ...]) -> list[str]:
+    """Return `tables` plus every table their triggers write to."""
+    result: list[str] = []
+    pending = list(tables)
+    while pending:
+        table = pending.pop(0)
+        if table not in result:
+            result.append(table)
+            pending.extend(TRIGGERED_WRITES.get(table, ()))
+    return result
+
+
+@contextmanager
+def write_connection(*tables: str):
+    """
+    Hold the write lock and yield the thread's (conn, cursor).
+    Commits when the block exits normally, rolls back if it raises, so a failed
+    statement never leaves a transaction open on a pooled connection.
+    `tables` are the tables the block writes to; their versions, and those of the tables their
+    triggers write to, are bumped in the transaction and their cached totals and rows dropped
+    after the commit (other processes drop theirs when they see the new versions).
+    Single-statement writes go through write_queue.execute_write instead, committed in groups.
+    """
+    written = written_tables(tables)
+    waiting = time.perf_counter()
+    with db_lock:
+        conn, cursor = get_connection()
+        # Take SQLite's write lock up front: a transaction that reads first and writes later can
+        # fail at once with "database is locked" when another process wrote in between
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        metrics.lock_wait_seconds.observe(time.perf_counter() - waiting)
+        stored = {}
+        try:
+            yield conn, cursor
+            stored = versions.bump(conn, written)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            for table in written:
+                count_cache.invalidate(table)
+                row_cache.invalidate(table)
+            versions.advance(stored)
+
+
+def close_connections():
+    """Close every pooled connection (all threads). Call when the app stops."""
+    with _connections_lock:
+        for conn in _connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                pass
+        _connections.clear()
+    _local.__dict__.clear()
+
+
+# Columns indexed for the `filter` query parameter of each list endpoint
+FTS_COLUMNS: dict[str, list[str]] = {
+    "users": ["name"],
+    "suppliers": ["firstname", "lastname", "type"],
+    "centers": ["name", "city", "address", "phone", "email"],
+    "stocks": ["name", "city", "address"],
+    "products": ["name", "description"],
+    "transactions": ["supplier_id", "product_id", "date", "type", "price", "quantity", "tax", "discount"],
+}
+
+# Filtered columns an FTS5 index can't hold ("rank" is a reserved FTS5 column name): the filter
+# also matches a row whose value is the whole filter, compared on the table itself
+FTS_UNINDEXED_COLUMNS: dict[str, list[str]] = {
+    "users": ["rank"],
+}
+
+# Tables that have a <table>_fts shadow index, loaded lazily from sqlite_master
+_fts_tables: set[str] | None = None
+
+
+def create_fts_indexes(cursor: sqlite3.Cursor):
+    """
+    Create an external-content FTS5 table <table>_fts for every entity, kept in sync by triggers.
+    A newly created index is rebuilt from the existing rows. Skipped if SQLite has no FTS5.
+    """
+    global _fts_tables
+    _fts_tables = None
+    existing = {r[0] for r in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+    for table, columns in FTS_COLUMNS.items():
+        fts = f"{table}_fts"
+        cols = ", ".join(columns)
+        new_cols = ", ".join(f"new.{c}" for c in columns)
+        old_cols = ", ".join(f"old.{c}" for c in columns)
+        try:
+            cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{table}', "
+                           f"content_rowid='id')")
+        except sqlite3.OperationalError as e:
+            if "no such module" not in str(e):
+                raise
+            print("SQLite was built without FTS5, filters fall back to LIKE scans.")
+            return
+
+        cursor.execute(f"""
+                       CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+                           INSERT INTO {fts} (rowid, {cols}) VALUES (new.id, {new_cols});
+                       END
+                       """)
+        cursor.execute(f"""
+                       CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+                           INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+                       END
+                       """)
+        cursor.execute(f"""
+                       CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN
+                           INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+                           INSERT INTO {fts} (rowid, {cols}) VALUES (new.id, {new_cols});
+                       END
+                       """)
+        if fts not in existing:
+            cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+
+def fts_tables() -> set[str]:
+    """Return the entity tables that have a full-text index."""
+    global _fts_tables
+    if _fts_tables is None:
+        conn, cursor = get_connection()
+        names = {r[0] for r in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        _fts_tables = {t for t in FTS_COLUMNS if f"{t}_fts" in names}
+    return _fts_tables
+
+
+# -----------------------------
+# Inventory ledger
+# -----------------------------
+# A transaction moves stock: income (type 1, a sale) takes `quantity` units out of the
+# product, outcome (type -1, a purchase) puts them in. Triggers apply every insert,
+# update and delete of a transaction to products.quantity inside the same write, and
+# keep the per-stock and per-center rollups below in step with every product change.
+INVENTORY_COLUMNS = ["products", "units", "purchase_value", "sale_value"]
+
+
+def _add_to_rollup(table: str, key: str, select: str) -> str:
+    """Upsert statement adding the INVENTORY_COLUMNS of `select` (key first) to a rollup row."""
+    updates = ", ".join(f"{c} = {c} + excluded.{c}" for c in INVENTORY_COLUMNS)
+    return f"INSERT INTO {table} ({key}, {', '.join(INVENTORY_COLUMNS)}) {select} " \
+           f"ON CONFLICT ({key}) DO UPDATE SET {updates};"
+
+
+def _add_product(ref: str, sign: str) -> str:
+    """Add (sign "") or remove (sign "-") product row `ref` (new/old) from its stock and center rollups."""
+    values = f"{sign}1, {sign}{ref}.quantity, {sign}{ref}.quantity * {ref}.purchase_price, " \
+             f"{sign}{ref}.quantity * {ref}.sale_price"
+    return _add_to_rollup("stock_inventory", "stock_id", f"SELECT {ref}.stock_id, {values} WHERE true") + "\n" + \
+        _add_to_rollup("center_inventory", "center_id",
+                       f"SELECT center_id, {values} FROM stocks WHERE id = {ref}.stock_id")
+
+
+def _add_stock(ref: str, sign: str) -> str:
+    """Add or remove the stock_inventory totals of stock row `ref` to/from its center rollup."""
+    values = ", ".join(f"{sign}{c}" for c in INVENTORY_COLUMNS)
+    return _add_to_rollup("center_inventory", "center_id",
+                          f"SELECT {ref}.center_id, {values} FROM stock_inventory WHERE stock_id = {ref}.id")
+
+
+# Recompute both rollups from the products table
+INVENTORY_REBUILD: list[str] = [
+    "DELETE FROM stock_inventory",
+    "DELETE FROM center_inventory",
+    """INSERT INTO stock_inventory (stock_id, products, units, purchase_value, sale_value)
+       SELECT stock_id, COUNT(*), TOTAL(quantity), TOTAL(quantity * purchase_price), TOTAL(quantity * sale_price)
+       FROM products GROUP BY stock_id""",
+    """INSERT INTO center_inventory (center_id, products, units, purchase_value, sale_value)
+       SELECT s.center_id, SUM(i.products), TOTAL(i.units), TOTAL(i.purchase_value), TOTAL(i.sale_value)
+       FROM stock_inventory i JOIN stocks s ON s.id = i.stock_id GROUP BY s.center_id""",
+]
+
+INVENTORY_SCHEMA: list[str] = [
+    """CREATE TABLE IF NOT EXISTS stock_inventory
+       (
+           stock_id       INTEGER PRIMARY KEY,
+           products       INTEGER NOT NULL DEFAULT 0,
+           units          REAL    NOT NULL DEFAULT 0,
+           purchase_value REAL    NOT NULL DEFAULT 0,
+           sale_value     REAL    NOT NULL DEFAULT 0
+       )""",
+    """CREATE TABLE IF NOT EXISTS center_inventory
+       (
+           center_id      INTEGER PRIMARY KEY,
+           products       INTEGER NOT NULL DEFAULT 0,
+           units          REAL    NOT NULL DEFAULT 0,
+           purchase_value REAL    NOT NULL DEFAULT 0,
+           sale_value     REAL    NOT NULL DEFAULT 0
+       )""",
+    # Transactions -> products.quantity
+    """CREATE TRIGGER IF NOT EXISTS transactions_ledger_ai AFTER INSERT ON transactions BEGIN
+           UPDATE products SET quantity = quantity - new.type * new.quantity WHERE id = new.product_id;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS transactions_ledger_ad AFTER DELETE ON transactions BEGIN
+           UPDATE products SET quantity = quantity + old.type * old.quantity WHERE id = old.product_id;
+       END""",
+    # Same product: revert and apply in one UPDATE, so the rollups see a single change
+    """CREATE TRIGGER IF NOT EXISTS transactions_ledger_au AFTER UPDATE OF product_id, type, quantity ON transactions
+       BEGIN
+           UPDATE products SET quantity = quantity + old.type * old.quantity
+           WHERE id = old.product_id AND old.product_id <> new.product_id;
+           UPDATE products SET quantity = quantity - new.type * new.quantity
+               + CASE WHEN id = old.product_id THEN old.type * old.quantity ELSE 0 END
+           WHERE id = new.product_id;
+       END""",
+    # Products -> stock_inventory and center_inventory
+    f"""CREATE TRIGGER IF NOT EXISTS products_inventory_ai AFTER INSERT ON products BEGIN
+           {_add_product("new", "")}
+       END""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_inventory_ad AFTER DELETE ON products BEGIN
+           {_add_product("old", "-")}
+       END""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_inventory_au
+       AFTER UPDATE OF stock_id, quantity, purchase_price, sale_price ON products BEGIN
+           {_add_product("old", "-")}
+           {_add_product("new", "")}
+       END""",
+    # Stocks moving between centers
+    f"""CREATE TRIGGER IF NOT EXISTS stocks_inventory_ai AFTER INSERT ON stocks BEGIN
+           {_add_stock("new", "")}
+       END""",
+    f"""CREATE TRIGGER IF NOT EXISTS stocks_inventory_ad AFTER DELETE ON stocks BEGIN
+           {_add_stock("old", "-")}
+       END""",
+    f"""CREATE TRIGGER IF NOT EXISTS stocks_inventory_au AFTER UPDATE OF center_id ON stocks
+       WHEN old.center_id IS NOT new.center_id BEGIN
+           {_add_stock("old", "-")}
+           {_add_stock("new", "")}
+       END""",
+]
+
+# -----------------------------
+# Schema migrations
+# -----------------------------
+# MIGRATIONS[n] upgrades the schema from version n to n + 1, the current version is
+# stored in PRAGMA user_version. Statements must be idempotent. Append new
+# migrations at the end, never edit one that has already shipped.
+MIGRATIONS: list[list[str]] = [
+    # 1: indexes on the foreign-key and type-filter columns used by the list statements
+    [
+        "CREATE INDEX IF NOT EXISTS idx_transactions_supplier_id ON transactions (supplier_id)",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_product_id ON transactions (product_id)",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_type_date ON transactions (type, date)",
+        "CREATE INDEX IF NOT EXISTS idx_products_stock_id ON products (stock_id)",
+        "CREATE INDEX IF NOT EXISTS idx_stocks_center_id ON stocks (center_id)",
+        "CREATE INDEX IF NOT EXISTS idx_suppliers_type ON suppliers (type)",
+    ],
+    # 2: date ranges of the transaction summaries
+    [
+        "CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (date)",
+    ],
+    # 3: inventory ledger and rollups. Quantities recorded so far are kept as they are,
+    # only transactions posted from now on move them.
+    INVENTORY_SCHEMA + INVENTORY_REBUILD,
+    # 4: write versions shared by the server processes (see versions.py)
+    [
+        "CREATE TABLE IF NOT EXISTS table_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL) WITHOUT ROWID",
+    ],
+    # 5: yearly transaction archives (see archive.py). Moving a transaction to its archive must leave
+    # the stock it booked alone: the ledger's delete trigger stands aside while a year is `moving`.
+    [
+        """CREATE TABLE IF NOT EXISTS transaction_archives
+           (
+               year     INTEGER PRIMARY KEY,
+               rows     INTEGER NOT NULL DEFAULT 0,
+               first_id INTEGER,
+               last_id  INTEGER,
+               moving   INTEGER NOT NULL DEFAULT 0
+           )""",
+        "DROP TRIGGER IF EXISTS transactions_ledger_ad",
+        """CREATE TRIGGER transactions_ledger_ad AFTER DELETE ON transactions
+           WHEN NOT EXISTS (SELECT 1 FROM transaction_archives WHERE moving) BEGIN
+               UPDATE products SET quantity = quantity + old.type * old.quantity WHERE id = old.product_id;
+           END""",
+    ],
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(cursor: sqlite3.Cursor) -> int:
+    """Apply every migration newer than the database's user_version. Returns the resulting version."""
+    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+    for target, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.execute(f"PRAGMA user_version = {target}")
+        print(f"Database migrated to schema version {target}.")
+    return max(version, SCHEMA_VERSION)
+
+
+def init_db():
+    """
+    Initialize the database if it doesn't exist. Holds a lock file next to the database, so
+    processes starting together (or a launcher and a tool) create and migrate it one at a time.
+    """
+    with file_lock(_db_file + ".lock"):
+        _init_db()
+
+
+def _init_db():
+    conn, cursor = get_connection()
+
+    # A database at SCHEMA_VERSION already has every table, index and trigger below: a start
+    # only creates or migrates when it is behind. So a change to the CREATE statements of
+    # create_schema always ships with a migration, which sends every database through it again.
+    if cursor.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+        create_schema(cursor)
+
+    # Insert default Manager user only if table is empty, the one bcrypt hash a start may need
+    if cursor.execute("SELECT 1 FROM users LIMIT 1").fetchone() is None:
+        cursor.execute("""
+                       INSERT INTO users (name, username, password, rank)
+                       VALUES (?, ?, ?, ?)
+                       """, ("Admin", "Manager", hash_password("123456789"), 3))
+
+    # New epoch for this start: ETags handed out before it never match again (see versions.py)
+    cursor.execute("INSERT OR REPLACE INTO table_versions (name, version) VALUES (?, abs(random() % 4294967296))",
+                   (versions.EPOCH_ROW,))
+    conn.commit()
+    versions.refresh(cursor.execute("SELECT name, version FROM table_versions").fetchall())
+    print(f"Database {_db_file} initialized successfully.")
+
+
+def create_schema(cursor: sqlite3.Cursor):
+    """Create the missing tables and full-text indexes, then apply the pending migrations."""
+    # -----------------------------
+    # Users table
+    # -----------------------------
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS users
+                   (
+                       id       INTEGER PRIMARY KEY AUTOINCREMENT,
+                       name     TEXT NOT NULL,
+                       username TEXT NOT NULL UNIQUE,
+                       password TEXT NOT NULL,
+                       rank     INTEGER DEFAULT 1
+                   )
+                   """)
+
+    # -----------------------------
+    # Suppliers table
+    # -----------------------------
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS suppliers
+                   (
+                       id            INTEGER PRIMARY KEY AUTOINCREMENT,
+                       firstname     TEXT NOT NULL,
+                       lastname      TEXT NOT NULL,
+                       type          TEXT NOT NULL CHECK (type IN ('provider', 'consumer', 'both')),
+                       contract_date DATE NOT NULL
+                   )
+                   """)
+
+    # -----------------------------
+    # Centers table
+    # -----------------------------
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS centers
+                   (
+                       id      INTEGER PRIMARY KEY AUTOINCREMENT,
+                       name    TEXT NOT NULL,
+                       city    TEXT NOT NULL,
+                       address TEXT NOT NULL,
+                       phone   TEXT,
+                       email   TEXT
+                   )
+                   """)
+
+    # -----------------------------
+    # Stocks table  #ON DELETE CASCADE
+    # -----------------------------
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS stocks
+                   (
+                       id        INTEGER PRIMARY KEY AUTOINCREMENT,
+                       name      TEXT    NOT NULL,
+                       city      TEXT    NOT NULL,
+                       address   TEXT    NOT NULL,
+                       center_id INTEGER NOT NULL,
+                       FOREIGN KEY (center_id) REFERENCES centers (id)
+                   )
+                   """)
+
+    # -----------------------------
+    # Products table
+    # -----------------------------
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS products
+                   (
+                       id             INTEGER PRIMARY KEY AUTOINCREMENT,
+                       name           TEXT    NOT NULL,
+                       description    TEXT,
+                       stock_id       INTEGER NOT NULL,
+                       quantity       REAL DEFAULT 0,
+                       expiration_date     DATE    NOT NULL,
+                       purchase_price REAL DEFAULT 0,
+                       sale_price     REAL DEFAULT 0,
+                       FOREIGN KEY (stock_id) REFERENCES stocks (id)
+                   )
+                   """)
+
+    # -----------------------------
+    # Transactions table
+    # -----------------------------
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS transactions
+                   (
+                       id       INTEGER PRIMARY KEY AUTOINCREMENT,
+                       supplier_id  INTEGER  NOT NULL,
+                       date     DATETIME NOT NULL,
+                       product_id  INTEGER NOT NULL,
+                       type     INTEGER  NOT NULL CHECK (type IN (1, -1)),
+                       price    REAL  NOT NULL,
+                       quantity REAL  NOT NULL,
+                       tax      REAL DEFAULT 0,
+                       discount REAL DEFAULT 0,
+                       FOREIGN KEY (supplier_id) REFERENCES users (id),
+                       FOREIGN KEY (product_id) REFERENCES products (id)
+                   )
+                   """)
+
+    # -----------------------------
+    # Full-text search indexes
+    # -----------------------------
+    create_fts_indexes(cursor)
+
+    # -----------------------------
+    # Secondary indexes and later schema changes
+    # -----------------------------
+    migrate(cursor)
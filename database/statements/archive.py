@@ -0,0 +1,216 @@
+# archive.py
+# Yearly partitions of the transactions table. A closed year can be moved out of `transactions`
+# (archive_transactions in transaction_statements.py) into its own SQLite file, one per year,
+# listed in the transaction_archives table of the main database. The transactions table keeps
+# the current year (and anything posted later for an archived year), so the day-to-day lists
+# never read the history. A query with a date range reads the archives it overlaps, ATTACHed
+# to the connection on demand, through a UNION ALL of the live table and those archives.
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+
+from .. import open_connection, sql
+from ..slow_queries import fetch_all
+from .batch import fetch_by_ids
+
+# Folder of the archive files, by default "<database name>-archive" next to the database
+ARCHIVE_DIR = os.getenv("ERP_ARCHIVE_DIR")
+
+# TEMP VIEW of every connection reading all the archives: the live table and every archived year
+ALL_TRANSACTIONS = "all_transactions"
+
+
+def archive_path(conn: sqlite3.Connection, year: int) -> str:
+    """File holding the archived transactions of `year` for the database of `conn`."""
+    main_file = next(r[2] for r in conn.execute("PRAGMA database_list") if r[1] == "main")
+    folder = ARCHIVE_DIR or os.path.splitext(main_file)[0] + "-archive"
+    return os.path.join(folder, f"transactions-{year}.db")
+
+
+def schema(year: int) -> str:
+    """Name the archive of `year` is ATTACHed under."""
+    return f"archive_{year}"
+
+
+def year_range(year: int) -> tuple[str, str]:
+    """Bounds of a year for the date column: date >= first AND date < second."""
+    return f"{year:04d}-01-01", f"{year + 1:04d}-01-01"
+
+
+def archived_years(cursor: sqlite3.Cursor) -> list[int]:
+    """Years moved to an archive, oldest first."""
+    return [r[0] for r in fetch_all(cursor, "SELECT year FROM transaction_archives ORDER BY year")]
+
+
+def touched_years(years: list[int], date_from: Optional[datetime], date_to: Optional[datetime]) -> list[int]:
+    """The archived years overlapping [date_from, date_to), either end open when None."""
+    first = date_from.year if date_from is not None else None
+    last = (date_to - timedelta(microseconds=1)).year if date_to is not None else None
+    return [y for y in years if (first is None or y >= first) and (last is None or y <= last)]
+
+
+def check_range(cursor: sqlite3.Cursor, date_from: Optional[datetime], date_to: Optional[datetime]):
+    """ValueError when [date_from, date_to) overlaps more archived years than a query can attach."""
+    years = touched_years(archived_years(cursor), date_from, date_to)
+    limit = cursor.connection.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    if len(years) > limit:
+        raise ValueError(f"The date range covers {len(years)} archived years, at most {limit} can be read at once")
+
+
+def attach(conn: sqlite3.Connection, years: list[int], create: bool = False):
+    """
+    ATTACH the archives of `years` to the connection, if they aren't yet. Archives attached for an
+    earlier query are detached when SQLite's limit of attached databases needs the room.
+    Must run outside a transaction. ValueError when `years` alone are over that limit.
+    """
+    attached = {r[1] for r in conn.execute("PRAGMA database_list")}
+    wanted = {schema(y) for y in years}
+    missing = [y for y in years if schema(y) not in attached]
+    if not missing:
+        return
+    limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    if len(wanted) > limit:
+        raise ValueError(f"The date range covers {len(wanted)} archived years, at most {limit} can be read at once")
+    in_use = [name for name in attached if name.startswith("archive_")]
+    if len(in_use) + len(missing) > limit:
+        conn.execute(f"DROP VIEW IF EXISTS temp.{ALL_TRANSACTIONS}")  # it may read an archive detached below
+        for name in in_use:
+            if name not in wanted and len(in_use) + len(missing) > limit:
+                conn.execute(f"DETACH DATABASE {name}")
+                in_use.remove(name)
+    for year in missing:
+        path = archive_path(conn, year)
+        if not create and not os.path.isfile(path):
+            raise sqlite3.OperationalError(f"Archive of {year} not found: {path}")
+        conn.execute(f"ATTACH DATABASE ? AS {schema(year)}", (path,))
+
+
+def detach_all(conn: sqlite3.Connection):
+    """
+    DETACH every archive of the connection. BEGIN IMMEDIATE takes the write lock of each attached
+    database, so a connection about to hold it while copy_year writes an archive must not keep one.
+    """
+    conn.execute(f"DROP VIEW IF EXISTS temp.{ALL_TRANSACTIONS}")
+    for row in conn.execute("PRAGMA database_list").fetchall():
+        if row[1].startswith("archive_"):
+            conn.execute(f"DETACH DATABASE {row[1]}")
+
+
+# Same columns, in the same order, as the transactions table: the archives are read with SELECT *
+# in a UNION ALL with it. Ids are copied, not generated.
+ARCHIVE_SCHEMA: list[str] = [
+    """CREATE TABLE IF NOT EXISTS {schema}.transactions
+       (
+           id          INTEGER PRIMARY KEY,
+           supplier_id INTEGER  NOT NULL,
+           date        DATETIME NOT NULL,
+           product_id  INTEGER  NOT NULL,
+           type        INTEGER  NOT NULL,
+           price       REAL     NOT NULL,
+           quantity    REAL     NOT NULL,
+           tax         REAL DEFAULT 0,
+           discount    REAL DEFAULT 0
+       )""",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_transactions_supplier_id ON transactions (supplier_id)",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_transactions_product_id ON transactions (product_id)",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_transactions_type_date ON transactions (type, date)",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_transactions_date ON transactions (date)",
+]
+
+
+def copy_year(year: int) -> tuple[int, int | None, int | None]:
+    """
+    Copy the transactions of `year` from the transactions table into its archive file (created if
+    needed, rows already there replaced by their current version) and commit the archive.
+    Runs on a connection of its own that only writes the archive file, so it works while the caller
+    holds the write lock of the main database: nothing can change the year between this copy and
+    the caller's DELETE. Returns the archive's row count, lowest and highest id.
+    """
+    conn = open_connection()
+    try:
+        os.makedirs(os.path.dirname(archive_path(conn, year)), exist_ok=True)
+        attach(conn, [year], create=True)
+        name = schema(year)
+        # as the main database: the connections reading the archive don't block this copy
+        conn.execute(f"PRAGMA {name}.journal_mode=WAL")
+        conn.execute(f"PRAGMA {name}.synchronous=NORMAL")
+        for statement in ARCHIVE_SCHEMA:
+            conn.execute(statement.format(schema=name))
+        conn.execute(f"INSERT OR REPLACE INTO {name}.transactions SELECT * FROM main.transactions "
+                     f"WHERE date >= ? AND date < ?", year_range(year))
+        if "transactions" in sql.fts_tables():
+            columns = ", ".join(sql.FTS_COLUMNS["transactions"])
+            conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {name}.transactions_fts USING fts5({columns}, "
+                         f"content='transactions', content_rowid='id')")
+            conn.execute(f"INSERT INTO {name}.transactions_fts (transactions_fts) VALUES ('rebuild')")
+        stats = conn.execute(f"SELECT COUNT(*), MIN(id), MAX(id) FROM {name}.transactions").fetchone()
+        conn.commit()
+        return tuple(stats)
+    finally:
+        conn.close()
+
+
+def _union(years: list[int]) -> str:
+    return " UNION ALL ".join(["SELECT * FROM main.transactions"] +
+                              [f"SELECT * FROM {schema(y)}.transactions" for y in years])
+
+
+def union_source(conn: sqlite3.Connection, years: list[int]) -> str:
+    """ATTACH the archives of `years` and return the FROM expression reading them with the transactions table."""
+    attach(conn, years)
+    return f"({_union(years)})"
+
+
+def transactions_source(cursor: sqlite3.Cursor, date_from: Optional[datetime] = None,
+                        date_to: Optional[datetime] = None) -> tuple[str, list[int]]:
+    """
+    What a query on transactions between date_from and date_to (both None: all of them) reads:
+    "transactions" alone when no archived year overlaps, the all_transactions view when they all
+    do, otherwise a UNION ALL of the live table and the archives overlapping. SQLite pushes the
+    WHERE clause down into each part, so every one still uses its own indexes.
+    Returns the FROM expression and the archived years it reads.
+    """
+    archived = archived_years(cursor)
+    years = touched_years(archived, date_from, date_to)
+    if not years:
+        return "transactions", []
+    conn = cursor.connection
+    if len(years) < len(archived):
+        return union_source(conn, years), years
+    attach(conn, years)
+    view = f"CREATE VIEW {ALL_TRANSACTIONS} AS {_union(years)}"
+    row = conn.execute("SELECT sql FROM temp.sqlite_master WHERE name = ?", (ALL_TRANSACTIONS,)).fetchone()
+    if row is None or row[0] != view:
+        conn.execute(f"DROP VIEW IF EXISTS temp.{ALL_TRANSACTIONS}")
+        conn.execute(view.replace("CREATE VIEW", "CREATE TEMP VIEW", 1))
+    return ALL_TRANSACTIONS, years
+
+
+def partial_sources(cursor: sqlite3.Cursor, date_from: Optional[datetime] = None,
+                    date_to: Optional[datetime] = None) -> Iterator[str]:
+    """
+    FROM expressions that together read every transaction between date_from and date_to, for an
+    aggregate summed back from its parts: transactions_source() alone when the archives overlapping
+    fit in one query, otherwise the live table, then each archive in turn (attached when reached).
+    """
+    years = touched_years(archived_years(cursor), date_from, date_to)
+    if len(years) <= cursor.connection.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED):
+        yield transactions_source(cursor, date_from, date_to)[0]
+        return
+    yield "main.transactions"
+    for year in years:
+        attach(cursor.connection, [year])
+        yield f"{schema(year)}.transactions"
+
+
+def archived_rows(cursor: sqlite3.Cursor, ids: list[int]) -> list[sqlite3.Row]:
+    """Archived transactions whose id is in `ids`, looked up in the archives whose id range holds one."""
+    rows: list[sqlite3.Row] = []
+    archives = fetch_all(cursor, "SELECT year, first_id, last_id FROM transaction_archives WHERE rows > 0")
+    for year, first_id, last_id in archives:
+        wanted = [i for i in ids if first_id <= i <= last_id]
+        if wanted:
+            attach(cursor.connection, [year])
+            rows.extend(fetch_by_ids(cursor, f"{schema(year)}.transactions", wanted))
+    return rows
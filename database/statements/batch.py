@@ -0,0 +1,15 @@
+# batch.py
+import json
+import sqlite3
+
+from ..slow_queries import fetch_all
+
+
+def fetch_by_ids(cursor: sqlite3.Cursor, table: str, ids: list[int]) -> list[sqlite3.Row]:
+    """
+    Rows of a table whose id is in `ids`, in a single primary-key lookup query whatever their number.
+    The ids go in as one JSON array parameter: the SQL text, and so SQLite's prepared statement, is the
+    same for every batch, and there is no limit on the number of bound variables to stay under.
+    """
+    return fetch_all(cursor, f"SELECT * FROM {table} WHERE id IN (SELECT value FROM json_each(?))",
+                     (json.dumps(ids),))
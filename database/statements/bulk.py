@@ -0,0 +1,76 @@
+# bulk.py
+import sqlite3
+
+from .. import write_connection
+
+
+def _sequence(cursor: sqlite3.Cursor, table: str) -> int:
+    """Return the last AUTOINCREMENT id handed out for a table."""
+    row = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+    return row[0] if row else 0
+
+
+def bulk_upsert(table: str, columns: list[str], records: list[tuple[int | None, tuple]]) \
+        -> list[tuple[int | None, str | None]]:
+    """
+    Write many rows of one table in a single transaction (one lock, one commit).
+    - records: (id, values) pairs, values ordered like `columns`.
+      Records without an id are inserted, records with an id are inserted or updated (upsert).
+
+    The whole batch first goes through executemany. If any row fails, the batch is
+    rolled back and replayed row by row under savepoints, so the valid rows are still
+    written and every failing row gets its own error.
+
+    Returns one (id, error) pair per record, in input order.
+    """
+    cols = ", ".join(columns)
+    marks = ", ".join("?" * len(columns))
+    updates = ", ".join(f"{c} = excluded.{c}" for c in columns)
+    insert_sql = f"INSERT INTO {table} ({cols}) VALUES ({marks})"
+    upsert_sql = f"INSERT INTO {table} (id, {cols}) VALUES (?, {marks}) ON CONFLICT (id) DO UPDATE SET {updates}"
+
+    inserts = [i for i, (record_id, _) in enumerate(records) if record_id is None]
+    upserts = [i for i, (record_id, _) in enumerate(records) if record_id is not None]
+
+    with write_connection(table) as (conn, cursor):
+        # Open the transaction explicitly, an outermost savepoint would commit on RELEASE
+        if not conn.in_transaction:
+            cursor.execute("BEGIN")
+
+        # Fast path: two executemany calls
+        cursor.execute("SAVEPOINT bulk")
+        try:
+            last_id = _sequence(cursor, table)
+            cursor.executemany(insert_sql, [records[i][1] for i in inserts])
+            # We hold the write lock, so the new rows are exactly the ids above the old sequence
+            new_ids = [r[0] for r in cursor.execute(f"SELECT id FROM {table} WHERE id > ? ORDER BY id", (last_id,))]
+            cursor.executemany(upsert_sql, [(records[i][0], *records[i][1]) for i in upserts])
+            cursor.execute("RELEASE bulk")
+
+            results: list[tuple[int | None, str | None]] = [(None, None)] * len(records)
+            for i, new_id in zip(inserts, new_ids):
+                results[i] = (new_id, None)
+            for i in upserts:
+                results[i] = (records[i][0], None)
+            return results
+        except sqlite3.Error:
+            cursor.execute("ROLLBACK TO bulk")
+            cursor.execute("RELEASE bulk")
+
+        # Slow path: one savepoint per row to find which ones fail
+        results = []
+        for record_id, values in records:
+            cursor.execute("SAVEPOINT bulk_row")
+            try:
+                if record_id is None:
+                    cursor.execute(insert_sql, values)
+                    results.append((cursor.lastrowid, None))
+                else:
+                    cursor.execute(upsert_sql, (record_id, *values))
+                    results.append((record_id, None))
+                cursor.execute("RELEASE bulk_row")
+            except sqlite3.Error as e:
+                cursor.execute("ROLLBACK TO bulk_row")
+                cursor.execute("RELEASE bulk_row")
+                results.append((None, str(e)))
+        return results
@@ -1,85 +1,113 @@
-# center_statements.py
-from typing import Optional
-
-from .. import get_connection, db_lock
-from entities import Center, HttpListResponse
-
-
-def add_center(center: Center) -> int:
-    with db_lock:
-        conn, cursor = get_connection()
-        cursor.execute("""
-                       INSERT INTO centers (name, city, address, phone, email)
-                       VALUES (?, ?, ?, ?, ?)
-                       """, (center.name, center.city, center.address, center.phone, center.email))
-        conn.commit()
-        return cursor.lastrowid
-
-
-def update_center(center: Center) -> int:
-    """
-    Update an existing center in the database.
-    Returns the number of rows affected.
-    """
-    with db_lock:
-        if center.id is None:
-            raise ValueError("Center ID must be provided for update")
-
-        conn, cursor = get_connection()
-        cursor.execute("""
-                       UPDATE centers
-                       SET name    = ?,
-                           city    = ?,
-                           address = ?,
-                           phone   = ?,
-                           email   = ?
-                       WHERE id = ?
-                       """, (center.name, center.city, center.address, center.phone, center.email, center.id))
-        conn.commit()
-
-        return cursor.rowcount  # number of rows updated
-
-
-def delete_center(center_id: int) -> bool:
-    with db_lock:
-        conn, cursor = get_connection()
-        cursor.execute("DELETE FROM centers WHERE id = ?", (center_id,))
-        conn.commit()
-        return cursor.rowcount > 0  # True if a row was deleted. cursor.rowcount gives the number of affected rows
-
-
-def get_center(center_id: int) -> Center | None:
-    with db_lock:
-        conn, cursor = get_connection()
-        cursor.execute("SELECT * FROM centers WHERE id = ?", (center_id,))
-        row = cursor.fetchone()
-        return Center(**dict(
-            row)) if row else None  # **dict(r) unpacks the row dictionary from SQLite into keyword arguments for the class constructor.
-
-
-def list_centers(offset: int, limit: int, filter: Optional[str] = None) -> HttpListResponse[Center]:
-    """
-    Retrieve all centers with optional filtering.
-    """
-    with db_lock:
-        conn, cursor = get_connection()
-        filter_expr = "(name || ' ' || city || ' ' || address || ' ' || phone || ' ' || email)"
-        params: list = []
-        query = "SELECT * FROM centers"
-        count_query = "SELECT COUNT(*) FROM centers"
-
-        if filter:
-            query += f" WHERE {filter_expr} LIKE ?"
-            count_query += f" WHERE {filter_expr} LIKE ?"
-            params.append(f"%{filter}%")
-
-        total = cursor.execute(count_query, params).fetchone()[0]
-
-        if limit >= 0:
-            query += " LIMIT ? OFFSET ?"
-            params.extend([limit, offset])
-
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        centers = [Center(**dict(r)) for r in rows]
-        return HttpListResponse[Center](total=total, body=centers)
+# center_statements.py
+from typing import Iterator, Optional
+
+from .. import get_connection
+from ..write_queue import Write, deleted, lastrowid, queued_write, rowcount
+from ..row_cache import cached, cached_many
+from .batch import fetch_by_ids
+from .bulk import bulk_upsert
+from .export import export_rows
+from .fast_json import encode_page
+from .pagination import paginate, CountMode
+from .search import filter_clause
+from entities import Center, HttpListResponse
+
+
+@queued_write
+def add_center(center: Center) -> Write[int]:
+    return Write("centers", """
+                 INSERT INTO centers (name, city, address, phone, email)
+                 VALUES (?, ?, ?, ?, ?)
+                 """, (center.name, center.city, center.address, center.phone, center.email), lastrowid)
+
+
+@queued_write
+def update_center(center: Center) -> Write[int]:
+    """
+    Update an existing center in the database.
+    Returns the number of rows affected.
+    """
+    if center.id is None:
+        raise ValueError("Center ID must be provided for update")
+
+    return Write("centers", """
+                 UPDATE centers
+                 SET name    = ?,
+                     city    = ?,
+                     address = ?,
+                     phone   = ?,
+                     email   = ?
+                 WHERE id = ?
+                 """,
+                 (center.name, center.city, center.address, center.phone, center.email, center.id), rowcount)
+
+
+@queued_write
+def delete_center(center_id: int) -> Write[bool]:
+    return Write("centers", "DELETE FROM centers WHERE id = ?", (center_id,), deleted)
+
+
+CENTER_COLUMNS: list[str] = ["name", "city", "address", "phone", "email"]
+
+
+def upsert_centers(centers: list[Center]) -> list[tuple[int | None, str | None]]:
+    """
+    Insert centers without an id and insert-or-update those with one, in a single transaction.
+    Returns one (id, error) pair per center, in input order.
+    """
+    return bulk_upsert("centers", CENTER_COLUMNS,
+                       [(r.id, tuple(getattr(r, c) for c in CENTER_COLUMNS)) for r in centers])
+
+
+@cached("centers")
+def get_center(center_id: int) -> Center | None:
+    conn, cursor = get_connection()
+    cursor.execute("SELECT * FROM centers WHERE id = ?", (center_id,))
+    row = cursor.fetchone()
+    return Center(**dict(
+        row)) if row else None  # **dict(r) unpacks the row dictionary from SQLite into keyword arguments for the class constructor.
+
+
+@cached_many("centers")
+def get_centers(center_ids: list[int]) -> list[Center]:
+    """Centers whose id is in center_ids, read in one query (the unknown ids are left out)."""
+    conn, cursor = get_connection()
+    return [Center(**dict(r)) for r in fetch_by_ids(cursor, "centers", center_ids)]
+
+
+CENTER_FILTER_EXPR: str = "(name || ' ' || city || ' ' || address || ' ' || phone || ' ' || email)"
+
+
+def list_centers(offset: int, limit: int, filter: Optional[str] = None, after: Optional[int] = None,
+                 before: Optional[int] = None, count: CountMode = "exact",
+                 as_json: bool = False) -> HttpListResponse[Center] | bytes:
+    """
+    Retrieve all centers with optional filtering.
+    """
+    conn, cursor = get_connection()
+    where_clauses: list[str] = []
+    params: list = []
+
+    if filter:
+        clause, clause_params = filter_clause("centers", filter, CENTER_FILTER_EXPR)
+        where_clauses.append(clause)
+        params.extend(clause_params)
+
+    total, rows, next_cursor = paginate(cursor, "centers", where_clauses, params, offset, limit, after, before, count)
+    if as_json:
+        return encode_page(Center, total, rows, next_cursor)
+    centers = [Center(**dict(r)) for r in rows]
+    return HttpListResponse[Center](total=total, body=centers, next_cursor=next_cursor)
+
+
+def export_centers(filter: Optional[str] = None) -> Iterator[list[Center]]:
+    """Stream every center matching the filter, in id order, one chunk of Center objects at a time."""
+    where_clauses: list[str] = []
+    params: list = []
+    if filter:
+        clause, clause_params = filter_clause("centers", filter, CENTER_FILTER_EXPR)
+        where_clauses.append(clause)
+        params.extend(clause_params)
+
+    for rows in export_rows("centers", where_clauses, params):
+        yield [Center(**dict(r)) for r in rows]
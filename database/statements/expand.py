@@ -0,0 +1,109 @@
+# expand.py
+import sqlite3
+from typing import NamedTuple, Optional
+
+from pydantic import BaseModel
+
+from .fast_json import encode_page
+from .search import filter_clause
+from entities import HttpListResponse
+
+
+class Relation(NamedTuple):
+    """A many-to-one relation of a listed table, resolved into a nested object by ?expand=<name>."""
+    name: str  # expand= value, field of the expanded model and alias of the joined table
+    table: str
+    model: type[BaseModel]
+    foreign_key: str  # column holding the related id, in the listed table or in the table of `via`
+    filter_expr: str  # LIKE expression of the related table, used when it has no FTS index
+    via: Optional["Relation"] = None  # relation it is reached through (the center of a product: its stock's)
+
+
+def expand_relations(relations: dict[str, Relation], expand: Optional[list[str]]) -> list[Relation]:
+    """The relations named by expand=, in the order asked. ValueError for a name the list doesn't have."""
+    result: list[Relation] = []
+    for name in expand or ():
+        if name not in relations:
+            raise ValueError(f"Cannot expand {name!r}, choose among {', '.join(relations)}")
+        if relations[name] not in result:
+            result.append(relations[name])
+    return result
+
+
+def relation_tables(relations: dict[str, Relation], expand: Optional[list[str]]) -> list[str]:
+    """Tables an expanded page reads besides its own, unknown names ignored (for the ETag)."""
+    tables: list[str] = []
+    for name in expand or ():
+        relation = relations.get(name)
+        while relation is not None:
+            if relation.table not in tables:
+                tables.append(relation.table)
+            relation = relation.via
+    return tables
+
+
+def _owner_ids(relation: Relation, ids_sql: str) -> str:
+    """Clause on the listed table selecting the rows whose `relation` row id is in the `ids_sql` subquery."""
+    while relation.via is not None:
+        ids_sql = f"SELECT id FROM {relation.via.table} WHERE {relation.foreign_key} IN ({ids_sql})"
+        relation = relation.via
+    return f"{relation.foreign_key} IN ({ids_sql})"
+
+
+def related_filter_clause(clause: str, params: list, filter: str, relations: list[Relation]) -> tuple[str, list]:
+    """
+    Widen the `filter` clause of a list to its expanded relations: a row matches when its own columns
+    match or those of one of its related rows do (transactions whose product is named "milk").
+    The related rows are found through their own FTS index, then the foreign-key index of the list.
+    """
+    clauses = [clause]
+    params = list(params)
+    for relation in relations:
+        related, related_params = filter_clause(relation.table, filter, relation.filter_expr)
+        clauses.append(_owner_ids(relation, f"SELECT id FROM {relation.table} WHERE {related}"))
+        params.extend(related_params)
+    return "(" + " OR ".join(clauses) + ")", params
+
+
+def join_page(page_query: str, relations: list[Relation], descending: bool = False) -> str:
+    """
+    Wrap the page query of paginate() in a single query that LEFT JOINs the related rows: the page is
+    cut first, exactly as without expand, then each relation costs one primary-key lookup per row.
+    Related columns come out as "<relation>.<column>", all NULL when the related row is missing.
+    """
+    joins: list[str] = []
+    joined: list[Relation] = []
+
+    def join(relation: Relation):
+        if relation in joined:
+            return
+        owner = "page"
+        if relation.via is not None:
+            join(relation.via)
+            owner = relation.via.name
+        joins.append(f"LEFT JOIN {relation.table} AS {relation.name} "
+                     f"ON {relation.name}.id = {owner}.{relation.foreign_key}")
+        joined.append(relation)
+
+    columns = ["page.*"]
+    for relation in relations:
+        join(relation)
+        columns.extend(f'{relation.name}.{c} AS "{relation.name}.{c}"' for c in relation.model.model_fields)
+    return (f"SELECT {', '.join(columns)} FROM ({page_query}) AS page {' '.join(joins)} "
+            f"ORDER BY page.id {'DESC' if descending else 'ASC'}")
+
+
+def nested(row: sqlite3.Row, relation: Relation) -> BaseModel | None:
+    """The related object of a row of join_page(), None when the related row is missing."""
+    if row[f"{relation.name}.id"] is None:
+        return None
+    return relation.model(**{c: row[f"{relation.name}.{c}"] for c in relation.model.model_fields})
+
+
+def expanded_page(model: type[BaseModel], total: int | None, rows: list[sqlite3.Row], next_cursor: int | None,
+                  relations: list[Relation], as_json: bool) -> HttpListResponse | bytes:
+    """A page of join_page() rows as HttpListResponse[model] (an Expanded* entity), or its JSON encoding."""
+    if as_json:
+        return encode_page(model, total, rows, next_cursor, tuple(r.name for r in relations))
+    items = [model(**dict(r), **{relation.name: nested(r, relation) for relation in relations}) for r in rows]
+    return HttpListResponse[model](total=total, body=items, next_cursor=next_cursor)
@@ -0,0 +1,30 @@
+# export.py
+import sqlite3
+from typing import Callable, Iterator, Optional
+
+from .. import open_connection
+
+# Rows fetched from SQLite per chunk while streaming an export
+EXPORT_FETCH_SIZE = 1000
+
+
+def export_rows(table: str, where_clauses: list[str], params: list,
+                source: Optional[Callable[[sqlite3.Connection], str]] = None) -> Iterator[list[sqlite3.Row]]:
+    """
+    Yield every row of a table matching the WHERE clauses, in id order, EXPORT_FETCH_SIZE rows at a time.
+
+    Runs on its own connection: a streaming response is resumed on whichever worker
+    thread is free, so it can't hold a cursor of the per-thread pool. The single
+    SELECT also gives the export one consistent snapshot under WAL.
+    `source`, called with that connection, returns what to read instead of the table (the
+    transactions table with some of its archives, see archive.py).
+    """
+    where_sql = " WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+    conn = open_connection()
+    try:
+        from_sql = source(conn) if source is not None else table
+        cursor = conn.execute(f"SELECT * FROM {from_sql}{where_sql} ORDER BY id", params)
+        while rows := cursor.fetchmany(EXPORT_FETCH_SIZE):
+            yield rows
+    finally:
+        conn.close()
@@ -0,0 +1,51 @@
+# inventory_statements.py
+from typing import Optional
+
+from .. import get_connection, write_connection
+from ..slow_queries import fetch_all
+from ..sql import INVENTORY_REBUILD
+from entities import StockInventory, CenterInventory
+
+
+def list_stock_inventory(center_id: Optional[int] = None) -> list[StockInventory]:
+    """Return the inventory totals of every stock, or of the stocks of one center."""
+    conn, cursor = get_connection()
+    if center_id is None:
+        rows = fetch_all(cursor, "SELECT * FROM stock_inventory ORDER BY stock_id")
+    else:
+        rows = fetch_all(cursor, """
+                       SELECT i.*
+                       FROM stock_inventory i
+                                JOIN stocks s ON s.id = i.stock_id
+                       WHERE s.center_id = ?
+                       ORDER BY i.stock_id
+                       """, (center_id,))
+    return [StockInventory(**dict(r)) for r in rows]
+
+
+def get_stock_inventory(stock_id: int) -> StockInventory | None:
+    conn, cursor = get_connection()
+    cursor.execute("SELECT * FROM stock_inventory WHERE stock_id = ?", (stock_id,))
+    row = cursor.fetchone()
+    return StockInventory(**dict(row)) if row else None
+
+
+def list_center_inventory() -> list[CenterInventory]:
+    """Return the inventory totals of every center."""
+    conn, cursor = get_connection()
+    rows = fetch_all(cursor, "SELECT * FROM center_inventory ORDER BY center_id")
+    return [CenterInventory(**dict(r)) for r in rows]
+
+
+def get_center_inventory(center_id: int) -> CenterInventory | None:
+    conn, cursor = get_connection()
+    cursor.execute("SELECT * FROM center_inventory WHERE center_id = ?", (center_id,))
+    row = cursor.fetchone()
+    return CenterInventory(**dict(row)) if row else None
+
+
+def rebuild_inventory():
+    """Recompute both rollups from the products table (the triggers keep them current, this is for repairs)."""
+    with write_connection("stock_inventory", "center_inventory") as (conn, cursor):
+        for statement in INVENTORY_REBUILD:
+            cursor.execute(statement)
@@ -0,0 +1,113 @@
+# pagination.py
+import sqlite3
+from typing import Literal, Optional
+
+from .. import count_cache, metrics
+from ..slow_queries import fetch_all
+from .expand import Relation, join_page
+
+CountMode = Literal["exact", "estimate", "none"]
+
+
+def count_rows(cursor: sqlite3.Cursor, table: str, where_sql: str, params: list,
+               count: CountMode = "exact", cache: bool = True, source: Optional[str] = None) -> int | None:
+    """
+    Return the total for a table/filter without re-counting when nothing changed.
+
+    - exact: cached total, or COUNT(*) on a miss (the cache is dropped by every write to the table).
+    - estimate: cached total if any; otherwise MAX(id) - MIN(id) + 1 for an unfiltered table (two
+      index lookups). Rows deleted from either end (archived transactions are the oldest ones) are
+      left out, but the ids of rows deleted in between still count: it is an upper bound, exact only
+      when the ids left are contiguous. Filtered queries fall back to an exact count.
+    - none: no count at all, total is None. Meant for infinite-scroll clients.
+
+    `cache` is False when the filter also reads other tables (see expand.py): their writes don't
+    drop this table's totals, so such a total is always counted.
+    `source` is the FROM expression to count instead of the table itself (archived partitions of
+    transactions, see archive.py); its totals are cached with the table's.
+    """
+    if count == "none":
+        return None
+    source = source or table
+    if not cache:
+        return fetch_all(cursor, f"SELECT COUNT(*) FROM {source}{where_sql}", params)[0][0]
+
+    key = (where_sql, tuple(params)) if source == table else (source, where_sql, tuple(params))
+    total = count_cache.get(table, key)
+    if total is not None:
+        return total
+
+    if count == "estimate" and not where_sql:
+        # One subquery per aggregate: SQLite reads MIN or MAX alone off the index, both together scan the table
+        return fetch_all(cursor, f"SELECT COALESCE((SELECT MAX(id) FROM {source}) - "
+                                 f"(SELECT MIN(id) FROM {source}) + 1, 0)")[0][0]
+
+    gen = count_cache.generation(table)
+    total = fetch_all(cursor, f"SELECT COUNT(*) FROM {source}{where_sql}", params)[0][0]
+    count_cache.put(table, key, total, gen)
+    return total
+
+
+def paginate(cursor: sqlite3.Cursor, table: str, where_clauses: list[str], params: list, offset: int, limit: int,
+             after: Optional[int] = None, before: Optional[int] = None,
+             count: CountMode = "exact", relations: list[Relation] = (), cache_count: bool = True,
+             source: Optional[str] = None) -> tuple[int | None, list[sqlite3.Row], int | None]:
+    """
+    Run the count query and the page query shared by every list_* statement.
+
+    - Offset mode (default): LIMIT ? OFFSET ?, limit < 0 returns every row.
+    - Keyset mode (after and/or before given): WHERE id > ? / id < ? ORDER BY id LIMIT ?.
+      Deep pages cost the same as the first one because no rows are skipped.
+      Start scrolling with after=0.
+
+    The total is computed by count_rows() according to `count` (cached unless `cache_count` is False).
+    `relations` (see expand.py) are LEFT JOINed to the page in the same query.
+    `source` is read instead of `table` when given (see count_rows).
+
+    Returns (total, rows, next_cursor). next_cursor is the id to send back as after=
+    (or before= when paging backwards) for the following page, None when there is none.
+    """
+    where_sql = " WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+
+    # total count (the cursor never narrows the total, only the page)
+    total = count_rows(cursor, table, where_sql, params, count, cache_count, source)
+    source = source or table
+
+    page_clauses = list(where_clauses)
+    page_params = list(params)
+    if after is None and before is None:
+        query = f"SELECT * FROM {source}{where_sql}"
+        if limit >= 0:
+            query += " LIMIT ? OFFSET ?"
+            page_params.extend([limit, offset])
+        if relations:
+            query = join_page(query, relations)
+        rows = fetch_all(cursor, query, page_params)
+        metrics.count_rows(len(rows))
+        return total, rows, None
+
+    if after is not None:
+        page_clauses.append("id > ?")
+        page_params.append(after)
+    if before is not None:
+        page_clauses.append("id < ?")
+        page_params.append(before)
+
+    # Paging backwards walks the index in descending order, rows are flipped back afterwards
+    backwards = after is None
+    query = f"SELECT * FROM {source} WHERE {' AND '.join(page_clauses)} ORDER BY id {'DESC' if backwards else 'ASC'}"
+    if limit >= 0:
+        query += " LIMIT ?"
+        page_params.append(limit)
+    if relations:
+        query = join_page(query, relations, descending=backwards)
+
+    rows = fetch_all(cursor, query, page_params)
+    metrics.count_rows(len(rows))
+    if backwards:
+        rows.reverse()
+
+    next_cursor = None
+    if rows and 0 <= limit == len(rows):
+        next_cursor = rows[0]["id"] if backwards else rows[-1]["id"]
+    return total, rows, next_cursor
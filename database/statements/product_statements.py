@@ -1,87 +1,134 @@
-# product_statements.py
-from typing import Optional
-
-from .. import get_connection, db_lock
-from entities import Product, HttpListResponse
-
-
-def add_product(product: Product) -> int:
-    with db_lock:
-        conn, cursor = get_connection()
-        cursor.execute("""
-                       INSERT INTO products (name, description, stock_id, quantity, expiration_date, purchase_price, sale_price)
-                       VALUES (?, ?, ?, ?, ?, ?, ?)
-                       """, (product.name, product.description, product.stock_id, product.quantity, product.expiration_date,
-                             product.purchase_price, product.sale_price))
-        conn.commit()
-        return cursor.lastrowid
-
-
-def update_product(product: Product) -> int:
-    with db_lock:
-        if product.id is None:
-            raise ValueError("Product ID must be provided for update")
-
-        conn, cursor = get_connection()
-        cursor.execute("""
-                       UPDATE products
-                       SET name            = ?,
-                           description     = ?,
-                           stock_id        = ?,
-                           quantity        = ?,
-                           expiration_date = ?,
-                           purchase_price  = ?,
-                           sale_price      = ?
-                       WHERE id = ?
-                       """, (
-                           product.name, product.description, product.stock_id, product.quantity,
-                           product.expiration_date, product.purchase_price, product.sale_price,
-                           product.id
-                       ))
-        conn.commit()
-        return cursor.rowcount
-
-
-def delete_product(product_id: int) -> bool:
-    with db_lock:
-        conn, cursor = get_connection()
-        cursor.execute("DELETE FROM products WHERE id = ?", (product_id,))
-        conn.commit()
-        return cursor.rowcount > 0  # True if a row was deleted. cursor.rowcount gives the number of affected rows
-
-
-def get_product(product_id: int) -> Product | None:
-    with db_lock:
-        conn, cursor = get_connection()
-        cursor.execute("SELECT * FROM products WHERE id = ?", (product_id,))
-        row = cursor.fetchone()
-        return Product(**dict(row)) if row else None
-
-
-def list_products(offset: int, limit: int, filter: Optional[str] = None) -> HttpListResponse[Product]:
-    """
-    Retrieve all products.
-    Returns a HttpListResponse[Product] object.
-    """
-    with db_lock:
-        conn, cursor = get_connection()
-        filter_expr = "(name || ' ' || description )"
-        params: list = []
-        query = "SELECT * FROM products"
-        count_query = "SELECT COUNT(*) FROM products"
-
-        if filter:
-            query += f" WHERE {filter_expr} LIKE ?"
-            count_query += f" WHERE {filter_expr} LIKE ?"
-            params.append(f"%{filter}%")
-
-        total = cursor.execute(count_query, params).fetchone()[0]
-
-        if limit >= 0:
-            query += " LIMIT ? OFFSET ?"
-            params.extend([limit, offset])
-
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        products = [Product(**dict(r)) for r in rows]
-        return HttpListResponse[Product](total=total, body=products)
+# product_statements.py
+from typing import Iterator, Optional
+
+from .. import get_connection
+from ..write_queue import Write, deleted, lastrowid, queued_write, rowcount
+from ..row_cache import cached, cached_many
+from .batch import fetch_by_ids
+from .bulk import bulk_upsert
+from .expand import Relation, expand_relations, expanded_page, related_filter_clause
+from .export import export_rows
+from .fast_json import encode_page
+from .pagination import paginate, CountMode
+from .search import filter_clause
+from .center_statements import CENTER_FILTER_EXPR
+from .stock_statements import STOCK_FILTER_EXPR
+from entities import Product, HttpListResponse, ExpandedProduct, Stock, Center
+
+
+@queued_write
+def add_product(product: Product) -> Write[int]:
+    return Write("products", """
+                 INSERT INTO products (name, description, stock_id, quantity, expiration_date, purchase_price, sale_price)
+                 VALUES (?, ?, ?, ?, ?, ?, ?)
+                 """, (product.name, product.description, product.stock_id, product.quantity, product.expiration_date,
+                       product.purchase_price, product.sale_price), lastrowid)
+
+
+@queued_write
+def update_product(product: Product) -> Write[int]:
+    if product.id is None:
+        raise ValueError("Product ID must be provided for update")
+
+    return Write("products", """
+                 UPDATE products
+                 SET name            = ?,
+                     description     = ?,
+                     stock_id        = ?,
+                     quantity        = ?,
+                     expiration_date = ?,
+                     purchase_price  = ?,
+                     sale_price      = ?
+                 WHERE id = ?
+                 """, (
+                     product.name, product.description, product.stock_id, product.quantity,
+                     product.expiration_date, product.purchase_price, product.sale_price,
+                     product.id
+                 ), rowcount)
+
+
+@queued_write
+def delete_product(product_id: int) -> Write[bool]:
+    return Write("products", "DELETE FROM products WHERE id = ?", (product_id,), deleted)
+
+
+PRODUCT_COLUMNS: list[str] = ["name", "description", "stock_id", "quantity", "expiration_date", "purchase_price", "sale_price"]
+
+
+def upsert_products(products: list[Product]) -> list[tuple[int | None, str | None]]:
+    """
+    Insert products without an id and insert-or-update those with one, in a single transaction.
+    Returns one (id, error) pair per product, in input order.
+    """
+    return bulk_upsert("products", PRODUCT_COLUMNS,
+                       [(r.id, tuple(getattr(r, c) for c in PRODUCT_COLUMNS)) for r in products])
+
+
+@cached("products")
+def get_product(product_id: int) -> Product | None:
+    conn, cursor = get_connection()
+    cursor.execute("SELECT * FROM products WHERE id = ?", (product_id,))
+    row = cursor.fetchone()
+    return Product(**dict(row)) if row else None
+
+
+@cached_many("products")
+def get_products(product_ids: list[int]) -> list[Product]:
+    """Products whose id is in product_ids, read in one query (the unknown ids are left out)."""
+    conn, cursor = get_connection()
+    return [Product(**dict(r)) for r in fetch_by_ids(cursor, "products", product_ids)]
+
+
+PRODUCT_FILTER_EXPR: str = "(name || ' ' || description )"
+
+# Relations a product list can expand (see expand.py)
+_STOCK = Relation("stock", "stocks", Stock, "stock_id", STOCK_FILTER_EXPR)
+PRODUCT_RELATIONS: dict[str, Relation] = {
+    "stock": _STOCK,
+    "center": Relation("center", "centers", Center, "center_id", CENTER_FILTER_EXPR, via=_STOCK),
+}
+
+
+def list_products(offset: int, limit: int, filter: Optional[str] = None, after: Optional[int] = None,
+                  before: Optional[int] = None, count: CountMode = "exact",
+                  as_json: bool = False, expand: Optional[list[str]] = None
+                  ) -> HttpListResponse[Product] | HttpListResponse[ExpandedProduct] | bytes:
+    """
+    Retrieve all products.
+    Returns a HttpListResponse[Product] object, or its JSON encoding when as_json is set.
+    With `expand` (keys of PRODUCT_RELATIONS) the page is of ExpandedProduct, the stock and/or center of
+    each product resolved by the same query, and the filter matches the related columns too.
+    """
+    relations = expand_relations(PRODUCT_RELATIONS, expand)
+    conn, cursor = get_connection()
+    where_clauses: list[str] = []
+    params: list = []
+
+    if filter:
+        clause, clause_params = filter_clause("products", filter, PRODUCT_FILTER_EXPR)
+        if relations:
+            clause, clause_params = related_filter_clause(clause, clause_params, filter, relations)
+        where_clauses.append(clause)
+        params.extend(clause_params)
+
+    total, rows, next_cursor = paginate(cursor, "products", where_clauses, params, offset, limit, after, before, count,
+                                        relations, cache_count=not (filter and relations))
+    if relations:
+        return expanded_page(ExpandedProduct, total, rows, next_cursor, relations, as_json)
+    if as_json:
+        return encode_page(Product, total, rows, next_cursor)
+    products = [Product(**dict(r)) for r in rows]
+    return HttpListResponse[Product](total=total, body=products, next_cursor=next_cursor)
+
+
+def export_products(filter: Optional[str] = None) -> Iterator[list[Product]]:
+    """Stream every product matching the filter, in id order, one chunk of Product objects at a time."""
+    where_clauses: list[str] = []
+    params: list = []
+    if filter:
+        clause, clause_params = filter_clause("products", filter, PRODUCT_FILTER_EXPR)
+        where_clauses.append(clause)
+        params.extend(clause_params)
+
+    for rows in export_rows("products", where_clauses, params):
+        yield [Product(**dict(r)) for r in rows]
@@ -0,0 +1,39 @@
+# search.py
+import re
+
+from .. import sql
+
+
+def match_expression(filter: str) -> str | None:
+    """
+    Turn a user filter into an FTS5 MATCH expression: every word becomes a quoted prefix term,
+    so "mil des" matches rows containing a word starting with "mil" and one starting with "des".
+    Returns None when the filter has no word characters.
+    """
+    tokens = re.findall(r"\w+", filter)
+    if not tokens:
+        return None
+    return " ".join(f'"{t}"*' for t in tokens)
+
+
+def filter_clause(table: str, filter: str, filter_expr: str, partitions: list[str] = ()) -> tuple[str, list]:
+    """
+    Build the WHERE clause and parameters for the `filter` query parameter of a list.
+    Uses the table's FTS5 index when there is one, otherwise a LIKE scan over filter_expr.
+    The columns left out of the index (sql.FTS_UNINDEXED_COLUMNS) match when equal to the filter.
+    `partitions` are the attached databases (see archive.py) whose copy of the table is read
+    along with the main one; each has its own index.
+    """
+    match = match_expression(filter)
+    if match is None or table not in sql.fts_tables():
+        return f"{filter_expr} LIKE ?", [f"%{filter}%"]
+    if not partitions:
+        clause, params = f"id IN (SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH ?)", [match]
+    else:
+        selects = [f"SELECT rowid FROM {schema}.{table}_fts(?)" for schema in ("main", *partitions)]
+        clause, params = f"id IN ({' UNION ALL '.join(selects)})", [match] * len(selects)
+    unindexed = sql.FTS_UNINDEXED_COLUMNS.get(table, [])
+    if unindexed:
+        clause = "(" + " OR ".join([clause] + [f"CAST({c} AS TEXT) = ?" for c in unindexed]) + ")"
+        params += [filter.strip()] * len(unindexed)
+    return clause, params
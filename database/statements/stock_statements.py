@@ -1,82 +1,126 @@
-# stock_statements.py
-from typing import Optional
-
-from .. import get_connection, db_lock
-from entities import Stock, HttpListResponse
-
-
-def add_stock(stock: Stock) -> int:
-    with db_lock:
-        conn, cursor = get_connection()
-        cursor.execute("""
-                       INSERT INTO stocks (name, city, address, center_id)
-                       VALUES (?, ?, ?, ?)
-                       """, (stock.name, stock.city, stock.address, stock.center_id))
-        conn.commit()
-        return cursor.lastrowid
-
-
-def update_stock(stock: Stock) -> int:
-    with db_lock:
-        if stock.id is None:
-            raise ValueError("Stock ID must be provided for update")
-
-        conn, cursor = get_connection()
-        cursor.execute("""
-                       UPDATE stocks
-                       SET name      = ?,
-                           city      = ?,
-                           address   = ?,
-                           center_id = ?
-                       WHERE id = ?
-                       """, (
-                           stock.name, stock.city, stock.address, stock.center_id,
-                           stock.id
-                       ))
-        conn.commit()
-        return cursor.rowcount
-
-
-def delete_stock(stock_id: int) -> bool:
-    with db_lock:
-        conn, cursor = get_connection()
-        cursor.execute("DELETE FROM stocks WHERE id = ?", (stock_id,))
-        conn.commit()
-        return cursor.rowcount > 0  # True if a row was deleted. cursor.rowcount gives the number of affected rows
-
-
-def get_stock(stock_id: int) -> Stock | None:
-    with db_lock:
-        conn, cursor = get_connection()
-        cursor.execute("SELECT * FROM stocks WHERE id = ?", (stock_id,))
-        row = cursor.fetchone()
-        return Stock(**dict(row)) if row else None
-
-
-def list_stocks(offset: int, limit: int, filter: Optional[str] = None) -> HttpListResponse[Stock]:
-    """
-    Retrieve all stocks with optional filtering.
-    Returns a HttpListResponse[Stock] object.
-    """
-    with db_lock:
-        conn, cursor = get_connection()
-        filter_expr = "(name || ' ' || city || ' ' || address)"
-        params: list = []
-        query = "SELECT * FROM stocks"
-        count_query = "SELECT COUNT(*) FROM stocks"
-
-        if filter:
-            query += f" WHERE {filter_expr} LIKE ?"
-            count_query += f" WHERE {filter_expr} LIKE ?"
-            params.append(f"%{filter}%")
-
-        total = cursor.execute(count_query, params).fetchone()[0]
-
-        if limit > 0:
-            query += " LIMIT ? OFFSET ?"
-            params.extend([limit, offset])
-
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        stocks = [Stock(**dict(r)) for r in rows]
-        return HttpListResponse[Stock](total=total, body=stocks)
+# stock_statements.py
+from typing import Iterator, Optional
+
+from .. import get_connection
+from ..write_queue import Write, deleted, lastrowid, queued_write, rowcount
+from ..row_cache import cached, cached_many
+from .batch import fetch_by_ids
+from .bulk import bulk_upsert
+from .expand import Relation, expand_relations, expanded_page, related_filter_clause
+from .export import export_rows
+from .fast_json import encode_page
+from .pagination import paginate, CountMode
+from .search import filter_clause
+from .center_statements import CENTER_FILTER_EXPR
+from entities import Stock, HttpListResponse, ExpandedStock, Center
+
+
+@queued_write
+def add_stock(stock: Stock) -> Write[int]:
+    return Write("stocks", """
+                 INSERT INTO stocks (name, city, address, center_id)
+                 VALUES (?, ?, ?, ?)
+                 """, (stock.name, stock.city, stock.address, stock.center_id), lastrowid)
+
+
+@queued_write
+def update_stock(stock: Stock) -> Write[int]:
+    if stock.id is None:
+        raise ValueError("Stock ID must be provided for update")
+
+    return Write("stocks", """
+                 UPDATE stocks
+                 SET name      = ?,
+                     city      = ?,
+                     address   = ?,
+                     center_id = ?
+                 WHERE id = ?
+                 """, (
+                     stock.name, stock.city, stock.address, stock.center_id,
+                     stock.id
+                 ), rowcount)
+
+
+@queued_write
+def delete_stock(stock_id: int) -> Write[bool]:
+    return Write("stocks", "DELETE FROM stocks WHERE id = ?", (stock_id,), deleted)
+
+
+STOCK_COLUMNS: list[str] = ["name", "city", "address", "center_id"]
+
+
+def upsert_stocks(stocks: list[Stock]) -> list[tuple[int | None, str | None]]:
+    """
+    Insert stocks without an id and insert-or-update those with one, in a single transaction.
+    Returns one (id, error) pair per stock, in input order.
+    """
+    return bulk_upsert("stocks", STOCK_COLUMNS,
+                       [(r.id, tuple(getattr(r, c) for c in STOCK_COLUMNS)) for r in stocks])
+
+
+@cached("stocks")
+def get_stock(stock_id: int) -> Stock | None:
+    conn, cursor = get_connection()
+    cursor.execute("SELECT * FROM stocks WHERE id = ?", (stock_id,))
+    row = cursor.fetchone()
+    return Stock(**dict(row)) if row else None
+
+
+@cached_many("stocks")
+def get_stocks(stock_ids: list[int]) -> list[Stock]:
+    """Stocks whose id is in stock_ids, read in one query (the unknown ids are left out)."""
+    conn, cursor = get_connection()
+    return [Stock(**dict(r)) for r in fetch_by_ids(cursor, "stocks", stock_ids)]
+
+
+STOCK_FILTER_EXPR: str = "(name || ' ' || city || ' ' || address)"
+
+# Relations a stock list can expand (see expand.py)
+STOCK_RELATIONS: dict[str, Relation] = {
+    "center": Relation("center", "centers", Center, "center_id", CENTER_FILTER_EXPR),
+}
+
+
+def list_stocks(offset: int, limit: int, filter: Optional[str] = None, after: Optional[int] = None,
+                before: Optional[int] = None, count: CountMode = "exact",
+                as_json: bool = False, expand: Optional[list[str]] = None
+                ) -> HttpListResponse[Stock] | HttpListResponse[ExpandedStock] | bytes:
+    """
+    Retrieve all stocks with optional filtering.
+    Returns a HttpListResponse[Stock] object, or its JSON encoding when as_json is set.
+    With `expand` (keys of STOCK_RELATIONS) the page is of ExpandedStock, the center of each stock resolved
+    by the same query, and the filter matches the related columns too.
+    """
+    relations = expand_relations(STOCK_RELATIONS, expand)
+    conn, cursor = get_connection()
+    where_clauses: list[str] = []
+    params: list = []
+
+    if filter:
+        clause, clause_params = filter_clause("stocks", filter, STOCK_FILTER_EXPR)
+        if relations:
+            clause, clause_params = related_filter_clause(clause, clause_params, filter, relations)
+        where_clauses.append(clause)
+        params.extend(clause_params)
+
+    total, rows, next_cursor = paginate(cursor, "stocks", where_clauses, params, offset, limit, after, before, count,
+                                        relations, cache_count=not (filter and relations))
+    if relations:
+        return expanded_page(ExpandedStock, total, rows, next_cursor, relations, as_json)
+    if as_json:
+        return encode_page(Stock, total, rows, next_cursor)
+    stocks = [Stock(**dict(r)) for r in rows]
+    return HttpListResponse[Stock](total=total, body=stocks, next_cursor=next_cursor)
+
+
+def export_stocks(filter: Optional[str] = None) -> Iterator[list[Stock]]:
+    """Stream every stock matching the filter, in id order, one chunk of Stock objects at a time."""
+    where_clauses: list[str] = []
+    params: list = []
+    if filter:
+        clause, clause_params = filter_clause("stocks", filter, STOCK_FILTER_EXPR)
+        where_clauses.append(clause)
+        params.extend(clause_params)
+
+    for rows in export_rows("stocks", where_clauses, params):
+        yield [Stock(**dict(r)) for r in rows]
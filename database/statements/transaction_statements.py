@@ -1,120 +1,347 @@
-# transaction_statements.py
-from typing import Optional
-
-from .. import get_connection, db_lock
-from entities import Transaction, HttpListResponse
-
-
-def add_transaction(transaction: Transaction) -> int:
-    with db_lock:
-        conn, cursor = get_connection()
-        cursor.execute("""
-                       INSERT INTO transactions (supplier_id, date, product_id, type, quantity, price, tax, discount)
-                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                       """,
-                       (transaction.supplier_id, transaction.date, transaction.product_id, transaction.type,
-                        transaction.quantity, transaction.price, transaction.tax, transaction.discount))
-        conn.commit()
-        return cursor.lastrowid
-
-
-def update_transaction(transaction: Transaction) -> int:
-    with db_lock:
-        if transaction.id is None:
-            raise ValueError("Transaction ID must be provided for update")
-
-        conn, cursor = get_connection()
-        cursor.execute("""
-                       UPDATE transactions
-                       SET supplier_id      = ?,
-                           date       = ?,
-                           product_id = ?,
-                           type       = ?,
-                           price      = ?,
-                           quantity   = ?,
-                           tax        = ?,
-                           discount   = ?
-                       WHERE id = ?
-                       """, (
-                           transaction.supplier, transaction.date, transaction.product_id,
-                           transaction.type, transaction.price, transaction.quantity, transaction.tax, transaction.discount,
-                           transaction.id
-                       ))
-        conn.commit()
-        return cursor.rowcount
-
-
-def delete_transaction(transaction_id: int) -> bool:
-    with db_lock:
-        conn, cursor = get_connection()
-        cursor.execute("DELETE FROM transactions WHERE id = ?", (transaction_id,))
-        conn.commit()
-        return cursor.rowcount > 0  # True if a row was deleted. cursor.rowcount gives the number of affected rows
-
-
-def get_transaction(transaction_id: int) -> Transaction | None:
-    with db_lock:
-        conn, cursor = get_connection()
-        cursor.execute("SELECT * FROM transactions WHERE id = ?", (transaction_id,))
-        row = cursor.fetchone()
-        return Transaction(**dict(row)) if row else None
-
-
-# --- Global filter expression for transactions ---
-TRANSACTION_FILTER_EXPR: str = "(supplier_id || ' ' || product_id || ' ' || date || ' ' || type || ' ' || price || ' ' || quantity || ' ' || tax || ' ' || discount)"
-
-
-def _list_transactions_by_type(offset: int, limit: int, filter: Optional[str] = None, tx_type: Optional[int] = None) -> \
-HttpListResponse[Transaction]:
-    """
-    Internal helper to retrieve transactions with optional type (1=income, -1=outcome, None=all).
-    """
-    with db_lock:
-        conn, cursor = get_connection()
-        params: list = []
-        query = "SELECT * FROM transactions"
-        count_query = "SELECT COUNT(*) FROM transactions"
-
-        # WHERE conditions
-        where_clauses = []
-        if tx_type is not None:
-            where_clauses.append("type = ?")
-            params.append(tx_type)
-
-        if filter is not None:
-            pattern = f"%{filter}%"
-            where_clauses.append(f"{TRANSACTION_FILTER_EXPR} LIKE ?")
-            params.append(pattern)
-
-        if where_clauses:
-            where_sql = " WHERE " + " AND ".join(where_clauses)
-            query += where_sql
-            count_query += where_sql
-
-        # total count
-        total = cursor.execute(count_query, params).fetchone()[0]
-
-        # pagination
-        if limit >= 0:
-            query += " LIMIT ? OFFSET ?"
-            params.extend([limit, offset])
-
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        transactions = [Transaction(**dict(r)) for r in rows]
-        return HttpListResponse[Transaction](total=total, body=transactions)
-
-
-def list_transactions(offset: int, limit: int, filter: Optional[str] = None) -> HttpListResponse[Transaction]:
-    """Retrieve all transactions."""
-    return _list_transactions_by_type(offset, limit, filter=filter, tx_type=None)
-
-
-def list_income_transactions(offset: int, limit: int, filter: Optional[str] = None) -> HttpListResponse[Transaction]:
-    """Retrieve all income transactions (type = 1)."""
-    return _list_transactions_by_type(offset, limit, filter=filter, tx_type=1)
-
-
-def list_outcome_transactions(offset: int, limit: int, filter: Optional[str] = None) -> HttpListResponse[Transaction]:
-    """Retrieve all outcome transactions (type = -1)."""
-    return _list_transactions_by_type(offset, limit, filter=filter, tx_type=-1)
+# transaction_statements.py
+from datetime import datetime
+from typing import Iterator, Literal, Optional
+
+from .. import get_connection, write_connection
+from ..write_queue import Write, deleted, lastrowid, queued_write, rowcount
+from ..row_cache import cached, cached_many
+from .archive import archive_path, archived_rows, archived_years, check_range, copy_year, detach_all, \
+    partial_sources, schema, touched_years, transactions_source, union_source, year_range
+from .batch import fetch_by_ids
+from ..slow_queries import fetch_all
+from .bulk import bulk_upsert
+from .expand import Relation, expand_relations, expanded_page, related_filter_clause
+from .export import export_rows
+from .fast_json import encode_page
+from .pagination import paginate, CountMode
+from .search import filter_clause
+from .product_statements import PRODUCT_FILTER_EXPR
+from .supplier_statements import FILTER_EXPR as SUPPLIER_FILTER_EXPR
+from entities import Transaction, HttpListResponse, TransactionSummary, ExpandedTransaction, Product, Supplier, \
+    TransactionArchive
+
+
+@queued_write
+def add_transaction(transaction: Transaction) -> Write[int]:
+    return Write("transactions", """
+                 INSERT INTO transactions (supplier_id, date, product_id, type, quantity, price, tax, discount)
+                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                 """,
+                 (transaction.supplier_id, transaction.date, transaction.product_id, transaction.type,
+                  transaction.quantity, transaction.price, transaction.tax, transaction.discount), lastrowid)
+
+
+@queued_write
+def update_transaction(transaction: Transaction) -> Write[int]:
+    if transaction.id is None:
+        raise ValueError("Transaction ID must be provided for update")
+
+    return Write("transactions", """
+                 UPDATE transactions
+                 SET supplier_id      = ?,
+                     date       = ?,
+                     product_id = ?,
+                     type       = ?,
+                     price      = ?,
+                     quantity   = ?,
+                     tax        = ?,
+                     discount   = ?
+                 WHERE id = ?
+                 """, (
+                     transaction.supplier_id, transaction.date, transaction.product_id,
+                     transaction.type, transaction.price, transaction.quantity, transaction.tax, transaction.discount,
+                     transaction.id
+                 ), rowcount)
+
+
+@queued_write
+def delete_transaction(transaction_id: int) -> Write[bool]:
+    return Write("transactions", "DELETE FROM transactions WHERE id = ?", (transaction_id,), deleted)
+
+
+TRANSACTION_COLUMNS: list[str] = ["supplier_id", "date", "product_id", "type", "price", "quantity", "tax", "discount"]
+
+
+def upsert_transactions(transactions: list[Transaction]) -> list[tuple[int | None, str | None]]:
+    """
+    Insert transactions without an id and insert-or-update those with one, in a single transaction.
+    An id that was archived is refused with an error: the upsert would not find it in the transactions
+    table and insert it again, a second copy whose ledger trigger moves the product's quantity twice.
+    Returns one (id, error) pair per transaction, in input order.
+    """
+    conn, cursor = get_connection()
+    archived = {r["id"] for r in archived_rows(cursor, [r.id for r in transactions if r.id is not None])}
+    written = iter(bulk_upsert("transactions", TRANSACTION_COLUMNS,
+                               [(r.id, tuple(getattr(r, c) for c in TRANSACTION_COLUMNS))
+                                for r in transactions if r.id not in archived]))
+    return [(None, f"Transaction with ID {r.id} is archived") if r.id in archived else next(written)
+            for r in transactions]
+
+
+@cached("transactions")
+def get_transaction(transaction_id: int) -> Transaction | None:
+    conn, cursor = get_connection()
+    cursor.execute("SELECT * FROM transactions WHERE id = ?", (transaction_id,))
+    row = cursor.fetchone()
+    if row is None:  # archived, or unknown
+        row = next(iter(archived_rows(cursor, [transaction_id])), None)
+    return Transaction(**dict(row)) if row else None
+
+
+def is_archived_transaction(transaction_id: int) -> bool:
+    """
+    True when the transaction was moved to an archive. Archived years are closed: update_transaction and
+    delete_transaction don't reach them, they match no row of the transactions table.
+    """
+    conn, cursor = get_connection()
+    return bool(archived_rows(cursor, [transaction_id]))
+
+
+@cached_many("transactions")
+def get_transactions(transaction_ids: list[int]) -> list[Transaction]:
+    """
+    Transactions whose id is in transaction_ids, read in one query (the unknown ids are left out).
+    The ids not in the transactions table are looked up in the archives.
+    """
+    conn, cursor = get_connection()
+    rows = fetch_by_ids(cursor, "transactions", transaction_ids)
+    if len(rows) < len(transaction_ids):
+        found = {r["id"] for r in rows}
+        rows += archived_rows(cursor, [i for i in transaction_ids if i not in found])
+    return [Transaction(**dict(r)) for r in rows]
+
+
+# --- Global filter expression for transactions ---
+TRANSACTION_FILTER_EXPR: str = "(supplier_id || ' ' || product_id || ' ' || date || ' ' || type || ' ' || price || ' ' || quantity || ' ' || tax || ' ' || discount)"
+
+# Relations a transaction list can expand (see expand.py)
+TRANSACTION_RELATIONS: dict[str, Relation] = {
+    "product": Relation("product", "products", Product, "product_id", PRODUCT_FILTER_EXPR),
+    "supplier": Relation("supplier", "suppliers", Supplier, "supplier_id", SUPPLIER_FILTER_EXPR),
+}
+
+
+def _list_transactions_by_type(offset: int, limit: int, filter: Optional[str] = None, tx_type: Optional[int] = None,
+                               after: Optional[int] = None, before: Optional[int] = None,
+                               count: CountMode = "exact",
+                               as_json: bool = False, expand: Optional[list[str]] = None,
+                               date_from: Optional[datetime] = None, date_to: Optional[datetime] = None
+                               ) -> HttpListResponse[Transaction] | HttpListResponse[ExpandedTransaction] | bytes:
+    """
+    Internal helper to retrieve transactions with optional type (1=income, -1=outcome, None=all).
+    With `expand` (keys of TRANSACTION_RELATIONS) the page is of ExpandedTransaction, the product and/or
+    supplier of each transaction resolved by the same query, and the filter matches the related columns too.
+    Without a date range only the transactions table is read; date_from (inclusive) and date_to
+    (exclusive) also reach the archived years they overlap (see archive.py).
+    """
+    relations = expand_relations(TRANSACTION_RELATIONS, expand)
+    conn, cursor = get_connection()
+    params: list = []
+
+    # WHERE conditions
+    where_clauses = []
+    source, years = "transactions", []
+    if date_from is not None or date_to is not None:
+        source, years = transactions_source(cursor, date_from, date_to)
+    if date_from is not None:
+        where_clauses.append("date >= ?")
+        params.append(date_from)
+    if date_to is not None:
+        where_clauses.append("date < ?")
+        params.append(date_to)
+    if tx_type is not None:
+        where_clauses.append("type = ?")
+        params.append(tx_type)
+
+    if filter is not None:
+        clause, clause_params = filter_clause("transactions", filter, TRANSACTION_FILTER_EXPR,
+                                              [schema(y) for y in years])
+        if relations:
+            clause, clause_params = related_filter_clause(clause, clause_params, filter, relations)
+        where_clauses.append(clause)
+        params.extend(clause_params)
+
+    total, rows, next_cursor = paginate(cursor, "transactions", where_clauses, params, offset, limit, after, before,
+                                        count, relations, cache_count=not (filter and relations), source=source)
+    if relations:
+        return expanded_page(ExpandedTransaction, total, rows, next_cursor, relations, as_json)
+    if as_json:
+        return encode_page(Transaction, total, rows, next_cursor)
+    transactions = [Transaction(**dict(r)) for r in rows]
+    return HttpListResponse[Transaction](total=total, body=transactions, next_cursor=next_cursor)
+
+
+def list_transactions(offset: int, limit: int, filter: Optional[str] = None, after: Optional[int] = None,
+                      before: Optional[int] = None, count: CountMode = "exact",
+                      as_json: bool = False, expand: Optional[list[str]] = None,
+                      date_from: Optional[datetime] = None, date_to: Optional[datetime] = None
+                      ) -> HttpListResponse[Transaction] | HttpListResponse[ExpandedTransaction] | bytes:
+    """Retrieve all transactions."""
+    return _list_transactions_by_type(offset, limit, filter=filter, tx_type=None, after=after, before=before,
+                                      count=count, as_json=as_json, expand=expand,
+                                      date_from=date_from, date_to=date_to)
+
+
+def list_income_transactions(offset: int, limit: int, filter: Optional[str] = None, after: Optional[int] = None,
+                             before: Optional[int] = None,
+                             count: CountMode = "exact",
+                             as_json: bool = False, expand: Optional[list[str]] = None,
+                             date_from: Optional[datetime] = None, date_to: Optional[datetime] = None
+                             ) -> HttpListResponse[Transaction] | HttpListResponse[ExpandedTransaction] | bytes:
+    """Retrieve all income transactions (type = 1)."""
+    return _list_transactions_by_type(offset, limit, filter=filter, tx_type=1, after=after, before=before,
+                                      count=count, as_json=as_json, expand=expand,
+                                      date_from=date_from, date_to=date_to)
+
+
+def list_outcome_transactions(offset: int, limit: int, filter: Optional[str] = None, after: Optional[int] = None,
+                              before: Optional[int] = None,
+                              count: CountMode = "exact",
+                              as_json: bool = False, expand: Optional[list[str]] = None,
+                              date_from: Optional[datetime] = None, date_to: Optional[datetime] = None
+                              ) -> HttpListResponse[Transaction] | HttpListResponse[ExpandedTransaction] | bytes:
+    """Retrieve all outcome transactions (type = -1)."""
+    return _list_transactions_by_type(offset, limit, filter=filter, tx_type=-1, after=after, before=before,
+                                      count=count, as_json=as_json, expand=expand,
+                                      date_from=date_from, date_to=date_to)
+
+
+def export_transactions(filter: Optional[str] = None, tx_type: Optional[int] = None,
+                        date_from: Optional[datetime] = None, date_to: Optional[datetime] = None
+                        ) -> Iterator[list[Transaction]]:
+    """
+    Stream every transaction matching the filter, type and date range, in id order, one chunk of Transaction
+    objects at a time. As for the lists, the archived years are only read when the date range overlaps them.
+    """
+    where_clauses: list[str] = []
+    params: list = []
+    years: list[int] = []
+    if date_from is not None or date_to is not None:
+        conn, cursor = get_connection()
+        years = touched_years(archived_years(cursor), date_from, date_to)
+    if date_from is not None:
+        where_clauses.append("date >= ?")
+        params.append(date_from)
+    if date_to is not None:
+        where_clauses.append("date < ?")
+        params.append(date_to)
+    if tx_type is not None:
+        where_clauses.append("type = ?")
+        params.append(tx_type)
+    if filter:
+        clause, clause_params = filter_clause("transactions", filter, TRANSACTION_FILTER_EXPR,
+                                              [schema(y) for y in years])
+        where_clauses.append(clause)
+        params.extend(clause_params)
+
+    source = (lambda conn: union_source(conn, years)) if years else None
+    for rows in export_rows("transactions", where_clauses, params, source):
+        yield [Transaction(**dict(r)) for r in rows]
+
+
+def check_transactions_range(date_from: Optional[datetime] = None, date_to: Optional[datetime] = None):
+    """
+    ValueError when a list or export between date_from and date_to would read more archived years than
+    SQLite can attach at once. export_transactions only fails once streaming, this lets it fail first.
+    """
+    conn, cursor = get_connection()
+    check_range(cursor, date_from, date_to)
+
+
+SummaryGroup = Literal["day", "week", "month", "supplier", "product"]
+
+# Thursday of the Monday-to-Sunday week of a transaction: its year and day of the year give the ISO 8601
+# year and week (SQLite has no %G/%V before 3.46), so a week across New Year stays one week
+_ISO_THURSDAY = "date(date, '-3 days', 'weekday 4')"
+
+# GROUP BY expression of each summary grouping
+SUMMARY_KEYS: dict[str, str] = {
+    "day": "strftime('%Y-%m-%d', date)",
+    "week": f"strftime('%Y', {_ISO_THURSDAY}) || '-W' || printf('%02d', (strftime('%j', {_ISO_THURSDAY}) + 6) / 7)",
+    "month": "strftime('%Y-%m', date)",
+    "supplier": "supplier_id",
+    "product": "product_id",
+}
+
+
+def summarize_transactions(group_by: SummaryGroup, date_from: Optional[datetime] = None,
+                           date_to: Optional[datetime] = None,
+                           tx_type: Optional[int] = None) -> list[TransactionSummary]:
+    """
+    Aggregate transactions in SQL, one row per day/week/month, supplier or product.
+    date_from is inclusive, date_to exclusive; both use the index on transactions(date).
+    The archived years the range overlaps are read too, every one of them without a range.
+    """
+    conn, cursor = get_connection()
+    params: list = []
+
+    where_clauses = []
+    if date_from is not None:
+        where_clauses.append("date >= ?")
+        params.append(date_from)
+    if date_to is not None:
+        where_clauses.append("date < ?")
+        params.append(date_to)
+    if tx_type is not None:
+        where_clauses.append("type = ?")
+        params.append(tx_type)
+    where_sql = " WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+
+    # Every column is a sum: the groups of the parts read separately (see partial_sources) add up
+    totals: dict = {}
+    for source in partial_sources(cursor, date_from, date_to):
+        rows = fetch_all(cursor, f"""
+                   SELECT {SUMMARY_KEYS[group_by]}                                 AS key,
+                          COUNT(*)                                                AS count,
+                          TOTAL(quantity)                                         AS quantity,
+                          TOTAL(CASE WHEN type = 1 THEN price * quantity END)     AS revenue,
+                          TOTAL(CASE WHEN type = -1 THEN price * quantity END)    AS cost,
+                          TOTAL(type * price * quantity)                          AS net,
+                          TOTAL(tax)                                              AS tax,
+                          TOTAL(discount)                                         AS discount
+                   FROM {source}{where_sql}
+                   GROUP BY key
+                   """, params)
+        for r in rows:
+            total = totals.get(r["key"])
+            if total is None:
+                totals[r["key"]] = dict(r)
+            else:
+                for column in r.keys()[1:]:
+                    total[column] += r[column]
+    return [TransactionSummary(**totals[key]) for key in sorted(totals, key=lambda k: (k is not None, k))]
+
+
+def archive_transactions(before: int) -> list[TransactionArchive]:
+    """
+    Move the transactions dated before January 1st of `before` out of the transactions table, into one
+    archive file per year (see archive.py). Only closed years can go: `before` is at most the current year.
+    Stock quantities don't change. A year archived earlier gets the transactions posted for it since
+    added to its file, and running it again after an interruption finishes the move.
+    Returns the archives of the years moved.
+    """
+    if before > datetime.now().year:
+        raise ValueError(f"Only closed years can be archived, {datetime.now().year} is still open")
+    conn, cursor = get_connection()
+    rows = fetch_all(cursor, "SELECT DISTINCT CAST(strftime('%Y', date) AS INTEGER) AS year FROM transactions "
+                             "WHERE date < ? ORDER BY year", (year_range(before)[0],))
+    years = [r["year"] for r in rows if r["year"] is not None]
+    detach_all(conn)  # the thread's connection, used by write_connection below
+    for year in years:
+        with write_connection("transactions", "transaction_archives") as (conn, cursor):
+            # The write lock is held from here: the copy and the DELETE below see the same rows
+            archived, first_id, last_id = copy_year(year)
+            # `moving` keeps the ledger trigger from giving the stock of the deleted rows back
+            cursor.execute("INSERT INTO transaction_archives (year, moving) VALUES (?, 1) "
+                           "ON CONFLICT (year) DO UPDATE SET moving = 1", (year,))
+            cursor.execute("DELETE FROM transactions WHERE date >= ? AND date < ?", year_range(year))
+            cursor.execute("UPDATE transaction_archives SET moving = 0, rows = ?, first_id = ?, last_id = ? "
+                           "WHERE year = ?", (archived, first_id, last_id, year))
+    return [a for a in list_transaction_archives() if a.year in years]
+
+
+def list_transaction_archives() -> list[TransactionArchive]:
+    """The archived years, oldest first."""
+    conn, cursor = get_connection()
+    rows = fetch_all(cursor, "SELECT year, rows, first_id, last_id FROM transaction_archives ORDER BY year")
+    return [TransactionArchive(file=archive_path(conn, r["year"]), **dict(r)) for r in rows]
@@ -1,88 +1,118 @@
-# user_statements.py
-from typing import Optional
-
-from .. import get_connection, db_lock
-from entities import User, HttpListResponse
-
-
-def add_user(user: User) -> int:
-    with db_lock:
-        conn, cursor = get_connection()
-        cursor.execute("""
-                       INSERT INTO users (name, username, password, rank)
-                       VALUES (?, ?, ?, ?)
-                       """, (user.name, user.username, user.password, user.rank))
-        conn.commit()
-        return cursor.lastrowid
-
-
-def update_user(user: User) -> int:
-    with db_lock:
-        if user.id is None:
-            raise ValueError("User ID must be provided for update")
-
-        conn, cursor = get_connection()
-        cursor.execute("""
-                       UPDATE users
-                       SET username     = ?,
-                           password     = ?,
-                           access_right = ?
-                       WHERE id = ?
-                       """, (
-                           user.username, user.password, user.access_right,
-                           user.id
-                       ))
-        conn.commit()
-        return cursor.rowcount
-
-
-def delete_user(user_id: int) -> bool:
-    with db_lock:
-        conn, cursor = get_connection()
-        cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
-        conn.commit()
-        return cursor.rowcount > 0  # True if a row was deleted. cursor.rowcount gives the number of affected rows
-
-
-def get_user(user_id: int) -> User | None:
-    with db_lock:
-        conn, cursor = get_connection()
-        cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
-        row = cursor.fetchone()
-        return User(**dict(row)) if row else None
-
-
-USER_FILTER_EXPR: str = "(name || ' ' || rank)"
-
-
-def list_users(offset: int, limit: int, filter: Optional[str] = None) -> HttpListResponse[User]:
-    with db_lock:
-        conn, cursor = get_connection()
-        filter_expr = "(name || ' ' || rank)"
-        params: list = []
-        query = "SELECT * FROM users"
-        count_query = "SELECT COUNT(*) FROM users"
-
-        if filter:
-            query += f" WHERE {filter_expr} LIKE ?"
-            count_query += f" WHERE {filter_expr} LIKE ?"
-            params.append(f"%{filter}%")
-
-        total = cursor.execute(count_query, params).fetchone()[0]
-        print(limit)
-        if limit > 0:
-            query += " LIMIT ? OFFSET ?"
-            params.extend([limit, offset])
-
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        users = [User(**dict(r)) for r in rows]
-        return HttpListResponse[User](total=total, body=users)
-
-
-def get_user_by_username(username: str) -> User | None:
-    with db_lock:
-        conn, cursor = get_connection()
-        cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
-        row = cursor.fetchone()
-        return User(**dict(row)) if row else None
+# user_statements.py
+from typing import Iterator, Optional
+
+from .. import get_connection
+from ..write_queue import Write, deleted, lastrowid, queued_write, rowcount
+from ..row_cache import cached, cached_many
+from .batch import fetch_by_ids
+from .bulk import bulk_upsert
+from .export import export_rows
+from .fast_json import encode_page
+from .pagination import paginate, CountMode
+from .search import filter_clause
+from entities import User, HttpListResponse
+
+
+@queued_write
+def add_user(user: User) -> Write[int]:
+    return Write("users", """
+                 INSERT INTO users (name, username, password, rank)
+                 VALUES (?, ?, ?, ?)
+                 """, (user.name, user.username, user.password, user.rank), lastrowid)
+
+
+@queued_write
+def update_user(user: User) -> Write[int]:
+    if user.id is None:
+        raise ValueError("User ID must be provided for update")
+
+    return Write("users", """
+                 UPDATE users
+                 SET username     = ?,
+                     password     = ?,
+                     access_right = ?
+                 WHERE id = ?
+                 """, (
+                     user.username, user.password, user.access_right,
+                     user.id
+                 ), rowcount)
+
+
+@queued_write
+def update_user_password(user_id: int, hashed_password: str) -> Write[int]:
+    """Replace a user's stored password hash. Returns the number of rows updated."""
+    return Write("users", "UPDATE users SET password = ? WHERE id = ?", (hashed_password, user_id), rowcount)
+
+
+@queued_write
+def delete_user(user_id: int) -> Write[bool]:
+    return Write("users", "DELETE FROM users WHERE id = ?", (user_id,), deleted)
+
+
+USER_COLUMNS: list[str] = ["name", "username", "password", "rank"]
+
+
+def upsert_users(users: list[User]) -> list[tuple[int | None, str | None]]:
+    """
+    Insert users without an id and insert-or-update those with one, in a single transaction.
+    Returns one (id, error) pair per user, in input order.
+    """
+    return bulk_upsert("users", USER_COLUMNS,
+                       [(r.id, tuple(getattr(r, c) for c in USER_COLUMNS)) for r in users])
+
+
+@cached("users")
+def get_user(user_id: int) -> User | None:
+    conn, cursor = get_connection()
+    cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
+    row = cursor.fetchone()
+    return User(**dict(row)) if row else None
+
+
+@cached_many("users")
+def get_users(user_ids: list[int]) -> list[User]:
+    """Users whose id is in user_ids, read in one query (the unknown ids are left out)."""
+    conn, cursor = get_connection()
+    return [User(**dict(r)) for r in fetch_by_ids(cursor, "users", user_ids)]
+
+
+USER_FILTER_EXPR: str = "(name || ' ' || rank)"
+
+
+def list_users(offset: int, limit: int, filter: Optional[str] = None, after: Optional[int] = None,
+               before: Optional[int] = None, count: CountMode = "exact",
+               as_json: bool = False) -> HttpListResponse[User] | bytes:
+    conn, cursor = get_connection()
+    where_clauses: list[str] = []
+    params: list = []
+
+    if filter:
+        clause, clause_params = filter_clause("users", filter, USER_FILTER_EXPR)
+        where_clauses.append(clause)
+        params.extend(clause_params)
+
+    total, rows, next_cursor = paginate(cursor, "users", where_clauses, params, offset, limit, after, before, count)
+    if as_json:
+        return encode_page(User, total, rows, next_cursor)
+    users = [User(**dict(r)) for r in rows]
+    return HttpListResponse[User](total=total, body=users, next_cursor=next_cursor)
+
+
+def get_user_by_username(username: str) -> User | None:
+    conn, cursor = get_connection()
+    cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
+    row = cursor.fetchone()
+    return User(**dict(row)) if row else None
+
+
+def export_users(filter: Optional[str] = None) -> Iterator[list[User]]:
+    """Stream every user matching the filter, in id order, one chunk of User objects at a time."""
+    where_clauses: list[str] = []
+    params: list = []
+    if filter:
+        clause, clause_params = filter_clause("users", filter, USER_FILTER_EXPR)
+        where_clauses.append(clause)
+        params.extend(clause_params)
+
+    for rows in export_rows("users", where_clauses, params):
+        yield [User(**dict(r)) for r in rows]
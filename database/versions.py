@@ -0,0 +1,92 @@
+# versions.py
+# Write versions of the tables, shared by every process serving the database file: they live in the
+# table_versions table and are bumped in the same transaction as the write (see sql.write_connection).
+# This module keeps the versions this process has caught up with, and drops its cached counts and
+# rows of a table when its version moves.
+import sqlite3
+import threading
+from typing import Callable, Iterable
+
+from . import count_cache, row_cache
+
+# Row of table_versions holding a random number drawn by every init_db, so a version seen
+# before a restart (or in another database file) never matches again
+EPOCH_ROW = ""
+
+_lock = threading.Lock()
+_epoch = 0
+_versions: dict[str, int] = {}
+
+
+def bump(conn: sqlite3.Connection, tables: Iterable[str]) -> dict[str, int]:
+    """Advance the versions of `tables` inside the open write transaction. Returns their new versions."""
+    tables = list(tables)
+    conn.executemany("INSERT INTO table_versions (name, version) VALUES (?, 1) "
+                     "ON CONFLICT (name) DO UPDATE SET version = version + 1", [(t,) for t in tables])
+    marks = ", ".join("?" * len(tables))
+    return dict(conn.execute(f"SELECT name, version FROM table_versions WHERE name IN ({marks})", tables).fetchall())
+
+
+def _invalidate(tables: Iterable[str]):
+    for table in tables:
+        count_cache.invalidate(table)
+        row_cache.invalidate(table)
+
+
+def advance(stored: dict[str, int]):
+    """Take the versions a committed write of this process stored (its caches are already dropped)."""
+    with _lock:
+        for table, version in stored.items():
+            if version > _versions.get(table, 0):
+                _versions[table] = version
+
+
+def commit(conn: sqlite3.Connection, stored: dict[str, int], drop_caches: Callable[[], None]):
+    """
+    Commit the write transaction that bumped `stored`, call `drop_caches` (the cached rows and counts
+    it changed) and take its versions, all under the lock refresh() compares under: a reader catching
+    up in between doesn't see the versions move, so it doesn't drop whole tables that `drop_caches`
+    drops row by row, and no new version is published before the caches are dropped.
+    """
+    with _lock:
+        try:
+            conn.commit()
+        finally:
+            drop_caches()
+        for table, version in stored.items():
+            if version > _versions.get(table, 0):
+                _versions[table] = version
+
+
+def refresh(rows: Iterable[tuple[str, int]]):
+    """
+    Catch up with the stored versions (every row of table_versions), written by other processes
+    or other connections: the cached counts and rows of the tables that moved are dropped before
+    their new versions are published, so a new ETag never goes out with an old cached row.
+    """
+    global _epoch
+    stored = dict(rows)
+    epoch = stored.pop(EPOCH_ROW, 0)
+    with _lock:
+        new_epoch = epoch != _epoch
+        if new_epoch:
+            moved = set(stored) | set(_versions)
+        else:
+            # Versions only go up: a reader applying an older snapshot late must not undo a newer one
+            moved = {table for table, version in stored.items() if version > _versions.get(table, 0)}
+    if not moved and not new_epoch:
+        return
+    _invalidate(moved)
+    with _lock:
+        if new_epoch and epoch != _epoch:
+            _epoch = epoch
+            _versions.clear()
+        for table in moved:
+            if stored.get(table, 0) > _versions.get(table, 0):
+                _versions[table] = stored[table]
+
+
+def table_versions(*tables: str) -> str:
+    """Return a token that changes whenever one of the tables is written, e.g. "3f9a1c2e:12.4"."""
+    with _lock:
+        return f"{_epoch:08x}:" + ".".join(str(_versions.get(t, 0)) for t in tables)
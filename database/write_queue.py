@@ -0,0 +1,208 @@
+# write_queue.py
+# Group commit of the single-row writes (add_*, update_*, delete_*): they are queued to one writer
+# thread, which runs every write that arrives within GROUP_COMMIT_WINDOW (up to GROUP_COMMIT_MAX)
+# in a single SQLite transaction, so a burst of inserts pays one commit instead of one per row.
+# Each caller still gets its own lastrowid / rowcount, or its own error, once the batch is committed.
+import functools
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Generic, NamedTuple, TypeVar
+
+from . import count_cache, metrics, row_cache, sql, versions
+
+# Seconds the writer keeps collecting writes after the first one of a batch. Writes already queued
+# are always taken: under load a batch is whatever arrived during the previous commit, so the
+# default adds no wait. A small window (0.0005) can make batches larger on a slow disk.
+GROUP_COMMIT_WINDOW = float(os.getenv("ERP_GROUP_COMMIT_WINDOW", "0"))
+# Largest number of writes committed together
+GROUP_COMMIT_MAX = int(os.getenv("ERP_GROUP_COMMIT_MAX", "1000"))
+
+
+class WriteResult(NamedTuple):
+    """What a queued write reports back, as the cursor would have after running it alone."""
+    lastrowid: int | None
+    rowcount: int
+
+
+T = TypeVar("T")
+
+
+class Write(NamedTuple, Generic[T]):
+    """
+    A single-row write as the add_* / update_* / delete_* statements describe it (see queued_write):
+    the statement for the writer thread and how its WriteResult becomes what the caller gets back.
+    """
+    table: str
+    statement: str
+    params: tuple
+    result: Callable[[WriteResult], T]
+
+
+def lastrowid(result: WriteResult) -> int:
+    return result.lastrowid
+
+
+def rowcount(result: WriteResult) -> int:
+    return result.rowcount
+
+
+def deleted(result: WriteResult) -> bool:
+    return result.rowcount > 0  # True if a row was deleted. rowcount gives the number of affected rows
+
+
+def queued_write(build: Callable[..., Write[T]]) -> Callable[..., T]:
+    """
+    Decorator of the statements that build a Write: calling the statement runs the write through
+    the writer thread, waits for its commit and returns its result. `build` stays reachable as
+    `.write`, for database.aio to queue the write and await the commit without holding a worker.
+    """
+    @functools.wraps(build)
+    def wrapper(*args, **kwargs) -> T:
+        write = build(*args, **kwargs)
+        return write.result(execute_write(write.table, write.statement, write.params))
+    wrapper.write = build
+    return wrapper
+
+
+class _Write(NamedTuple):
+    tables: list[str]  # the written table and the tables its triggers write to
+    statement: str
+    params: tuple
+    future: Future
+
+
+_queue: "queue.SimpleQueue[_Write]" = queue.SimpleQueue()
+_writer: threading.Thread | None = None
+_writer_lock = threading.Lock()
+
+
+def submit_write(table: str, statement: str, params: tuple = ()) -> Future:
+    """Queue one INSERT / UPDATE / DELETE of `table`. The future resolves once its batch is committed."""
+    future = Future()
+    _queue.put(_Write(sql.written_tables((table,)), statement, tuple(params), future))
+    _start_writer()
+    return future
+
+
+def execute_write(table: str, statement: str, params: tuple = ()) -> WriteResult:
+    """Run one INSERT / UPDATE / DELETE of `table` through the writer thread and wait for its commit."""
+    return submit_write(table, statement, params).result()
+
+
+def _start_writer():
+    global _writer
+    if _writer is not None and _writer.is_alive():
+        return
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_write_loop, name="erp-writer", daemon=True)
+            _writer.start()
+
+
+def _collect() -> list[_Write]:
+    """Wait for a write, then take the ones queued behind it and those arriving within the window."""
+    batch = [_queue.get()]
+    deadline = time.perf_counter() + GROUP_COMMIT_WINDOW
+    while len(batch) < GROUP_COMMIT_MAX:
+        try:
+            batch.append(_queue.get_nowait())
+            continue
+        except queue.Empty:
+            pass
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return batch
+
+
+def _write_loop():
+    while True:
+        batch = _collect()
+        waiting = time.perf_counter()
+        try:
+            with sql.db_lock:
+                metrics.lock_wait_seconds.observe(time.perf_counter() - waiting)
+                _commit(batch)
+        except BaseException as e:  # never leave a caller waiting on a future nobody will resolve
+            for write in batch:
+                if not write.future.done():
+                    write.future.set_exception(e)
+
+
+def _track_changes(conn: sqlite3.Connection) -> set[str]:
+    """
+    Make the writer's connection record in temp.changed_rows the id of every row of a row-cached table
+    that a write changes, including the rows its triggers change (the product of a transaction), so the
+    row cache drops those rows only. TEMP triggers: the other connections don't pay for them.
+    Returns the tables tracked.
+    """
+    names = {r[0] for r in conn.execute("SELECT name FROM temp.sqlite_master")}
+    if "changed_rows" not in names:
+        conn.execute("CREATE TEMP TABLE changed_rows (name TEXT NOT NULL, id INTEGER NOT NULL)")
+    for table in row_cache.TABLES:
+        for event, rows in (("insert", "new"), ("update", "old"), ("delete", "old")):
+            name = f"changed_{table}_{event}"
+            if name not in names:
+                conn.execute(f"CREATE TEMP TRIGGER {name} AFTER {event.upper()} ON main.{table} BEGIN "
+                             f"INSERT INTO changed_rows VALUES ('{table}', {rows}.id); END")
+    return set(row_cache.TABLES)
+
+
+def _commit(batch: list[_Write]):
+    """
+    Run a batch in one transaction, db_lock held. A write that fails (constraint, trigger RAISE(ABORT))
+    is undone by SQLite on its own and reported to its caller; the others go on. An error that rolls
+    back the whole transaction (disk full, I/O) or a failed commit is reported to every write of the batch.
+    """
+    metrics.write_batch_size.observe(len(batch))
+    done: list[tuple[_Write, WriteResult]] = []
+    written: list[str] = []
+    conn, cursor = sql.get_connection()  # the writer thread's own pooled connection
+    try:
+        conn.execute("BEGIN IMMEDIATE")  # across processes, waits up to BUSY_TIMEOUT for SQLite's write lock
+    except sqlite3.Error as e:
+        for write in batch:
+            write.future.set_exception(e)
+        return
+    changed: dict[str, list[int]] = {}
+
+    def drop_caches():
+        for table in written:
+            count_cache.invalidate(table)
+            if table in tracked:
+                row_cache.invalidate_rows(table, changed.get(table, ()))
+            else:
+                row_cache.invalidate(table)
+
+    try:
+        tracked = _track_changes(conn)
+        for write in batch:
+            try:
+                cursor.execute(write.statement, write.params)
+            except Exception as e:
+                if not conn.in_transaction:
+                    raise
+                write.future.set_exception(e)
+                continue
+            done.append((write, WriteResult(cursor.lastrowid, cursor.rowcount)))
+            written.extend(t for t in write.tables if t not in written)
+        for table, row_id in conn.execute("SELECT DISTINCT name, id FROM temp.changed_rows").fetchall():
+            changed.setdefault(table, []).append(row_id)
+        conn.execute("DELETE FROM temp.changed_rows")
+        versions.commit(conn, versions.bump(conn, written) if written else {}, drop_caches)
+    except Exception as e:
+        conn.rollback()
+        for write in batch:
+            if not write.future.done():
+                write.future.set_exception(e)
+        return
+    for write, result in done:
+        write.future.set_result(result)
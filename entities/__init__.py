@@ -1,9 +1,21 @@
-from .center import Center
-from .stock import Stock
-from .user import User
-from .supplier import Supplier
-from .transaction import Transaction
-from .product import Product
-from .http_list_response import HttpListResponse
-
-__all__ = ["Center", "Stock", "User", "Supplier", "Transaction", "Product", "HttpListResponse"]
+from .center import Center
+from .stock import Stock
+from .user import User
+from .supplier import Supplier
+from .transaction import Transaction
+from .product import Product
+from .product_input import ProductInput
+from .http_list_response import HttpListResponse
+from .http_bulk_response import HttpBulkResponse, HttpBulkRowResult
+from .transaction_summary import TransactionSummary
+from .stock_inventory import StockInventory
+from .center_inventory import CenterInventory
+from .slow_query import SlowQuery
+from .expanded_transaction import ExpandedTransaction
+from .expanded_product import ExpandedProduct
+from .expanded_stock import ExpandedStock
+from .transaction_archive import TransactionArchive
+
+__all__ = ["Center", "Stock", "User", "Supplier", "Transaction", "Product", "ProductInput", "HttpListResponse",
+           "HttpBulkResponse", "HttpBulkRowResult", "TransactionSummary", "StockInventory", "CenterInventory",
+           "SlowQuery", "ExpandedTransaction", "ExpandedProduct", "ExpandedStock", "TransactionArchive"]
@@ -0,0 +1,21 @@
+from pydantic import BaseModel, Field
+
+
+class CenterInventory(BaseModel):
+    """
+    Precomputed inventory totals of one center (all of its stocks), kept current by the
+    database on every product, stock and transaction write.
+
+    Attributes:
+    - center_id: ID of the center.
+    - products: number of products stored in the center's stocks.
+    - units: total quantity of those products.
+    - purchase_value: sum of quantity * purchase_price.
+    - sale_value: sum of quantity * sale_price.
+    """
+
+    center_id: int = Field(..., description="ID of the center")
+    products: int = Field(default=0, description="Number of products")
+    units: float = Field(default=0, description="Total quantity")
+    purchase_value: float = Field(default=0, description="Value at purchase price")
+    sale_value: float = Field(default=0, description="Value at sale price")
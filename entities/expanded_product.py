@@ -0,0 +1,14 @@
+from pydantic import Field
+
+from .center import Center
+from .product import Product
+from .stock import Stock
+
+
+class ExpandedProduct(Product):
+    """
+    A Product listed with ?expand=: its stock and the center of that stock, resolved by the
+    same query. A relation that wasn't asked for (or whose row is gone) stays None.
+    """
+    stock: Stock | None = Field(default=None, description="The stock, with expand=stock")
+    center: Center | None = Field(default=None, description="The center of the stock, with expand=center")
@@ -0,0 +1,12 @@
+from pydantic import Field
+
+from .center import Center
+from .stock import Stock
+
+
+class ExpandedStock(Stock):
+    """
+    A Stock listed with ?expand=center: the center it belongs to, resolved by the same query.
+    None when it wasn't asked for (or the center is gone).
+    """
+    center: Center | None = Field(default=None, description="The center, with expand=center")
@@ -0,0 +1,14 @@
+from pydantic import Field
+
+from .product import Product
+from .supplier import Supplier
+from .transaction import Transaction
+
+
+class ExpandedTransaction(Transaction):
+    """
+    A Transaction listed with ?expand=: the product and supplier it refers to, resolved by the
+    same query. A relation that wasn't asked for (or whose row is gone) stays None.
+    """
+    product: Product | None = Field(default=None, description="The product, with expand=product")
+    supplier: Supplier | None = Field(default=None, description="The supplier, with expand=supplier")
@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+
+
+class HttpBulkRowResult(BaseModel):
+    """
+    Outcome of one row of a bulk write.
+    - index: position of the row in the request (array index or NDJSON line number, from 0).
+    - id: id of the inserted/updated row, None if it failed.
+    - error: validation or database error, None if it succeeded.
+    """
+    index: int
+    id: int | None = None
+    error: str | None = None
+
+
+class HttpBulkResponse(BaseModel):
+    succeeded: int
+    failed: int
+    results: list[HttpBulkRowResult]
+
+    @staticmethod
+    def from_results(results: list[HttpBulkRowResult]) -> "HttpBulkResponse":
+        failed = sum(1 for r in results if r.error is not None)
+        return HttpBulkResponse(succeeded=len(results) - failed, failed=failed, results=results)
@@ -1,12 +1,13 @@
-from typing import Generic, TypeVar
-from pydantic import BaseModel  
-T = TypeVar("T")
-
-
-class HttpListResponse(BaseModel, Generic[T]):
-    total: int
-    body: list[T]
-
-    @staticmethod
-    def from_data(items: list[T], total: int) -> "HttpListResponse[T]":
-        return HttpListResponse(total=total, body=items)
+from typing import Generic, TypeVar
+from pydantic import BaseModel  
+T = TypeVar("T")
+
+
+class HttpListResponse(BaseModel, Generic[T]):
+    total: int | None  # None when the client asked for count=none
+    body: list[T]
+    next_cursor: int | None = None  # id to pass as after= (or before=) for the next keyset page
+
+    @staticmethod
+    def from_data(items: list[T], total: int | None, next_cursor: int | None = None) -> "HttpListResponse[T]":
+        return HttpListResponse(total=total, body=items, next_cursor=next_cursor)
@@ -0,0 +1,11 @@
+from pydantic import Field
+
+from .product import Product
+
+
+class ProductInput(Product):
+    """
+    A Product as a client creates or updates it. Its quantity can't be set below zero:
+    only the transactions take a product there (more went out than came in).
+    """
+    quantity: float = Field(default=0, ge=0, description="Available quantity")
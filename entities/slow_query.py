@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+
+class SlowQuery(BaseModel):
+    """
+    A query that ran above the slow-query threshold, with every slow run of the same SQL added up.
+
+    Attributes:
+    - sql: the SQL text, with ? placeholders.
+    - calls: number of slow runs.
+    - total_ms, max_ms, avg_ms: duration of those runs, fetching the rows included.
+    - rows: rows returned by the last slow run.
+    - params: bound parameters of the last slow run, redacted unless ERP_SLOW_QUERY_REDACT=0.
+    - plan: EXPLAIN QUERY PLAN of the SQL, one line per step, indented by depth.
+    - last_seen: time of the last slow run.
+    """
+
+    sql: str = Field(..., description="SQL text with ? placeholders")
+    calls: int = Field(default=0, description="Number of slow runs")
+    total_ms: float = Field(default=0, description="Total duration of the slow runs (ms)")
+    max_ms: float = Field(default=0, description="Longest slow run (ms)")
+    avg_ms: float = Field(default=0, description="Average slow run (ms)")
+    rows: int = Field(default=0, description="Rows returned by the last slow run")
+    params: list = Field(default_factory=list, description="Redacted parameters of the last slow run")
+    plan: list[str] = Field(default_factory=list, description="EXPLAIN QUERY PLAN output")
+    last_seen: datetime = Field(..., description="Time of the last slow run")
@@ -0,0 +1,21 @@
+from pydantic import BaseModel, Field
+
+
+class StockInventory(BaseModel):
+    """
+    Precomputed inventory totals of one stock, kept current by the database on every product
+    and transaction write.
+
+    Attributes:
+    - stock_id: ID of the stock.
+    - products: number of products stored in the stock.
+    - units: total quantity of those products.
+    - purchase_value: sum of quantity * purchase_price.
+    - sale_value: sum of quantity * sale_price.
+    """
+
+    stock_id: int = Field(..., description="ID of the stock")
+    products: int = Field(default=0, description="Number of products")
+    units: float = Field(default=0, description="Total quantity")
+    purchase_value: float = Field(default=0, description="Value at purchase price")
+    sale_value: float = Field(default=0, description="Value at sale price")
@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+
+
+class TransactionArchive(BaseModel):
+    """
+    A closed year of transactions, moved out of the transactions table into its own SQLite file.
+
+    Attributes:
+    - year: the calendar year archived.
+    - file: path of the archive file.
+    - rows: number of transactions in it.
+    - first_id, last_id: lowest and highest transaction id in it (ids are kept when moved).
+    """
+
+    year: int = Field(..., description="Archived year")
+    file: str = Field(..., description="Path of the archive file")
+    rows: int = Field(default=0, description="Transactions in the archive")
+    first_id: int | None = Field(default=None, description="Lowest transaction id archived")
+    last_id: int | None = Field(default=None, description="Highest transaction id archived")
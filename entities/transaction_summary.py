@@ -0,0 +1,25 @@
+from pydantic import BaseModel, Field
+
+
+class TransactionSummary(BaseModel):
+    """
+    One row of an aggregated transactions report.
+
+    Attributes:
+    - key: the group: a day (YYYY-MM-DD), an ISO 8601 week (YYYY-Www), a month (YYYY-MM), a supplier id or a product id.
+    - count: number of transactions in the group.
+    - quantity: total quantity moved.
+    - revenue: sum of price * quantity of income transactions (type = 1).
+    - cost: sum of price * quantity of outcome transactions (type = -1).
+    - net: sum of type * price * quantity (revenue - cost).
+    - tax, discount: totals of the tax and discount columns.
+    """
+
+    key: str | int = Field(..., description="Day, week, month, supplier id or product id")
+    count: int = Field(default=0, description="Number of transactions")
+    quantity: float = Field(default=0, description="Total quantity")
+    revenue: float = Field(default=0, description="Income total (type = 1)")
+    cost: float = Field(default=0, description="Outcome total (type = -1)")
+    net: float = Field(default=0, description="Sum of type * price * quantity")
+    tax: float = Field(default=0, description="Total tax")
+    discount: float = Field(default=0, description="Total discount")
@@ -1,135 +1,214 @@
-import random
-from datetime import datetime, timedelta
-
-from database import init_db, get_connection, hash_password
-
-DB_FILE = "erp-generated.db"
-
-# Initialize schema
-conn, cursor = get_connection(DB_FILE)
-init_db()
-# -----------------------------
-# Helpers
-# -----------------------------
-first_names = ["Ali", "Moussa", "Hassan", "Mourad", "Amina", "Fatima", "Sara", "Nadia", "Omar", "Karim"]
-last_names = ["Benali", "Haddad", "Boukhalfa", "Saidi", "Khaled", "Tahar", "Rahmani", "Cherif", "Aziz", "Djebbar"]
-cities = ["Algiers", "Oran", "Constantine", "Annaba", "Blida", "Setif", "Tlemcen", "Batna", "Bejaia", "Ghardaia"]
-products = ["Milk", "Sugar", "Flour", "Rice", "Oil", "Tea", "Coffee", "Butter", "Juice", "Water"]
-
-def random_date(start_year=2020, end_year=2025):
-    start = datetime(start_year, 1, 1)
-    end = datetime(end_year, 12, 31)
-    delta = end - start
-    return (start + timedelta(days=random.randint(0, delta.days))).strftime("%Y-%m-%d")
-
-# -----------------------------
-# Users (50)
-# -----------------------------
-cursor.execute("DELETE FROM users")
-cursor.execute(
-    "INSERT INTO users (name, username, password, rank) VALUES (?, ?, ?, ?)",
-    ("Manager", "Manager", hash_password("123456789"), 3)
-)
-for i in range(1, 50):
-    name = random.choice(first_names) + " " + random.choice(last_names)
-    username = f"user{i}"
-    password = hash_password(random.choice(first_names))
-    rank = random.randint(1, 3)
-    cursor.execute(
-        "INSERT INTO users (name, username, password, rank) VALUES (?, ?, ?, ?)",
-        (name, username, password, rank)
-    )
-
-# -----------------------------
-# Suppliers (1000+)
-# -----------------------------
-cursor.execute("DELETE FROM suppliers")
-for _ in range(1000):
-    firstname = random.choice(first_names)
-    lastname = random.choice(last_names)
-    supplier_type = random.choice(['provider', 'consumer', 'both'])
-    contract_date = random_date(2018, 2025)
-    cursor.execute(
-        "INSERT INTO suppliers (firstname, lastname, type, contract_date) VALUES (?, ?, ?, ?)",
-        (firstname, lastname, supplier_type, contract_date)
-    )
-
-# -----------------------------
-# Centers (1000+)
-# -----------------------------
-cursor.execute("DELETE FROM centers")
-for i in range(1000):
-    name = f"Center-{i}"
-    city = random.choice(cities)
-    address = f"Street {random.randint(1, 200)}"
-    phone = f"+213{random.randint(600000000, 799999999)}"
-    email = f"center{i}@mail.com"
-    cursor.execute(
-        "INSERT INTO centers (name, city, address, phone, email) VALUES (?, ?, ?, ?, ?)",
-        (name, city, address, phone, email)
-    )
-
-# -----------------------------
-# Stocks (1000+)
-# -----------------------------
-cursor.execute("DELETE FROM stocks")
-cursor.execute("SELECT id FROM centers")
-center_ids = [row[0] for row in cursor.fetchall()]
-for i in range(1000):
-    name = f"Stock-{i}"
-    city = random.choice(cities)
-    address = f"Warehouse Road {random.randint(1, 200)}"
-    center_id = random.choice(center_ids)
-    cursor.execute(
-        "INSERT INTO stocks (name, city, address, center_id) VALUES (?, ?, ?, ?)",
-        (name, city, address, center_id)
-    )
-
-# -----------------------------
-# Products (1200+)
-# -----------------------------
-cursor.execute("DELETE FROM products")
-cursor.execute("SELECT id FROM stocks")
-stock_ids = [row[0] for row in cursor.fetchall()]
-for i in range(1200):
-    name = random.choice(products) + f"-{i}"
-    description = f"{name} description"
-    stock_id = random.choice(stock_ids)
-    quantity = random.uniform(1, 500)  # REAL field
-    expiration_date = random_date(2025, 2030)
-    purchase_price = random.randint(10, 200)
-    sale_price = purchase_price + random.randint(1, 50)
-    cursor.execute(
-        """INSERT INTO products 
-        (name, description, stock_id, quantity, expiration_date, purchase_price, sale_price) 
-        VALUES (?, ?, ?, ?, ?, ?, ?)""",
-        (name, description, stock_id, quantity, expiration_date, purchase_price, sale_price)
-    )
-
-# -----------------------------
-# Transactions (1500+)
-# -----------------------------
-cursor.execute("DELETE FROM transactions")
-cursor.execute("SELECT id FROM users")
-user_ids = [row[0] for row in cursor.fetchall()]
-cursor.execute("SELECT id FROM products")
-product_ids = [row[0] for row in cursor.fetchall()]
-for _ in range(1500):
-    supplier_id = random.choice(user_ids)
-    product_id = random.choice(product_ids)
-    date = random_date(2022, 2025) + " 12:00:00"
-    trans_type = random.choice([1, -1])
-    price = random.randint(50, 500)
-    quantity = random.uniform(1, 100)
-    tax = random.uniform(0, 20)
-    discount = random.uniform(0, 10)
-    cursor.execute(
-        """INSERT INTO transactions 
-        (supplier_id, date, product_id, type, price, quantity, tax, discount) 
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-        (supplier_id, date, product_id, trans_type, price, quantity, tax, discount)
-    )
-
-# Commit
-conn.commit()
-print("Database populated with sample data ✅")
+import argparse
+import random
+import sqlite3
+import time
+from array import array
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Iterable, Iterator
+
+from database import init_db, get_connection, hash_password
+from database.sql import INVENTORY_REBUILD, fts_tables
+
+DB_FILE = "erp-generated.db"
+
+# Rows written per transaction: large enough to amortize the commit, small enough to keep the WAL file bounded
+BATCH_SIZE = 100_000
+
+# -----------------------------
+# Helpers
+# -----------------------------
+first_names = ["Ali", "Moussa", "Hassan", "Mourad", "Amina", "Fatima", "Sara", "Nadia", "Omar", "Karim"]
+last_names = ["Benali", "Haddad", "Boukhalfa", "Saidi", "Khaled", "Tahar", "Rahmani", "Cherif", "Aziz", "Djebbar"]
+cities = ["Algiers", "Oran", "Constantine", "Annaba", "Blida", "Setif", "Tlemcen", "Batna", "Bejaia", "Ghardaia"]
+products = ["Milk", "Sugar", "Flour", "Rice", "Oil", "Tea", "Coffee", "Butter", "Juice", "Water"]
+
+
+def parse_rows(value: str) -> int:
+    """Rows per table: a number, optionally with a k or M suffix (10k, 2.5M)."""
+    units = {"k": 1_000, "m": 1_000_000}
+    suffix = value[-1].lower()
+    if suffix in units:
+        return int(float(value[:-1]) * units[suffix])
+    return int(value)
+
+
+def random_date(rng: random.Random, start_year=2020, end_year=2025) -> str:
+    start = datetime(start_year, 1, 1)
+    end = datetime(end_year, 12, 31)
+    delta = end - start
+    return (start + timedelta(days=rng.randint(0, delta.days))).strftime("%Y-%m-%d")
+
+
+def insert_many(conn, table: str, columns: list[str], rows: Iterable[tuple]) -> int:
+    """Insert rows with executemany, committing every BATCH_SIZE rows. Returns the number of rows."""
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    cursor = conn.cursor()
+    iterator = iter(rows)
+    total = 0
+    while batch := list(islice(iterator, BATCH_SIZE)):
+        cursor.executemany(sql, batch)
+        conn.commit()
+        total += len(batch)
+    return total
+
+
+@contextmanager
+def triggers_dropped(conn: sqlite3.Connection):
+    """
+    Drop every trigger (full-text indexes, inventory ledger and rollups) for a bulk load and
+    restore them afterwards. The caller rebuilds what they maintain.
+    """
+    triggers = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'").fetchall()
+    for name, _ in triggers:
+        conn.execute(f"DROP TRIGGER {name}")
+    conn.commit()
+    try:
+        yield
+    finally:
+        for _, sql in triggers:
+            conn.execute(sql)
+        conn.commit()
+
+
+def initial_quantities(seed: int, rows: int) -> array:
+    """Quantity of every product before any transaction (product id i + 1 at index i)."""
+    rng = random.Random(f"{seed}-quantities")
+    return array("d", (rng.uniform(1, 500) for _ in range(rows)))
+
+
+def transaction_rows(seed: int, rows: int, quantities: array) -> Iterator[tuple]:
+    """
+    The transactions, always the same for a seed. `quantities` is updated like the inventory
+    ledger would, and sales never take more than the product holds.
+    """
+    rng = random.Random(f"{seed}-transactions")
+    for _ in range(rows):
+        product_id = rng.randint(1, rows)
+        trans_type = rng.choice([1, -1])
+        quantity = rng.uniform(1, 100)
+        if trans_type == 1:
+            quantity = min(quantity, quantities[product_id - 1])
+        quantities[product_id - 1] -= trans_type * quantity
+        yield (rng.randint(1, rows), random_date(rng, 2022, 2025) + " 12:00:00", product_id, trans_type,
+               rng.randint(50, 500), quantity, rng.uniform(0, 20), rng.uniform(0, 10))
+
+
+def generate(db_file: str = DB_FILE, rows: int = 1000, seed: int = 42, keep_manager: bool = False):
+    """
+    Fill db_file with `rows` suppliers, centers, stocks, products and transactions (and rows / 100 users,
+    at least 50), replacing what the tables held. The same rows and seed always produce the same data.
+    - keep_manager: keep the existing "Manager" account instead of recreating it.
+    """
+    rng = random.Random(seed)
+    conn, cursor = get_connection(db_file)
+    init_db()
+
+    # Products go before transactions: deleting a transaction would move the quantity of its product back
+    for table in ("products", "transactions", "stocks", "centers", "suppliers"):
+        cursor.execute(f"DELETE FROM {table}")
+    cursor.execute("DELETE FROM users" + (" WHERE username != 'Manager'" if keep_manager else ""))
+    cursor.execute("DELETE FROM sqlite_sequence WHERE name != 'users'" if keep_manager else
+                   "DELETE FROM sqlite_sequence")
+    conn.commit()
+
+    timings: dict[str, float] = {}
+
+    def timed(name: str, count: int, started: float):
+        timings[name] = time.perf_counter() - started
+        print(f"{name:<13}{count:>11,} rows {timings[name]:8.2f}s")
+
+    with triggers_dropped(conn):
+        # -----------------------------
+        # Users (rows / 100, at least 50)
+        # -----------------------------
+        started = time.perf_counter()
+        user_count = max(50, rows // 100)
+        if not keep_manager:
+            cursor.execute("INSERT INTO users (name, username, password, rank) VALUES (?, ?, ?, ?)",
+                           ("Manager", "Manager", hash_password("123456789"), 3))
+        password = hash_password("password")  # one bcrypt hash shared by every generated user
+        first_user = cursor.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM users").fetchone()[0]
+        count = insert_many(conn, "users", ["name", "username", "password", "rank"], (
+            (rng.choice(first_names) + " " + rng.choice(last_names), f"user{i}", password, rng.randint(1, 3))
+            for i in range(first_user, first_user + user_count - 1)))
+        timed("users", count + 1, started)
+
+        # -----------------------------
+        # Suppliers
+        # -----------------------------
+        started = time.perf_counter()
+        count = insert_many(conn, "suppliers", ["firstname", "lastname", "type", "contract_date"], (
+            (rng.choice(first_names), rng.choice(last_names), rng.choice(["provider", "consumer", "both"]),
+             random_date(rng, 2018, 2025))
+            for _ in range(rows)))
+        timed("suppliers", count, started)
+
+        # -----------------------------
+        # Centers
+        # -----------------------------
+        started = time.perf_counter()
+        count = insert_many(conn, "centers", ["name", "city", "address", "phone", "email"], (
+            (f"Center-{i}", rng.choice(cities), f"Street {rng.randint(1, 200)}",
+             f"+213{rng.randint(600000000, 799999999)}", f"center{i}@mail.com")
+            for i in range(rows)))
+        timed("centers", count, started)
+
+        # -----------------------------
+        # Stocks (ids of a fresh table are 1..rows)
+        # -----------------------------
+        started = time.perf_counter()
+        count = insert_many(conn, "stocks", ["name", "city", "address", "center_id"], (
+            (f"Stock-{i}", rng.choice(cities), f"Warehouse Road {rng.randint(1, 200)}", rng.randint(1, rows))
+            for i in range(rows)))
+        timed("stocks", count, started)
+
+        # -----------------------------
+        # Products, stored with the quantity left once every transaction below has been applied
+        # (the ledger triggers are off during the load)
+        # -----------------------------
+        started = time.perf_counter()
+        quantities = initial_quantities(seed, rows)
+        for _ in transaction_rows(seed, rows, quantities):
+            pass
+
+        def product_rows() -> Iterator[tuple]:
+            for i in range(rows):
+                name = rng.choice(products) + f"-{i}"
+                purchase_price = rng.randint(10, 200)
+                yield (name, f"{name} description", rng.randint(1, rows), quantities[i],
+                       random_date(rng, 2025, 2030), purchase_price, purchase_price + rng.randint(1, 50))
+
+        count = insert_many(conn, "products", ["name", "description", "stock_id", "quantity", "expiration_date",
+                                               "purchase_price", "sale_price"], product_rows())
+        timed("products", count, started)
+
+        # -----------------------------
+        # Transactions
+        # -----------------------------
+        started = time.perf_counter()
+        count = insert_many(conn, "transactions", ["supplier_id", "date", "product_id", "type", "price", "quantity",
+                                                   "tax", "discount"],
+                            transaction_rows(seed, rows, initial_quantities(seed, rows)))
+        timed("transactions", count, started)
+
+    # Rebuild what the triggers would have maintained
+    started = time.perf_counter()
+    for table in fts_tables():
+        cursor.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+    for statement in INVENTORY_REBUILD:
+        cursor.execute(statement)
+    conn.commit()
+    timed("indexes", rows, started)
+    print(f"Database {db_file} populated with sample data in {sum(timings.values()):.2f}s ✅")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill a database with deterministic sample data.")
+    parser.add_argument("--db", default=DB_FILE, help=f"database file (default {DB_FILE})")
+    parser.add_argument("--rows", type=parse_rows, default=1000,
+                        help="rows per table, the scale factor: 1000, 50k, 10M... (default 1000)")
+    parser.add_argument("--seed", type=int, default=42, help="random seed (default 42)")
+    args = parser.parse_args()
+    generate(args.db, args.rows, args.seed)
@@ -1,3 +1,3 @@
-from .authorization import check_authorization, create_token
-
-__all__ = ["check_authorization", "create_token"]
+from .authorization import check_authorization, check_admin, create_token, token_cache_stats
+
+__all__ = ["check_authorization", "check_admin", "create_token", "token_cache_stats"]
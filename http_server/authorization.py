@@ -1,62 +1,172 @@
-# Authorization
-from fastapi import Depends, HTTPException, Header, status
-# ↑ FastAPI helpers:
-#    - Depends: used later if you wire the check as a dependency in routes
-#    - HTTPException: raise this to return an HTTP error response
-#    - Header: used to extract an HTTP header value (Authorization)
-#    - status: contains numeric HTTP status constants (e.g. status.HTTP_401_UNAUTHORIZED)
-import jwt
-# ↑ PyJWT library. Provides jwt.encode / jwt.decode.
-
-from datetime import datetime, timedelta
-# ↑ datetime utilities used to set token expiration time
-
-SECRET_KEY = "mysecret"
-# ↑ Secret key used to sign tokens. **DO NOT** hardcode in production — use an environment variable.
-
-ALGORITHM = "HS256"
-# ↑ The signing algorithm. HS256 means HMAC + SHA256 (symmetric key).
-
-def create_token(data: dict, expires_delta: timedelta = timedelta(hours=24)) -> str:
-    """
-    Generate a JWT token with given data and expiration.
-    """
-    to_encode = data.copy()
-    # ↑ copy the payload dict so the caller's dict isn't modified
-    expire = datetime.utcnow() + expires_delta
-    # ↑ compute an expiration datetime (UTC). Default 24 hours from now
-    to_encode.update({"exp": expire})
-    # ↑ add the 'exp' claim to the payload. PyJWT will convert a datetime to a numeric timestamp
-    token = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    # ↑ sign and encode the JWT. Returns a compact JWT string
-    return f"Bearer {token}"
-    # ↑ return with the "Bearer " prefix so it can be placed directly in the Authorization header
-
-
-def check_authorization(authorization: str = Header(...)): # similarly as (auth: str = Header(..., alias="Authorization")):
-    """
-    Dependency to check Authorization header and verify JWT.
-    """
-    if not authorization.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authorization header format",
-        )
-    # ↑ If header does not begin with "Bearer ", we reject with 401 Unauthorized.
-
-    token = authorization.split(" ")[1]
-    # ↑ split header "Bearer <token>" and extract the actual token string
-
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-        # ↑ decode and verify the token signature & claims (including exp).
-        #   If valid, `payload` is the original dict we encoded (with any claims).
-
-        return payload  # you can return user info from token
-        # ↑ When used as a FastAPI dependency, the returned value (payload) is injected into routes.
-
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired")
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    # ↑ Handle common JWT errors and turn them into HTTP 401 responses.
+# Authorization
+from fastapi import Depends, HTTPException, Header, Request, status
+# ↑ FastAPI helpers:
+#    - Depends: used later if you wire the check as a dependency in routes
+#    - HTTPException: raise this to return an HTTP error response
+#    - Header: used to extract an HTTP header value (Authorization)
+#    - status: contains numeric HTTP status constants (e.g. status.HTTP_401_UNAUTHORIZED)
+import jwt
+# ↑ PyJWT library. Provides jwt.encode / jwt.decode.
+
+from datetime import datetime, timedelta
+# ↑ datetime utilities used to set token expiration time
+
+import hashlib
+import hmac
+import ipaddress
+import os
+import threading
+import time
+from collections import OrderedDict
+# ↑ used by the verified-token cache below
+
+from database.aio import get_user
+# ↑ check_admin reads the rank of the user (a cached row)
+
+SECRET_KEY = "mysecret"
+# ↑ Secret key used to sign tokens. **DO NOT** hardcode in production — use an environment variable.
+
+ALGORITHM = "HS256"
+# ↑ The signing algorithm. HS256 means HMAC + SHA256 (symmetric key).
+
+METRICS_TOKEN = os.getenv("ERP_METRICS_TOKEN")
+# ↑ Token a Prometheus scraper (which can't log in) sends as "Authorization: Bearer <token>" to read
+#   GET /metrics from another machine. Unset: only local clients and admins can read the metrics.
+
+TOKEN_CACHE_SIZE = 1024
+# ↑ Maximum number of verified tokens kept in memory (least recently used ones are dropped first)
+
+_token_cache: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+# ↑ sha256(token) -> (exp timestamp, payload). Only tokens that passed jwt.decode get in.
+_token_cache_lock = threading.Lock()
+_token_cache_hits = 0
+_token_cache_misses = 0
+
+
+def _get_cached_payload(key: bytes) -> dict | None:
+    """
+    Return the payload of an already verified token, or None on a miss or if it expired since.
+    """
+    global _token_cache_hits, _token_cache_misses
+    with _token_cache_lock:
+        entry = _token_cache.get(key)
+        if entry is not None and entry[0] > time.time():
+            _token_cache.move_to_end(key)
+            _token_cache_hits += 1
+            return dict(entry[1])
+        if entry is not None:
+            del _token_cache[key]
+            # ↑ expired: drop it, jwt.decode below raises ExpiredSignatureError
+        _token_cache_misses += 1
+        return None
+
+
+def _cache_payload(key: bytes, payload: dict):
+    """
+    Remember a verified payload until the token's `exp` claim. Tokens without exp are not cached.
+    """
+    exp = payload.get("exp")
+    if not isinstance(exp, (int, float)):
+        return
+    with _token_cache_lock:
+        _token_cache[key] = (exp, dict(payload))
+        _token_cache.move_to_end(key)
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+
+
+def token_cache_stats() -> dict:
+    """
+    Hit/miss counters and current size of the verified-token cache.
+    """
+    with _token_cache_lock:
+        return {"hits": _token_cache_hits, "misses": _token_cache_misses, "size": len(_token_cache)}
+
+def create_token(data: dict, expires_delta: timedelta = timedelta(hours=24)) -> str:
+    """
+    Generate a JWT token with given data and expiration.
+    """
+    to_encode = data.copy()
+    # ↑ copy the payload dict so the caller's dict isn't modified
+    expire = datetime.utcnow() + expires_delta
+    # ↑ compute an expiration datetime (UTC). Default 24 hours from now
+    to_encode.update({"exp": expire})
+    # ↑ add the 'exp' claim to the payload. PyJWT will convert a datetime to a numeric timestamp
+    token = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    # ↑ sign and encode the JWT. Returns a compact JWT string
+    return f"Bearer {token}"
+    # ↑ return with the "Bearer " prefix so it can be placed directly in the Authorization header
+
+
+async def check_authorization(authorization: str = Header(...)): # similarly as (auth: str = Header(..., alias="Authorization")):
+    """
+    Dependency to check Authorization header and verify JWT.
+    async: a cache lookup or one HMAC check, cheaper on the event loop than a hop to the threadpool.
+    """
+    if not authorization.startswith("Bearer "):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authorization header format",
+        )
+    # ↑ If header does not begin with "Bearer ", we reject with 401 Unauthorized.
+
+    token = authorization.split(" ")[1]
+    # ↑ split header "Bearer <token>" and extract the actual token string
+
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    payload = _get_cached_payload(key)
+    if payload is not None:
+        return payload
+    # ↑ the same token was verified before and hasn't expired: skip the HMAC check and claim parsing
+
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+        # ↑ decode and verify the token signature & claims (including exp).
+        #   If valid, `payload` is the original dict we encoded (with any claims).
+
+        _cache_payload(key, payload)
+
+        return payload  # you can return user info from token
+        # ↑ When used as a FastAPI dependency, the returned value (payload) is injected into routes.
+
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    # ↑ Handle common JWT errors and turn them into HTTP 401 responses.
+
+
+async def check_admin(payload: dict = Depends(check_authorization)):
+    """
+    Dependency for the admin routes: a valid token (check_authorization) of a user with rank 1 or more.
+    Raises HTTP 403 for the other users.
+    """
+    user = await get_user(payload.get("user_id"))
+    if user is None or user.rank < 1:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin rights required")
+    # ↑ rank 0 is a regular user (see entities/user.py)
+    return payload
+
+
+def _is_loopback(host: str | None) -> bool:
+    try:
+        return host is not None and ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+async def check_metrics_access(request: Request, authorization: str | None = Header(None)):
+    """
+    Dependency for GET /metrics: open to clients on this machine (127.0.0.1, ::1). A client from
+    another machine (server started with --host 0.0.0.0) sends the ERP_METRICS_TOKEN or an admin's token.
+    Raises HTTP 401 without a token, 401 / 403 with a wrong one.
+    """
+    if _is_loopback(request.client.host if request.client else None):
+        return
+    # ↑ the peer address: behind a reverse proxy on this machine, the proxy must restrict /metrics itself
+    if authorization is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail="Metrics require the metrics token or an admin token")
+    if METRICS_TOKEN and hmac.compare_digest(authorization.encode(), f"Bearer {METRICS_TOKEN}".encode()):
+        return
+    await check_admin(await check_authorization(authorization))
@@ -0,0 +1,21 @@
+# batch.py
+from fastapi import HTTPException
+from starlette.status import HTTP_400_BAD_REQUEST
+
+# Most ids one batch fetch (?ids= or POST /<entity>/fetch) may ask for, a few pages' worth
+MAX_IDS = 1000
+
+
+def check_ids(ids: list[int]) -> list[int]:
+    """Refuse a batch of more than MAX_IDS ids with a 400."""
+    if len(ids) > MAX_IDS:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=f"At most {MAX_IDS} ids per request")
+    return ids
+
+
+def parse_ids(ids: str) -> list[int]:
+    """The ids of an ?ids=1,2,3 query parameter, 400 if one isn't an integer."""
+    try:
+        return check_ids([int(i) for i in ids.split(",") if i.strip()])
+    except ValueError:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="ids must be comma separated integers")
@@ -0,0 +1,85 @@
+# bulk.py
+import json
+from typing import AsyncIterator, Awaitable, Callable
+
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+from starlette.status import HTTP_400_BAD_REQUEST
+
+from entities import HttpBulkResponse, HttpBulkRowResult
+
+# Rows written per database transaction. NDJSON bodies are written batch by batch while they stream in.
+BATCH_SIZE = 5000
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines")
+
+
+async def _iter_rows(request: Request) -> AsyncIterator[tuple[int, object]]:
+    """Yield (index, decoded row) from a JSON array body or an NDJSON stream. Bad NDJSON lines yield the error."""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type not in NDJSON_TYPES:
+        try:
+            rows = json.loads(await request.body())
+        except ValueError as e:
+            raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=f"Invalid JSON body: {str(e)}")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="Body must be a JSON array")
+        for index, row in enumerate(rows):
+            yield index, row
+        return
+
+    index = 0
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield index, _decode_line(line)
+                index += 1
+    if buffer.strip():
+        yield index, _decode_line(buffer)
+
+
+def _decode_line(line: bytes) -> object:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return e
+
+
+async def bulk_write(request: Request, model: type[BaseModel],
+                     write_batch: Callable[[list], Awaitable[list[tuple[int | None, str | None]]]]) -> HttpBulkResponse:
+    """
+    Validate every row of the body as `model` and write the valid ones with `write_batch`
+    (one of the database.aio upsert_* functions) in batches of BATCH_SIZE.
+    Invalid rows don't stop the import, they are reported in the response.
+    """
+    results: list[HttpBulkRowResult] = []
+    batch: list[tuple[int, BaseModel]] = []
+
+    async def flush():
+        written = await write_batch([item for _, item in batch])
+        results.extend(HttpBulkRowResult(index=index, id=row_id, error=error)
+                       for (index, _), (row_id, error) in zip(batch, written))
+        batch.clear()
+
+    async for index, row in _iter_rows(request):
+        if isinstance(row, ValueError):
+            results.append(HttpBulkRowResult(index=index, error=f"Invalid JSON: {str(row)}"))
+            continue
+        try:
+            if not isinstance(row, dict):
+                raise TypeError("row must be a JSON object")
+            batch.append((index, model(**row)))
+        except (ValidationError, TypeError) as e:
+            results.append(HttpBulkRowResult(index=index, error=str(e)))
+            continue
+        if len(batch) >= BATCH_SIZE:
+            await flush()
+
+    if batch:
+        await flush()
+
+    results.sort(key=lambda r: r.index)
+    return HttpBulkResponse.from_results(results)
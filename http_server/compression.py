@@ -0,0 +1,141 @@
+# compression.py
+import asyncio
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional dependency, responses and frontend files are then gzip only
+    brotli = None
+
+# Supported encodings, best first. "br" is only offered when the brotli module is installed.
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Bodies smaller than this are sent as they are, compressing them saves less than it costs
+MINIMUM_SIZE = 1024
+# Chunks at least this large are compressed on a thread instead of the event loop
+THREAD_MINIMUM_SIZE = 128 * 1024
+# API responses worth compressing: list pages, exports, metrics
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/csv", "text/plain")
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # quality 11 is for files compressed once (see static.py), not per response
+
+
+def negotiate(accept_encoding: str, available: tuple[str, ...] = ENCODINGS) -> str | None:
+    """
+    The encoding to use for a request's Accept-Encoding header among `available` (best first),
+    None for the identity. Encodings refused with q=0 are skipped, "*" accepts any.
+    """
+    accepted: dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name.strip()] = q
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class _Compressor:
+    """Streaming gzip or brotli compressor: every chunk is flushed so clients can decode as it arrives."""
+
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, last: bool) -> bytes:
+        if self._brotli is not None:
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if last else self._brotli.flush())
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """
+    Compress JSON, NDJSON, CSV and text responses of MINIMUM_SIZE bytes or more with brotli or gzip,
+    according to Accept-Encoding. Streamed responses (exports) are compressed chunk by chunk.
+    Responses that already have a Content-Encoding (precompressed frontend files) go through untouched.
+    The ETag of a compressed response is made weak: the bytes differ, the content doesn't, and
+    If-None-Match (see etag.py) ignores the W/ prefix.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+        compressor: _Compressor | None = None
+        passthrough = False
+
+        async def compress(data: bytes, last: bool) -> bytes:
+            if len(data) >= THREAD_MINIMUM_SIZE:
+                return await asyncio.to_thread(compressor.compress, data, last)
+            return compressor.compress(data, last)
+
+        async def send_compressed(message: Message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                media_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+                passthrough = ("content-encoding" in headers or media_type not in COMPRESSIBLE_TYPES
+                               or message["status"] in (204, 206, 304))
+                if passthrough:
+                    await send(message)
+                else:
+                    start = message  # held until the first body chunk tells whether it is worth it
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                headers = MutableHeaders(raw=start["headers"])
+                headers.add_vary_header("Accept-Encoding")
+                if len(body) < self.minimum_size and not more_body:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding)
+                body = await compress(body, not more_body)
+                headers["Content-Encoding"] = encoding
+                if "etag" in headers and not headers["etag"].startswith("W/"):
+                    headers["ETag"] = "W/" + headers["etag"]
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    headers["Content-Length"] = str(len(body))
+                await send(start)
+                start = None
+            else:
+                body = await compress(body, not more_body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,44 @@
+# etag.py
+import hashlib
+from typing import Callable
+
+from fastapi import Depends, HTTPException, Request, Response
+from starlette.status import HTTP_304_NOT_MODIFIED
+
+from database import table_versions
+from database.statements.expand import Relation, relation_tables
+from http_server.authorization import check_authorization
+
+
+def _matches(if_none_match: str, tag: str) -> bool:
+    """True if an If-None-Match header ("*" or a list of possibly weak tags) covers `tag`."""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == tag:
+            return True
+    return False
+
+
+def etag(*tables: str, relations: dict[str, Relation] | None = None) -> Callable:
+    """
+    Dependency for GET routes whose response only depends on `tables` and the query.
+    A list with `relations` also depends on the tables its ?expand= reads (see expand.py).
+    The ETag is derived from the tables' write versions, the path and the query parameters;
+    when the client's If-None-Match still matches it answers 304 before the route touches
+    the database, otherwise it sets the ETag on the route's response.
+    """
+    def dependency(request: Request, response: Response, _=Depends(check_authorization)):
+        # Computed before the route reads: a write landing in between leaves a tag older
+        # than the body, which at worst costs the client one more full response.
+        query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+        read = tables
+        if relations:
+            read += tuple(relation_tables(relations, request.query_params.get("expand", "").split(",")))
+        key = f"{table_versions(*read)}|{request.url.path}?{query}"
+        tag = '"' + hashlib.blake2b(key.encode("utf-8"), digest_size=12).hexdigest() + '"'
+
+        if _matches(request.headers.get("if-none-match", ""), tag):
+            raise HTTPException(status_code=HTTP_304_NOT_MODIFIED, headers={"ETag": tag})
+        response.headers["ETag"] = tag
+
+    return dependency
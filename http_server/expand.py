@@ -0,0 +1,16 @@
+# expand.py
+from typing import Iterable
+
+from fastapi import HTTPException
+from starlette.status import HTTP_400_BAD_REQUEST
+
+
+def parse_expand(expand: str | None, relations: Iterable[str]) -> list[str]:
+    """The relations of an ?expand=product,supplier query parameter, 400 for one the list can't expand."""
+    names = [name.strip() for name in (expand or "").split(",") if name.strip()]
+    relations = list(relations)
+    for name in names:
+        if name not in relations:
+            raise HTTPException(status_code=HTTP_400_BAD_REQUEST,
+                                detail=f"Cannot expand {name!r}, choose among {', '.join(relations)}")
+    return names
@@ -0,0 +1,45 @@
+# export.py
+import csv
+import io
+from typing import AsyncIterator, Literal
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+ExportFormat = Literal["ndjson", "csv"]
+
+
+async def _ndjson(chunks: AsyncIterator[list[BaseModel]]) -> AsyncIterator[str]:
+    async for chunk in chunks:
+        yield "".join(item.model_dump_json() + "\n" for item in chunk)
+
+
+async def _csv(chunks: AsyncIterator[list[BaseModel]], model: type[BaseModel]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    columns = list(model.model_fields)
+    writer.writerow(columns)
+    async for chunk in chunks:
+        for item in chunk:
+            row = item.model_dump(mode="json")
+            writer.writerow(row[c] for c in columns)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()  # header only, there were no rows
+
+
+def export_response(chunks: AsyncIterator[list[BaseModel]], model: type[BaseModel], format: ExportFormat,
+                    name: str) -> StreamingResponse:
+    """
+    Stream the chunks produced by a database.aio export_* function as NDJSON or CSV.
+    Each chunk is encoded and sent as soon as it is fetched, so memory stays flat
+    whatever the table size and the first bytes go out right away.
+    """
+    if format == "csv":
+        body, media_type = _csv(chunks, model), "text/csv"
+    else:
+        body, media_type = _ndjson(chunks), "application/x-ndjson"
+    return StreamingResponse(body, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{name}.{format}"'})
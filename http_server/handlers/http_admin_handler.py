@@ -0,0 +1,55 @@
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.params import Query
+from starlette.status import HTTP_400_BAD_REQUEST
+
+from database import slow_queries, reset_slow_queries
+from database.aio import archive_transactions as sql_archive_transactions, \
+    list_transaction_archives as sql_list_transaction_archives
+from entities import SlowQuery, TransactionArchive
+from http_server.authorization import check_admin
+
+# -----------------------------
+# Router definition
+# -----------------------------
+router = APIRouter()
+
+
+@router.get("/slow-queries", response_model=list[SlowQuery])
+async def list_slow_queries(limit: int = Query(20, ge=1, le=256),
+                            order: Literal["total", "max", "calls"] = Query("total"),
+                            _=Depends(check_admin)):
+    """
+    Queries that ran above the slow-query threshold (ERP_SLOW_QUERY_MS) since the start, worst first:
+    by total time, longest run or number of slow runs. Each comes with its query plan and the redacted
+    parameters of its last slow run. Every run is also in the slow-query log file.
+    """
+    return slow_queries(limit, order)
+
+
+@router.delete("/slow-queries")
+async def clear_slow_queries(_=Depends(check_admin)):
+    """Start counting the slow queries again from zero."""
+    reset_slow_queries()
+
+
+@router.get("/archives", response_model=list[TransactionArchive])
+async def list_transaction_archives(_=Depends(check_admin)):
+    """The years of transactions moved to an archive file, oldest first."""
+    return await sql_list_transaction_archives()
+
+
+@router.post("/archives", response_model=list[TransactionArchive])
+async def archive_transactions(before: Optional[int] = Query(None), _=Depends(check_admin)):
+    """
+    Move every transaction dated before January 1st of `before` (by default the current year: every
+    closed year) into one archive file per year. Lists, exports and summaries given a date range still
+    read the archived years it overlaps. Returns the archives written.
+    """
+    current_year = datetime.now().year
+    if before is not None and before > current_year:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST,
+                            detail=f"Only closed years can be archived, {current_year} is still open")
+    return await sql_archive_transactions(before if before is not None else current_year)
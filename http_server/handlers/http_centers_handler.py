@@ -1,76 +1,134 @@
-from typing import Optional
-
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.params import Query
-from starlette.status import HTTP_404_NOT_FOUND, HTTP_500_INTERNAL_SERVER_ERROR
-
-from entities import Center, HttpListResponse
-from http_server.authorization import check_authorization  # <-- your JWT verification function
-from database import list_centers as sql_list_centers, get_center as sql_get_center, add_center as sql_add_center, \
-    update_center as sql_update_center, \
-    delete_center as sql_delete_center
-
-# -----------------------------
-# Router definition
-# -----------------------------
-router = APIRouter()
-
-
-# FastAPI will call the Depends and Verify the JWT. Then Raise an HTTP 401 if invalid. Return the decoded token payload if valid. FastAPI assigns the returned value to payload. Then the route list_centers(payload=payload) executes.
-@router.get("", response_model=HttpListResponse[Center])
-def list_centers(page: Optional[str] = Query(None), filter: Optional[str] = Query(None), _=Depends(check_authorization)):
-    """Fetch all center"""
-    offset: int = 1
-    limit: int = -1
-    try:
-        page_num, limit = map(int, page.split("-"))
-        offset = page_num * limit
-    except Exception:
-        pass
-    try:
-        centers = sql_list_centers(offset, limit, filter)
-        return centers  # JSON object
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching centers: {str(e)}")
-
-
-@router.get("/{id}", response_model=Center)
-def get_center(id: int, _=Depends(check_authorization)):
-    """Fetch one center by ID, authorized only"""
-    try:
-        center = sql_get_center(id)  # your SQL function that fetches a single center
-        if not center:
-            # No row returned → center not found
-            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"Center with ID {id} not found")
-        return center  # JSON object
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching centers: {str(e)}")
-
-
-@router.post("", response_model=int)
-def create_center(center: Center, _=Depends(check_authorization)):
-    """Create a new center (ID auto-generated)"""
-    try:
-        return sql_add_center(center)  # the new center id
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching centers: {str(e)}")
-
-
-@router.put("", response_model=int)
-def update_center(center: Center, _=Depends(check_authorization)):
-    """Create a new center (ID auto-generated)"""
-    try:
-        return sql_update_center(center)  # the new center id
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching centers: {str(e)}")
-
-
-@router.delete("/{id}")
-def delete_center(id: int, _=Depends(check_authorization)):
-    """Delete a center by ID"""
-    try:
-        if not sql_delete_center(id):
-            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"Center with ID {id} not found")
-        return
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching centers: {str(e)}")
+from typing import Optional
+
+from fastapi import APIRouter, Body, HTTPException, Depends, Request, Response
+from fastapi.params import Query
+from starlette.status import HTTP_404_NOT_FOUND, HTTP_500_INTERNAL_SERVER_ERROR
+
+from entities import Center, HttpListResponse, HttpBulkResponse, CenterInventory
+from http_server.authorization import check_authorization  # <-- your JWT verification function
+from http_server.batch import check_ids, parse_ids
+from http_server.bulk import bulk_write
+from http_server.etag import etag
+from http_server.responses import json_response
+from http_server.export import export_response, ExportFormat
+from database import CountMode
+from database.aio import list_centers as sql_list_centers, get_center as sql_get_center, add_center as sql_add_center, \
+    update_center as sql_update_center, \
+    delete_center as sql_delete_center, \
+    upsert_centers as sql_upsert_centers, \
+    export_centers as sql_export_centers, \
+    list_center_inventory as sql_list_center_inventory, \
+    get_center_inventory as sql_get_center_inventory, \
+    get_centers as sql_fetch_centers
+
+# -----------------------------
+# Router definition
+# -----------------------------
+router = APIRouter()
+
+
+# FastAPI will call the Depends and Verify the JWT. Then Raise an HTTP 401 if invalid. Return the decoded token payload if valid. FastAPI assigns the returned value to payload. Then the route list_centers(payload=payload) executes.
+@router.get("", response_model=HttpListResponse[Center], dependencies=[Depends(etag("centers"))])
+async def list_centers(response: Response, page: Optional[str] = Query(None), filter: Optional[str] = Query(None),
+                       after: Optional[int] = Query(None), before: Optional[int] = Query(None),
+                       count: CountMode = Query("exact"), ids: Optional[str] = Query(None),
+                       _=Depends(check_authorization)):
+    """Fetch all center"""
+    if ids is not None:  # ?ids=1,2,3: those centers only, in that order, page and filter are ignored
+        centers = await sql_fetch_centers(parse_ids(ids))
+        return HttpListResponse[Center](total=len(centers), body=centers)
+    offset: int = 1
+    limit: int = -1
+    try:
+        page_num, limit = map(int, page.split("-"))
+        offset = page_num * limit
+    except Exception:
+        pass
+    try:
+        centers = await sql_list_centers(offset, limit, filter, after, before, count, as_json=True)
+        return json_response(centers, response)  # JSON object
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching centers: {str(e)}")
+
+
+@router.get("/export")
+async def export_centers(format: ExportFormat = Query("ndjson"), filter: Optional[str] = Query(None),
+                         _=Depends(check_authorization)):
+    """Stream every center matching the filter as NDJSON or CSV"""
+    return export_response(sql_export_centers(filter), Center, format, "centers")
+
+
+@router.get("/inventory", response_model=list[CenterInventory], dependencies=[Depends(etag("center_inventory"))])
+async def list_center_inventory(_=Depends(check_authorization)):
+    """Precomputed inventory totals of every center"""
+    try:
+        return await sql_list_center_inventory()
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching inventory: {str(e)}")
+
+
+@router.get("/{id}/inventory", response_model=CenterInventory, dependencies=[Depends(etag("center_inventory"))])
+async def get_center_inventory(id: int, _=Depends(check_authorization)):
+    """Precomputed inventory totals of one center (all of its stocks)"""
+    try:
+        inventory = await sql_get_center_inventory(id)
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching inventory: {str(e)}")
+    if not inventory:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"No inventory for center with ID {id}")
+    return inventory
+
+
+@router.get("/{id}", response_model=Center, dependencies=[Depends(etag("centers"))])
+async def get_center(id: int, _=Depends(check_authorization)):
+    """Fetch one center by ID, authorized only"""
+    try:
+        center = await sql_get_center(id)  # your SQL function that fetches a single center
+        if not center:
+            # No row returned → center not found
+            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"Center with ID {id} not found")
+        return center  # JSON object
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching centers: {str(e)}")
+
+
+@router.post("", response_model=int)
+async def create_center(center: Center, _=Depends(check_authorization)):
+    """Create a new center (ID auto-generated)"""
+    try:
+        return await sql_add_center(center)  # the new center id
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching centers: {str(e)}")
+
+
+@router.post("/bulk", response_model=HttpBulkResponse)
+async def create_centers_bulk(request: Request, _=Depends(check_authorization)):
+    """Insert or update many centers from a JSON array or an NDJSON stream (application/x-ndjson)"""
+    return await bulk_write(request, Center, sql_upsert_centers)
+
+
+@router.post("/fetch", response_model=HttpListResponse[Center])
+async def fetch_centers(ids: list[int] = Body(...), _=Depends(check_authorization)):
+    """Fetch the centers of a JSON array of IDs too long for ?ids=, in that order"""
+    centers = await sql_fetch_centers(check_ids(ids))
+    return HttpListResponse[Center](total=len(centers), body=centers)
+
+
+@router.put("", response_model=int)
+async def update_center(center: Center, _=Depends(check_authorization)):
+    """Create a new center (ID auto-generated)"""
+    try:
+        return await sql_update_center(center)  # the new center id
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching centers: {str(e)}")
+
+
+@router.delete("/{id}")
+async def delete_center(id: int, _=Depends(check_authorization)):
+    """Delete a center by ID"""
+    try:
+        if not await sql_delete_center(id):
+            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"Center with ID {id} not found")
+        return
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching centers: {str(e)}")
@@ -1,36 +1,42 @@
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel
-from database import get_user_by_username, verify_password  # fetch user from DB
-from http_server.authorization import create_token, \
-    check_authorization  # JWT creation function and JWT verification function
-
-router = APIRouter()
-
-
-class loginInfo(BaseModel):
-    username: str
-    password: str
-
-
-@router.post("")
-def login(data: loginInfo):
-    user = get_user_by_username(data.username)
-    if not user:
-        raise HTTPException(status_code=401, detail="Invalid username or password")
-
-    if not verify_password(data.password, user.password):
-        raise HTTPException(status_code=401, detail="Invalid username or password")
-
-    token = create_token({"user_id": user.id, "username": user.username})
-    return {"token": token}
-
-
-@router.get("")  # /verify-token
-def verify_token(_=Depends(check_authorization)):
-    """
-    Verify if the JWT token provided in the Authorization header is valid.
-    Returns HTTP 200 if valid.
-    Raises HTTP 401 if invalid or expired.
-    """
-    # If check_authorization succeeds, payload is valid
-    return
+from fastapi import APIRouter, HTTPException, Depends
+from pydantic import BaseModel
+from database import verify_password_async, hash_password_async, needs_rehash
+from database.aio import get_user_by_username, update_user_password  # fetch user from DB
+from http_server.authorization import create_token, \
+    check_authorization  # JWT creation function and JWT verification function
+
+router = APIRouter()
+
+
+class loginInfo(BaseModel):
+    username: str
+    password: str
+
+
+# async: bcrypt runs in the hashing process pool, so waiting logins don't hold request threads
+@router.post("")
+async def login(data: loginInfo):
+    user = await get_user_by_username(data.username)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid username or password")
+
+    if not await verify_password_async(data.password, user.password):
+        raise HTTPException(status_code=401, detail="Invalid username or password")
+
+    # Bring the stored hash to the configured cost while we still have the plain password
+    if needs_rehash(user.password):
+        await update_user_password(user.id, await hash_password_async(data.password))
+
+    token = create_token({"user_id": user.id, "username": user.username})
+    return {"token": token}
+
+
+@router.get("")  # /verify-token
+async def verify_token(_=Depends(check_authorization)):
+    """
+    Verify if the JWT token provided in the Authorization header is valid.
+    Returns HTTP 200 if valid.
+    Raises HTTP 401 if invalid or expired.
+    """
+    # If check_authorization succeeds, payload is valid
+    return
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from database.metrics import render_metrics
+from http_server.authorization import check_metrics_access
+
+router = APIRouter()
+
+
+# No login for local clients (scrapers can't log in). When the server listens on another address
+# (--host), a remote client needs ERP_METRICS_TOKEN or an admin token, see check_metrics_access
+@router.get("", response_class=PlainTextResponse, dependencies=[Depends(check_metrics_access)])
+async def metrics():
+    """
+    Request, statement, write lock and serialization metrics in the Prometheus text format:
+    latency histograms per route and per statement, rows returned, lock waits, in-flight gauges.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
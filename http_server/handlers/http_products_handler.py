@@ -1,77 +1,114 @@
-from typing import Optional
-
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.params import Query
-from starlette.status import HTTP_404_NOT_FOUND, HTTP_500_INTERNAL_SERVER_ERROR
-
-from entities import Product, HttpListResponse
-from http_server.authorization import check_authorization  # <-- your JWT verification function
-from database import list_products as sql_list_products, get_product as sql_get_products, \
-    add_product as sql_add_product, update_product as sql_update_product, delete_product as sql_delete_product
-
-# -----------------------------
-# Router definition
-# -----------------------------
-router = APIRouter()
-
-
-# FastAPI will call the Depends and Verify the JWT. Then Raise an HTTP 401 if invalid. Return the decoded token payload if valid. FastAPI assigns the returned value to payload. Then the route list_products(payload=payload) executes.
-@router.get("", response_model=HttpListResponse[Product])
-def list_products(page: Optional[str] = Query(None), filter: Optional[str] = Query(None),
-                  _=Depends(check_authorization)):  # (payload=Depends(check_authorization)):
-    """Fetch all products"""
-    offset: int = 1
-    limit: int = -1
-    try:
-        page_num, limit = map(int, page.split("-"))
-        offset = page_num * limit
-    except Exception:
-        pass
-    try:
-        products = sql_list_products(offset, limit, filter)
-        return products  # JSON object
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching products: {str(e)}")
-
-
-@router.get("/{id}", response_model=Product)
-def get_product(id: int, _=Depends(check_authorization)):
-    """Fetch one product by ID, authorized only"""
-    try:
-        product = sql_get_products(id)  # your SQL function that fetches a single center
-        if not product:
-            # No row returned → center not found
-            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"Product with ID {product} not found")
-        # Return just the object, status code 200 by default
-        return product  # JSON object with status + data
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching products: {str(e)}")
-
-
-@router.post("", response_model=int)
-def create_product(product: Product, _=Depends(check_authorization)):
-    """Create a new product (ID auto-generated)"""
-    try:
-        return sql_add_product(product)  # The new JSON object id
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching products: {str(e)}")
-
-
-@router.put("", response_model=int)
-def update_product(product: Product, _=Depends(check_authorization)):
-    """Create a new product (ID auto-generated)"""
-    try:
-        return sql_update_product(product)  # The new JSON object id
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching products: {str(e)}")
-
-
-@router.delete("/{id}")
-def delete_product(id: int, _=Depends(check_authorization)):
-    """Delete a product by ID"""
-    try:
-        if not sql_delete_product(id):
-            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"Product with ID {id} not found")
-        return  # No content, 204 will be sent
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching products: {str(e)}")
+from typing import Optional
+
+from fastapi import APIRouter, Body, HTTPException, Depends, Request, Response
+from fastapi.params import Query
+from starlette.status import HTTP_404_NOT_FOUND, HTTP_500_INTERNAL_SERVER_ERROR
+
+from entities import Product, ProductInput, ExpandedProduct, HttpListResponse, HttpBulkResponse
+from http_server.authorization import check_authorization  # <-- your JWT verification function
+from http_server.batch import check_ids, parse_ids
+from http_server.bulk import bulk_write
+from http_server.etag import etag
+from http_server.expand import parse_expand
+from http_server.responses import json_response, model_response
+from http_server.export import export_response, ExportFormat
+from database import CountMode, PRODUCT_RELATIONS
+from database.aio import list_products as sql_list_products, get_product as sql_get_products, \
+    add_product as sql_add_product, update_product as sql_update_product, delete_product as sql_delete_product, \
+    upsert_products as sql_upsert_products, \
+    export_products as sql_export_products, \
+    get_products as sql_fetch_products
+
+# -----------------------------
+# Router definition
+# -----------------------------
+router = APIRouter()
+
+
+# FastAPI will call the Depends and Verify the JWT. Then Raise an HTTP 401 if invalid. Return the decoded token payload if valid. FastAPI assigns the returned value to payload. Then the route list_products(payload=payload) executes.
+@router.get("", response_model=HttpListResponse[ExpandedProduct],
+            dependencies=[Depends(etag("products", relations=PRODUCT_RELATIONS))])
+async def list_products(response: Response, page: Optional[str] = Query(None), filter: Optional[str] = Query(None),
+                        after: Optional[int] = Query(None), before: Optional[int] = Query(None),
+                        count: CountMode = Query("exact"), ids: Optional[str] = Query(None),
+                        expand: Optional[str] = Query(None), _=Depends(check_authorization)):  # (payload=Depends(check_authorization)):
+    """Fetch all products"""
+    if ids is not None:  # ?ids=1,2,3: those products only, in that order, page and filter are ignored
+        products = await sql_fetch_products(parse_ids(ids))
+        return model_response(HttpListResponse[Product](total=len(products), body=products), response)
+    relations = parse_expand(expand, PRODUCT_RELATIONS)
+    offset: int = 1
+    limit: int = -1
+    try:
+        page_num, limit = map(int, page.split("-"))
+        offset = page_num * limit
+    except Exception:
+        pass
+    try:
+        products = await sql_list_products(offset, limit, filter, after, before, count, as_json=True, expand=relations)
+        return json_response(products, response)  # JSON object
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching products: {str(e)}")
+
+
+@router.get("/export")
+async def export_products(format: ExportFormat = Query("ndjson"), filter: Optional[str] = Query(None),
+                          _=Depends(check_authorization)):
+    """Stream every product matching the filter as NDJSON or CSV"""
+    return export_response(sql_export_products(filter), Product, format, "products")
+
+
+@router.get("/{id}", response_model=Product, dependencies=[Depends(etag("products"))])
+async def get_product(id: int, _=Depends(check_authorization)):
+    """Fetch one product by ID, authorized only"""
+    try:
+        product = await sql_get_products(id)  # your SQL function that fetches a single center
+        if not product:
+            # No row returned → center not found
+            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"Product with ID {product} not found")
+        # Return just the object, status code 200 by default
+        return product  # JSON object with status + data
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching products: {str(e)}")
+
+
+@router.post("", response_model=int)
+async def create_product(product: ProductInput, _=Depends(check_authorization)):
+    """Create a new product (ID auto-generated)"""
+    try:
+        return await sql_add_product(product)  # The new JSON object id
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching products: {str(e)}")
+
+
+@router.post("/bulk", response_model=HttpBulkResponse)
+async def create_products_bulk(request: Request, _=Depends(check_authorization)):
+    """Insert or update many products from a JSON array or an NDJSON stream (application/x-ndjson)"""
+    return await bulk_write(request, ProductInput, sql_upsert_products)
+
+
+@router.post("/fetch", response_model=HttpListResponse[Product])
+async def fetch_products(ids: list[int] = Body(...), _=Depends(check_authorization)):
+    """Fetch the products of a JSON array of IDs too long for ?ids=, in that order"""
+    products = await sql_fetch_products(check_ids(ids))
+    return HttpListResponse[Product](total=len(products), body=products)
+
+
+@router.put("", response_model=int)
+async def update_product(product: ProductInput, _=Depends(check_authorization)):
+    """Create a new product (ID auto-generated)"""
+    try:
+        return await sql_update_product(product)  # The new JSON object id
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching products: {str(e)}")
+
+
+@router.delete("/{id}")
+async def delete_product(id: int, _=Depends(check_authorization)):
+    """Delete a product by ID"""
+    try:
+        if not await sql_delete_product(id):
+            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"Product with ID {id} not found")
+        return  # No content, 204 will be sent
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching products: {str(e)}")
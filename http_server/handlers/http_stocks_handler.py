@@ -1,71 +1,133 @@
-from typing import Optional
-
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.params import Query
-from starlette.status import HTTP_404_NOT_FOUND, HTTP_500_INTERNAL_SERVER_ERROR
-
-from entities import Stock, HttpListResponse
-from http_server.authorization import check_authorization  # <-- your JWT verification function
-
-from database import list_stocks as sql_list_stocks, get_stock as sql_get_stock, add_stock as sql_add_stock, \
-    update_stock as sql_update_stock, \
-    delete_stock as sql_delete_stock
-
-# -----------------------------
-# Router definition
-# -----------------------------
-router = APIRouter()
-
-
-# FastAPI will call the Depends and Verify the JWT. Then Raise an HTTP 401 if invalid. Return the decoded token payload if valid. FastAPI assigns the returned value to payload. Then the route list_stocks(payload=payload) executes.
-@router.get("", response_model=HttpListResponse[Stock])
-def list_stocks(page: Optional[str] = Query(None), filter: Optional[str] = Query(None), _=Depends(check_authorization)):
-    offset: int = 1
-    limit: int = -1
-    try:
-        page_num, limit = map(int, page.split("-"))
-        offset = page_num * limit
-    except Exception:
-        pass
-    try:
-        stocks = sql_list_stocks(offset, limit, filter)
-        return stocks  # JSON object
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching stocks: {str(e)}")
-
-
-@router.get("/{id}", response_model=Stock)
-def get_stock(id: int, _=Depends(check_authorization)):
-    try:
-        stock = sql_get_stock(id)
-        if not stock:
-            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"Stock with ID {id} not found")
-        return stock
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching stock: {str(e)}")
-
-
-@router.post("", response_model=int)
-def create_stock(stock: Stock, _=Depends(check_authorization)):
-    try:
-        return sql_add_stock(stock)
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error adding stock: {str(e)}")
-
-
-@router.put("", response_model=int)
-def update_stock(stock: Stock, _=Depends(check_authorization)):
-    try:
-        return sql_update_stock(stock)
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error adding stock: {str(e)}")
-
-
-@router.delete("/{id}")
-def delete_stock(id: int, _=Depends(check_authorization)):
-    try:
-        if not sql_delete_stock(id):
-            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"Stock with ID {id} not found")
-        return
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error deleting stock: {str(e)}")
+from typing import Optional
+
+from fastapi import APIRouter, Body, HTTPException, Depends, Request, Response
+from fastapi.params import Query
+from starlette.status import HTTP_404_NOT_FOUND, HTTP_500_INTERNAL_SERVER_ERROR
+
+from entities import Stock, ExpandedStock, HttpListResponse, HttpBulkResponse, StockInventory
+from http_server.authorization import check_authorization  # <-- your JWT verification function
+from http_server.batch import check_ids, parse_ids
+from http_server.bulk import bulk_write
+from http_server.etag import etag
+from http_server.expand import parse_expand
+from http_server.responses import json_response, model_response
+from http_server.export import export_response, ExportFormat
+
+from database import CountMode, STOCK_RELATIONS
+from database.aio import list_stocks as sql_list_stocks, get_stock as sql_get_stock, add_stock as sql_add_stock, \
+    update_stock as sql_update_stock, \
+    delete_stock as sql_delete_stock, \
+    upsert_stocks as sql_upsert_stocks, \
+    export_stocks as sql_export_stocks, \
+    list_stock_inventory as sql_list_stock_inventory, \
+    get_stock_inventory as sql_get_stock_inventory, \
+    get_stocks as sql_fetch_stocks
+
+# -----------------------------
+# Router definition
+# -----------------------------
+router = APIRouter()
+
+
+# FastAPI will call the Depends and Verify the JWT. Then Raise an HTTP 401 if invalid. Return the decoded token payload if valid. FastAPI assigns the returned value to payload. Then the route list_stocks(payload=payload) executes.
+@router.get("", response_model=HttpListResponse[ExpandedStock],
+            dependencies=[Depends(etag("stocks", relations=STOCK_RELATIONS))])
+async def list_stocks(response: Response, page: Optional[str] = Query(None), filter: Optional[str] = Query(None),
+                      after: Optional[int] = Query(None), before: Optional[int] = Query(None),
+                      count: CountMode = Query("exact"), ids: Optional[str] = Query(None),
+                      expand: Optional[str] = Query(None), _=Depends(check_authorization)):
+    if ids is not None:  # ?ids=1,2,3: those stocks only, in that order, page and filter are ignored
+        stocks = await sql_fetch_stocks(parse_ids(ids))
+        return model_response(HttpListResponse[Stock](total=len(stocks), body=stocks), response)
+    relations = parse_expand(expand, STOCK_RELATIONS)
+    offset: int = 1
+    limit: int = -1
+    try:
+        page_num, limit = map(int, page.split("-"))
+        offset = page_num * limit
+    except Exception:
+        pass
+    try:
+        stocks = await sql_list_stocks(offset, limit, filter, after, before, count, as_json=True, expand=relations)
+        return json_response(stocks, response)  # JSON object
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching stocks: {str(e)}")
+
+
+@router.get("/export")
+async def export_stocks(format: ExportFormat = Query("ndjson"), filter: Optional[str] = Query(None),
+                        _=Depends(check_authorization)):
+    """Stream every stock matching the filter as NDJSON or CSV"""
+    return export_response(sql_export_stocks(filter), Stock, format, "stocks")
+
+
+@router.get("/inventory", response_model=list[StockInventory],
+            dependencies=[Depends(etag("stock_inventory", "stocks"))])
+async def list_stock_inventory(center_id: Optional[int] = Query(None), _=Depends(check_authorization)):
+    """Precomputed inventory totals of every stock, optionally only the stocks of one center"""
+    try:
+        return await sql_list_stock_inventory(center_id)
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching inventory: {str(e)}")
+
+
+@router.get("/{id}/inventory", response_model=StockInventory, dependencies=[Depends(etag("stock_inventory"))])
+async def get_stock_inventory(id: int, _=Depends(check_authorization)):
+    """Precomputed inventory totals of one stock"""
+    try:
+        inventory = await sql_get_stock_inventory(id)
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching inventory: {str(e)}")
+    if not inventory:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"No inventory for stock with ID {id}")
+    return inventory
+
+
+@router.get("/{id}", response_model=Stock, dependencies=[Depends(etag("stocks"))])
+async def get_stock(id: int, _=Depends(check_authorization)):
+    try:
+        stock = await sql_get_stock(id)
+        if not stock:
+            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"Stock with ID {id} not found")
+        return stock
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching stock: {str(e)}")
+
+
+@router.post("", response_model=int)
+async def create_stock(stock: Stock, _=Depends(check_authorization)):
+    try:
+        return await sql_add_stock(stock)
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error adding stock: {str(e)}")
+
+
+@router.post("/bulk", response_model=HttpBulkResponse)
+async def create_stocks_bulk(request: Request, _=Depends(check_authorization)):
+    """Insert or update many stocks from a JSON array or an NDJSON stream (application/x-ndjson)"""
+    return await bulk_write(request, Stock, sql_upsert_stocks)
+
+
+@router.post("/fetch", response_model=HttpListResponse[Stock])
+async def fetch_stocks(ids: list[int] = Body(...), _=Depends(check_authorization)):
+    """Fetch the stocks of a JSON array of IDs too long for ?ids=, in that order"""
+    stocks = await sql_fetch_stocks(check_ids(ids))
+    return HttpListResponse[Stock](total=len(stocks), body=stocks)
+
+
+@router.put("", response_model=int)
+async def update_stock(stock: Stock, _=Depends(check_authorization)):
+    try:
+        return await sql_update_stock(stock)
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error adding stock: {str(e)}")
+
+
+@router.delete("/{id}")
+async def delete_stock(id: int, _=Depends(check_authorization)):
+    try:
+        if not await sql_delete_stock(id):
+            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"Stock with ID {id} not found")
+        return
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error deleting stock: {str(e)}")
@@ -1,102 +1,144 @@
-from typing import Optional
-
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.params import Query
-from starlette.status import HTTP_404_NOT_FOUND, HTTP_500_INTERNAL_SERVER_ERROR
-
-from entities import Supplier, HttpListResponse
-from http_server.authorization import check_authorization  # <-- your JWT verification function
-from database import list_suppliers as sql_list_suppliers, list_consumers as sql_list_customers, \
-    list_providers as sql_list_providers, get_supplier as sql_get_supplier, \
-    add_supplier as sql_add_supplier, update_supplier as sql_update_supplier, delete_supplier as sql_delete_supplier
-
-# -----------------------------
-# Router definition
-# -----------------------------
-router = APIRouter()
-
-
-# FastAPI will call the Depends and Verify the JWT. Then Raise an HTTP 401 if invalid. Return the decoded token payload if valid. FastAPI assigns the returned value to payload. Then the route list_suppliers(payload=payload) executes.
-@router.get("", response_model=HttpListResponse[Supplier])
-def list_suppliers(page: Optional[str] = Query(None), filter: Optional[str] = Query(None),
-                   _=Depends(check_authorization)):
-    offset: int = 1
-    limit: int = -1
-    try:
-        page_num, limit = map(int, page.split("-"))
-        offset = page_num * limit
-    except Exception:
-        pass  # do nothing if parsing fails
-    try:
-        return sql_list_suppliers(offset, limit, filter)  # JSON object
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching suppliers: {str(e)}")
-
-
-@router.get("/consumers", response_model=HttpListResponse[Supplier])
-def list_customers(page: Optional[str] = Query(None), filter: Optional[str] = Query(None),
-                   _=Depends(check_authorization)):
-    offset: int = 1
-    limit: int = -1
-    try:
-        page_num, limit = map(int, page.split("-"))
-        offset = page_num * limit
-    except Exception:
-        pass
-    try:
-        return sql_list_customers(offset, limit, filter)
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching suppliers: {str(e)}")
-
-
-@router.get("/providers", response_model=HttpListResponse[Supplier])
-def list_providers(page: Optional[str] = Query(None), filter: Optional[str] = Query(None),
-                   _=Depends(check_authorization)):
-    offset: int = 1
-    limit: int = -1
-    try:
-        page_num, limit = map(int, page.split("-"))
-        offset = page_num * limit
-    except Exception:
-        pass
-    try:
-        return sql_list_providers(offset, limit, filter)
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching suppliers: {str(e)}")
-
-
-@router.get("/{id}", response_model=Supplier)
-def get_supplier(id: int, _=Depends(check_authorization)):
-    try:
-        supplier = sql_get_supplier(id)
-        if not supplier:
-            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"Supplier with ID {id} not found")
-        return supplier
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching supplier: {str(e)}")
-
-
-@router.post("", response_model=int)
-def create_supplier(supplier: Supplier, _=Depends(check_authorization)):
-    try:
-        return sql_add_supplier(supplier)
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error adding supplier: {str(e)}")
-
-
-@router.put("", response_model=int)
-def update_supplier(supplier: Supplier, _=Depends(check_authorization)):
-    try:
-        return sql_update_supplier(supplier)
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error adding supplier: {str(e)}")
-
-
-@router.delete("/{id}")
-def delete_supplier(id: int, _=Depends(check_authorization)):
-    try:
-        if not sql_delete_supplier(id):
-            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"Supplier with ID {id} not found")
-        return
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error deleting supplier: {str(e)}")
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Body, HTTPException, Depends, Request, Response
+from fastapi.params import Query
+from starlette.status import HTTP_404_NOT_FOUND, HTTP_500_INTERNAL_SERVER_ERROR
+
+from entities import Supplier, HttpListResponse, HttpBulkResponse
+from http_server.authorization import check_authorization  # <-- your JWT verification function
+from http_server.batch import check_ids, parse_ids
+from http_server.bulk import bulk_write
+from http_server.etag import etag
+from http_server.responses import json_response
+from http_server.export import export_response, ExportFormat
+from database import CountMode
+from database.aio import list_suppliers as sql_list_suppliers, list_consumers as sql_list_customers, \
+    list_providers as sql_list_providers, get_supplier as sql_get_supplier, \
+    add_supplier as sql_add_supplier, update_supplier as sql_update_supplier, delete_supplier as sql_delete_supplier, \
+    upsert_suppliers as sql_upsert_suppliers, \
+    export_suppliers as sql_export_suppliers, \
+    get_suppliers as sql_fetch_suppliers
+
+# -----------------------------
+# Router definition
+# -----------------------------
+router = APIRouter()
+
+
+# FastAPI will call the Depends and Verify the JWT. Then Raise an HTTP 401 if invalid. Return the decoded token payload if valid. FastAPI assigns the returned value to payload. Then the route list_suppliers(payload=payload) executes.
+@router.get("", response_model=HttpListResponse[Supplier], dependencies=[Depends(etag("suppliers"))])
+async def list_suppliers(response: Response, page: Optional[str] = Query(None), filter: Optional[str] = Query(None),
+                         after: Optional[int] = Query(None), before: Optional[int] = Query(None),
+                         count: CountMode = Query("exact"), ids: Optional[str] = Query(None),
+                         _=Depends(check_authorization)):
+    if ids is not None:  # ?ids=1,2,3: those suppliers only, in that order, page and filter are ignored
+        suppliers = await sql_fetch_suppliers(parse_ids(ids))
+        return HttpListResponse[Supplier](total=len(suppliers), body=suppliers)
+    offset: int = 1
+    limit: int = -1
+    try:
+        page_num, limit = map(int, page.split("-"))
+        offset = page_num * limit
+    except Exception:
+        pass  # do nothing if parsing fails
+    try:
+        body = await sql_list_suppliers(offset, limit, filter, after, before, count, as_json=True)
+        return json_response(body, response)  # JSON object
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching suppliers: {str(e)}")
+
+
+@router.get("/consumers", response_model=HttpListResponse[Supplier], dependencies=[Depends(etag("suppliers"))])
+async def list_customers(response: Response, page: Optional[str] = Query(None), filter: Optional[str] = Query(None),
+                         after: Optional[int] = Query(None), before: Optional[int] = Query(None),
+                         count: CountMode = Query("exact"),
+                         _=Depends(check_authorization)):
+    offset: int = 1
+    limit: int = -1
+    try:
+        page_num, limit = map(int, page.split("-"))
+        offset = page_num * limit
+    except Exception:
+        pass
+    try:
+        body = await sql_list_customers(offset, limit, filter, after, before, count, as_json=True)
+        return json_response(body, response)
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching suppliers: {str(e)}")
+
+
+@router.get("/providers", response_model=HttpListResponse[Supplier], dependencies=[Depends(etag("suppliers"))])
+async def list_providers(response: Response, page: Optional[str] = Query(None), filter: Optional[str] = Query(None),
+                         after: Optional[int] = Query(None), before: Optional[int] = Query(None),
+                         count: CountMode = Query("exact"),
+                         _=Depends(check_authorization)):
+    offset: int = 1
+    limit: int = -1
+    try:
+        page_num, limit = map(int, page.split("-"))
+        offset = page_num * limit
+    except Exception:
+        pass
+    try:
+        body = await sql_list_providers(offset, limit, filter, after, before, count, as_json=True)
+        return json_response(body, response)
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching suppliers: {str(e)}")
+
+
+@router.get("/export")
+async def export_suppliers(format: ExportFormat = Query("ndjson"), filter: Optional[str] = Query(None),
+                           type: Optional[Literal["provider", "consumer"]] = Query(None),
+                           _=Depends(check_authorization)):
+    """Stream every supplier matching the filter (and type) as NDJSON or CSV"""
+    return export_response(sql_export_suppliers(filter, type), Supplier, format, "suppliers")
+
+
+@router.get("/{id}", response_model=Supplier, dependencies=[Depends(etag("suppliers"))])
+async def get_supplier(id: int, _=Depends(check_authorization)):
+    try:
+        supplier = await sql_get_supplier(id)
+        if not supplier:
+            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"Supplier with ID {id} not found")
+        return supplier
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching supplier: {str(e)}")
+
+
+@router.post("", response_model=int)
+async def create_supplier(supplier: Supplier, _=Depends(check_authorization)):
+    try:
+        return await sql_add_supplier(supplier)
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error adding supplier: {str(e)}")
+
+
+@router.post("/bulk", response_model=HttpBulkResponse)
+async def create_suppliers_bulk(request: Request, _=Depends(check_authorization)):
+    """Insert or update many suppliers from a JSON array or an NDJSON stream (application/x-ndjson)"""
+    return await bulk_write(request, Supplier, sql_upsert_suppliers)
+
+
+@router.post("/fetch", response_model=HttpListResponse[Supplier])
+async def fetch_suppliers(ids: list[int] = Body(...), _=Depends(check_authorization)):
+    """Fetch the suppliers of a JSON array of IDs too long for ?ids=, in that order"""
+    suppliers = await sql_fetch_suppliers(check_ids(ids))
+    return HttpListResponse[Supplier](total=len(suppliers), body=suppliers)
+
+
+@router.put("", response_model=int)
+async def update_supplier(supplier: Supplier, _=Depends(check_authorization)):
+    try:
+        return await sql_update_supplier(supplier)
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error adding supplier: {str(e)}")
+
+
+@router.delete("/{id}")
+async def delete_supplier(id: int, _=Depends(check_authorization)):
+    try:
+        if not await sql_delete_supplier(id):
+            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"Supplier with ID {id} not found")
+        return
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error deleting supplier: {str(e)}")
@@ -1,106 +1,198 @@
-from typing import Optional
-
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.params import Query
-from starlette.status import HTTP_404_NOT_FOUND, HTTP_500_INTERNAL_SERVER_ERROR
-
-from entities import Transaction, HttpListResponse
-from http_server.authorization import check_authorization  # <-- your JWT verification function
-from database import list_transactions as sql_list_transactions, \
-    list_income_transactions as sql_list_incomes_transactions, \
-    list_outcome_transactions as sql_list_outcomes_transactions, get_transaction as sql_get_transaction, \
-    add_transaction as sql_add_transaction, update_transaction as sql_update_transaction, \
-    delete_transaction as sql_delete_transaction
-
-# -----------------------------
-# Router definition
-# -----------------------------
-router = APIRouter()
-
-
-# FastAPI will call the Depends and Verify the JWT. Then Raise an HTTP 401 if invalid. Return the decoded token payload if valid. FastAPI assigns the returned value to payload. Then the route list_users(payload=payload) executes.
-@router.get("", response_model=HttpListResponse[Transaction])
-def list_transactions(page: Optional[str] = Query(None), filter: Optional[str] = Query(None),
-                      _=Depends(check_authorization)):
-    offset: int = 1
-    limit: int = -1
-    try:
-        page_num, limit = map(int, page.split("-"))
-        offset = page_num * limit
-    except Exception:
-        pass
-    try:
-        return sql_list_transactions(offset, limit, filter)
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching transactions: {str(e)}")
-
-
-@router.get("/incomes", response_model=HttpListResponse[Transaction])
-def list_incomes_transactions(page: Optional[str] = Query(None), filter: Optional[str] = Query(None),
-                              _=Depends(check_authorization)):
-    offset: int = 1
-    limit: int = -1
-    try:
-        page_num, limit = map(int, page.split("-"))
-        offset = page_num * limit
-    except Exception:
-        pass  # do nothing if parsing fails
-    try:
-        return sql_list_incomes_transactions(offset, limit, filter)
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching transactions: {str(e)}")
-
-
-@router.get("/outcomes", response_model=HttpListResponse[Transaction])
-def list_outcomes_transactions(page: Optional[str] = Query(None), filter: Optional[str] = Query(None),
-                               _=Depends(check_authorization)):
-    offset: int = 1
-    limit: int = -1
-    try:
-        page_num, limit = map(int, page.split("-"))
-        offset = page_num * limit
-    except Exception:
-        pass
-    try:
-        return sql_list_outcomes_transactions(offset, limit, filter)
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching transactions: {str(e)}")
-
-
-@router.get("/{id}", response_model=Transaction)
-def get_transaction(id: int, _=Depends(check_authorization)):
-    try:
-        transaction = sql_get_transaction(id)
-        if not transaction:
-            raise HTTPException(status_code=HTTP_404_NOT_FOUND,
-                                detail=f"Transaction with ID {id} not found")
-        return transaction
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching transaction: {str(e)}")
-
-
-@router.post("", response_model=int)
-def create_transaction(transaction: Transaction, _=Depends(check_authorization)):
-    try:
-        return sql_add_transaction(transaction)
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error adding transaction: {str(e)}")
-
-
-@router.put("", response_model=int)
-def update_transaction(transaction: Transaction, _=Depends(check_authorization)):
-    try:
-        return sql_update_transaction(transaction)
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error adding transaction: {str(e)}")
-
-
-@router.delete("/{id}")
-def delete_transaction(id: int, _=Depends(check_authorization)):
-    try:
-        if not sql_delete_transaction(id):
-            raise HTTPException(status_code=HTTP_404_NOT_FOUND,
-                                detail=f"Transaction with ID {id} not found")
-        return
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error deleting transaction: {str(e)}")
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Body, HTTPException, Depends, Request, Response
+from fastapi.params import Query
+from starlette.status import HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND, HTTP_409_CONFLICT, \
+    HTTP_500_INTERNAL_SERVER_ERROR
+
+from entities import Transaction, ExpandedTransaction, HttpListResponse, HttpBulkResponse, TransactionSummary
+from http_server.authorization import check_authorization  # <-- your JWT verification function
+from http_server.batch import check_ids, parse_ids
+from http_server.bulk import bulk_write
+from http_server.etag import etag
+from http_server.expand import parse_expand
+from http_server.responses import json_response, model_response
+from http_server.export import export_response, ExportFormat
+from database import CountMode, TRANSACTION_RELATIONS
+from database.aio import list_transactions as sql_list_transactions, \
+    list_income_transactions as sql_list_incomes_transactions, \
+    list_outcome_transactions as sql_list_outcomes_transactions, get_transaction as sql_get_transaction, \
+    add_transaction as sql_add_transaction, update_transaction as sql_update_transaction, \
+    delete_transaction as sql_delete_transaction, \
+    upsert_transactions as sql_upsert_transactions, \
+    export_transactions as sql_export_transactions, summarize_transactions as sql_summarize_transactions, \
+    get_transactions as sql_fetch_transactions, check_transactions_range as sql_check_transactions_range, \
+    is_archived_transaction as sql_is_archived_transaction
+
+# -----------------------------
+# Router definition
+# -----------------------------
+router = APIRouter()
+
+
+# FastAPI will call the Depends and Verify the JWT. Then Raise an HTTP 401 if invalid. Return the decoded token payload if valid. FastAPI assigns the returned value to payload. Then the route list_users(payload=payload) executes.
+@router.get("", response_model=HttpListResponse[ExpandedTransaction],
+            dependencies=[Depends(etag("transactions", relations=TRANSACTION_RELATIONS))])
+async def list_transactions(response: Response, page: Optional[str] = Query(None), filter: Optional[str] = Query(None),
+                            after: Optional[int] = Query(None), before: Optional[int] = Query(None),
+                            count: CountMode = Query("exact"), ids: Optional[str] = Query(None),
+                            expand: Optional[str] = Query(None), date_from: Optional[datetime] = Query(None),
+                            date_to: Optional[datetime] = Query(None), _=Depends(check_authorization)):
+    if ids is not None:  # ?ids=1,2,3: those transactions only, in that order, page and filter are ignored
+        transactions = await sql_fetch_transactions(parse_ids(ids))
+        return model_response(HttpListResponse[Transaction](total=len(transactions), body=transactions), response)
+    relations = parse_expand(expand, TRANSACTION_RELATIONS)
+    offset: int = 1
+    limit: int = -1
+    try:
+        page_num, limit = map(int, page.split("-"))
+        offset = page_num * limit
+    except Exception:
+        pass
+    try:
+        body = await sql_list_transactions(offset, limit, filter, after, before, count, as_json=True, expand=relations,
+                                           date_from=date_from, date_to=date_to)
+        return json_response(body, response)
+    except ValueError as e:  # the date range covers more archived years than can be read at once
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching transactions: {str(e)}")
+
+
+@router.get("/incomes", response_model=HttpListResponse[ExpandedTransaction],
+            dependencies=[Depends(etag("transactions", relations=TRANSACTION_RELATIONS))])
+async def list_incomes_transactions(response: Response, page: Optional[str] = Query(None),
+                                    filter: Optional[str] = Query(None),
+                                    after: Optional[int] = Query(None), before: Optional[int] = Query(None),
+                                    count: CountMode = Query("exact"), expand: Optional[str] = Query(None),
+                                    date_from: Optional[datetime] = Query(None),
+                                    date_to: Optional[datetime] = Query(None),
+                                    _=Depends(check_authorization)):
+    relations = parse_expand(expand, TRANSACTION_RELATIONS)
+    offset: int = 1
+    limit: int = -1
+    try:
+        page_num, limit = map(int, page.split("-"))
+        offset = page_num * limit
+    except Exception:
+        pass  # do nothing if parsing fails
+    try:
+        body = await sql_list_incomes_transactions(offset, limit, filter, after, before, count, as_json=True,
+                                                   expand=relations, date_from=date_from, date_to=date_to)
+        return json_response(body, response)
+    except ValueError as e:  # the date range covers more archived years than can be read at once
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching transactions: {str(e)}")
+
+
+@router.get("/outcomes", response_model=HttpListResponse[ExpandedTransaction],
+            dependencies=[Depends(etag("transactions", relations=TRANSACTION_RELATIONS))])
+async def list_outcomes_transactions(response: Response, page: Optional[str] = Query(None),
+                                     filter: Optional[str] = Query(None),
+                                     after: Optional[int] = Query(None), before: Optional[int] = Query(None),
+                                     count: CountMode = Query("exact"), expand: Optional[str] = Query(None),
+                                     date_from: Optional[datetime] = Query(None),
+                                     date_to: Optional[datetime] = Query(None),
+                                     _=Depends(check_authorization)):
+    relations = parse_expand(expand, TRANSACTION_RELATIONS)
+    offset: int = 1
+    limit: int = -1
+    try:
+        page_num, limit = map(int, page.split("-"))
+        offset = page_num * limit
+    except Exception:
+        pass
+    try:
+        body = await sql_list_outcomes_transactions(offset, limit, filter, after, before, count, as_json=True,
+                                                    expand=relations, date_from=date_from, date_to=date_to)
+        return json_response(body, response)
+    except ValueError as e:  # the date range covers more archived years than can be read at once
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching transactions: {str(e)}")
+
+
+@router.get("/export")
+async def export_transactions(format: ExportFormat = Query("ndjson"), filter: Optional[str] = Query(None),
+                              type: Optional[Literal["income", "outcome"]] = Query(None),
+                              date_from: Optional[datetime] = Query(None), date_to: Optional[datetime] = Query(None),
+                              _=Depends(check_authorization)):
+    """Stream every transaction matching the filter (and type, and date range) as NDJSON or CSV"""
+    tx_type = {"income": 1, "outcome": -1}.get(type)
+    try:
+        await sql_check_transactions_range(date_from, date_to)  # before the response starts streaming
+    except ValueError as e:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
+    return export_response(sql_export_transactions(filter, tx_type, date_from, date_to), Transaction, format,
+                           "transactions")
+
+
+@router.get("/summary", response_model=list[TransactionSummary], dependencies=[Depends(etag("transactions"))])
+async def summarize_transactions(group_by: Literal["day", "week", "month", "supplier", "product"] = Query("month"),
+                                 date_from: Optional[datetime] = Query(None),
+                                 date_to: Optional[datetime] = Query(None),
+                                 type: Optional[Literal["income", "outcome"]] = Query(None),
+                                 _=Depends(check_authorization)):
+    """Revenue, cost, net, tax and discount totals grouped by day/week/month, supplier or product"""
+    try:
+        return await sql_summarize_transactions(group_by, date_from, date_to, {"income": 1, "outcome": -1}.get(type))
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error summarizing transactions: {str(e)}")
+
+
+@router.get("/{id}", response_model=Transaction, dependencies=[Depends(etag("transactions"))])
+async def get_transaction(id: int, _=Depends(check_authorization)):
+    try:
+        transaction = await sql_get_transaction(id)
+        if not transaction:
+            raise HTTPException(status_code=HTTP_404_NOT_FOUND,
+                                detail=f"Transaction with ID {id} not found")
+        return transaction
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching transaction: {str(e)}")
+
+
+@router.post("", response_model=int)
+async def create_transaction(transaction: Transaction, _=Depends(check_authorization)):
+    try:
+        return await sql_add_transaction(transaction)
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error adding transaction: {str(e)}")
+
+
+@router.post("/bulk", response_model=HttpBulkResponse)
+async def create_transactions_bulk(request: Request, _=Depends(check_authorization)):
+    """Insert or update many transactions from a JSON array or an NDJSON stream (application/x-ndjson)"""
+    return await bulk_write(request, Transaction, sql_upsert_transactions)
+
+
+@router.post("/fetch", response_model=HttpListResponse[Transaction])
+async def fetch_transactions(ids: list[int] = Body(...), _=Depends(check_authorization)):
+    """Fetch the transactions of a JSON array of IDs too long for ?ids=, in that order"""
+    transactions = await sql_fetch_transactions(check_ids(ids))
+    return HttpListResponse[Transaction](total=len(transactions), body=transactions)
+
+
+@router.put("", response_model=int)
+async def update_transaction(transaction: Transaction, _=Depends(check_authorization)):
+    try:
+        updated = await sql_update_transaction(transaction)
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error adding transaction: {str(e)}")
+    if not updated and await sql_is_archived_transaction(transaction.id):  # a closed year, read-only
+        raise HTTPException(status_code=HTTP_409_CONFLICT, detail=f"Transaction with ID {transaction.id} is archived")
+    return updated
+
+
+@router.delete("/{id}")
+async def delete_transaction(id: int, _=Depends(check_authorization)):
+    try:
+        removed = await sql_delete_transaction(id)
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error deleting transaction: {str(e)}")
+    if not removed:
+        if await sql_is_archived_transaction(id):  # a closed year, read-only
+            raise HTTPException(status_code=HTTP_409_CONFLICT, detail=f"Transaction with ID {id} is archived")
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"Transaction with ID {id} not found")
@@ -1,74 +1,110 @@
-# http_user_handler.py
-import logging
-from typing import Optional
-
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.params import Query
-from starlette.status import HTTP_404_NOT_FOUND, HTTP_500_INTERNAL_SERVER_ERROR
-
-from entities import User, HttpListResponse
-from http_server.authorization import check_authorization  # <-- your JWT verification function
-from database import list_users as sql_list_users, get_user as sql_get_user, add_user as sql_add_user, \
-    update_user as sql_update_user, \
-    delete_user as sql_delete_user
-
-# -----------------------------
-# Router definition
-# -----------------------------
-router = APIRouter()
-
-logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
-
-# FastAPI will call the Depends and Verify the JWT. Then Raise an HTTP 401 if invalid. Return the decoded token payload if valid. FastAPI assigns the returned value to payload. Then the route list_users(payload=payload) executes.
-@router.get("", response_model=HttpListResponse[User])
-def list_users(page: Optional[str] = Query(None), filter: Optional[str] = Query(None),_=Depends(check_authorization)):
-    offset: int = 1
-    limit: int  = -1
-    try:
-        page, limit = map(int, page.split("-"))
-        offset = page * limit
-    except Exception:
-        None
-    try:
-        return sql_list_users(offset, limit, filter) # make_list_response(users)
-    except Exception as e:
-        logger.exception("Error fetching users")
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching users: {str(e)}")
-
-
-@router.get("/{id}", response_model=User)
-def get_user(id: int, _=Depends(check_authorization)):
-    try:
-        user = sql_get_user(id)
-        if not user:
-            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"User with ID {id} not found")
-        return user
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching user: {str(e)}")
-
-
-@router.post("", response_model=int)
-def create_user(user: User, _=Depends(check_authorization)):
-    try:
-        return sql_add_user(user)
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error adding user: {str(e)}")
-
-
-@router.put("", response_model=int)
-def update_user(user: User, _=Depends(check_authorization)):
-    try:
-        return sql_update_user(user)
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error adding user: {str(e)}")
-
-
-@router.delete("/{id}")
-def delete_user(id: int, _=Depends(check_authorization)):
-    try:
-        if not sql_delete_user(id):
-            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"User with ID {id} not found")
-        return
-    except Exception as e:
-        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error deleting user: {str(e)}")
+# http_user_handler.py
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, Body, HTTPException, Depends, Request, Response
+from fastapi.params import Query
+from starlette.status import HTTP_404_NOT_FOUND, HTTP_500_INTERNAL_SERVER_ERROR
+
+from entities import User, HttpListResponse, HttpBulkResponse
+from http_server.authorization import check_authorization  # <-- your JWT verification function
+from http_server.batch import check_ids, parse_ids
+from http_server.bulk import bulk_write
+from http_server.etag import etag
+from http_server.responses import json_response
+from http_server.export import export_response, ExportFormat
+from database import CountMode
+from database.aio import list_users as sql_list_users, get_user as sql_get_user, add_user as sql_add_user, \
+    update_user as sql_update_user, \
+    delete_user as sql_delete_user, \
+    upsert_users as sql_upsert_users, \
+    export_users as sql_export_users, \
+    get_users as sql_fetch_users
+
+# -----------------------------
+# Router definition
+# -----------------------------
+router = APIRouter()
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+# FastAPI will call the Depends and Verify the JWT. Then Raise an HTTP 401 if invalid. Return the decoded token payload if valid. FastAPI assigns the returned value to payload. Then the route list_users(payload=payload) executes.
+@router.get("", response_model=HttpListResponse[User], dependencies=[Depends(etag("users"))])
+async def list_users(response: Response, page: Optional[str] = Query(None), filter: Optional[str] = Query(None),
+                     after: Optional[int] = Query(None), before: Optional[int] = Query(None),
+                     count: CountMode = Query("exact"), ids: Optional[str] = Query(None),
+                     _=Depends(check_authorization)):
+    if ids is not None:  # ?ids=1,2,3: those users only, in that order, page and filter are ignored
+        users = await sql_fetch_users(parse_ids(ids))
+        return HttpListResponse[User](total=len(users), body=users)
+    offset: int = 1
+    limit: int  = -1
+    try:
+        page, limit = map(int, page.split("-"))
+        offset = page * limit
+    except Exception:
+        None
+    try:
+        body = await sql_list_users(offset, limit, filter, after, before, count, as_json=True)
+        return json_response(body, response) # make_list_response(users)
+    except Exception as e:
+        logger.exception("Error fetching users")
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching users: {str(e)}")
+
+
+@router.get("/export")
+async def export_users(format: ExportFormat = Query("ndjson"), filter: Optional[str] = Query(None),
+                       _=Depends(check_authorization)):
+    """Stream every user matching the filter as NDJSON or CSV"""
+    return export_response(sql_export_users(filter), User, format, "users")
+
+
+@router.get("/{id}", response_model=User, dependencies=[Depends(etag("users"))])
+async def get_user(id: int, _=Depends(check_authorization)):
+    try:
+        user = await sql_get_user(id)
+        if not user:
+            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"User with ID {id} not found")
+        return user
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error fetching user: {str(e)}")
+
+
+@router.post("", response_model=int)
+async def create_user(user: User, _=Depends(check_authorization)):
+    try:
+        return await sql_add_user(user)
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error adding user: {str(e)}")
+
+
+@router.post("/bulk", response_model=HttpBulkResponse)
+async def create_users_bulk(request: Request, _=Depends(check_authorization)):
+    """Insert or update many users from a JSON array or an NDJSON stream (application/x-ndjson)"""
+    return await bulk_write(request, User, sql_upsert_users)
+
+
+@router.post("/fetch", response_model=HttpListResponse[User])
+async def fetch_users(ids: list[int] = Body(...), _=Depends(check_authorization)):
+    """Fetch the users of a JSON array of IDs too long for ?ids=, in that order"""
+    users = await sql_fetch_users(check_ids(ids))
+    return HttpListResponse[User](total=len(users), body=users)
+
+
+@router.put("", response_model=int)
+async def update_user(user: User, _=Depends(check_authorization)):
+    try:
+        return await sql_update_user(user)
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error adding user: {str(e)}")
+
+
+@router.delete("/{id}")
+async def delete_user(id: int, _=Depends(check_authorization)):
+    try:
+        if not await sql_delete_user(id):
+            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"User with ID {id} not found")
+        return
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error deleting user: {str(e)}")
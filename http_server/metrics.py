@@ -0,0 +1,56 @@
+# metrics.py
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from database.metrics import Counter, Gauge, Histogram
+
+request_seconds = Histogram("erp_http_request_seconds", "Time to serve a request, until its last body byte is sent.",
+                            ("method", "handler"))
+requests_total = Counter("erp_http_requests_total", "Requests served.", ("method", "handler", "status"))
+requests_in_flight = Gauge("erp_http_requests_in_flight", "Requests being served.")
+startup_seconds = Gauge("erp_startup_seconds", "Time spent in each startup phase of this process (see main.py).",
+                        ("phase",))
+
+
+def _handler(scope: Scope) -> str:
+    """
+    Name of the route handler that served the request ("get_product"): one label per route
+    whatever the ids in the path. "other" for the frontend files and unknown paths.
+    """
+    endpoint = scope.get("endpoint")
+    return getattr(endpoint, "__name__", "other")
+
+
+class MetricsMiddleware:
+    """
+    Time every HTTP request per method and route handler, count responses per status and keep
+    the number of requests in flight. Plain ASGI rather than BaseHTTPMiddleware: nothing is
+    buffered, and streamed exports are timed until their last chunk.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500  # unless the app starts a response
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        requests_in_flight.add(1)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            requests_in_flight.add(-1)
+            handler = _handler(scope)
+            request_seconds.observe(time.perf_counter() - started, scope["method"], handler)
+            requests_total.inc(scope["method"], handler, str(status))
@@ -0,0 +1,22 @@
+# responses.py
+from fastapi import Response
+from pydantic import BaseModel
+
+
+def json_response(body: bytes, response: Response) -> Response:
+    """
+    Send an already encoded JSON body (a list page from the database as_json fast path).
+    Returning a Response skips FastAPI's response_model validation and serialization;
+    `response` is the route's injected Response, whose headers (the ETag) are carried over.
+    """
+    headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def model_response(model: BaseModel, response: Response) -> Response:
+    """
+    Send a model built by the handler through json_response, encoded as itself rather than as the
+    route's response_model: a HttpListResponse[Product] under a HttpListResponse[ExpandedProduct]
+    route comes out without the null relations an expanded item would add.
+    """
+    return json_response(model.model_dump_json().encode("utf-8"), response)
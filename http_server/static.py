@@ -0,0 +1,136 @@
+# static.py
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+import time
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from http_server.compression import brotli, negotiate
+
+# Text files of the frontend build worth shipping compressed (images and fonts already are)
+COMPRESSIBLE_EXTENSIONS = {".js", ".mjs", ".css", ".html", ".svg", ".json", ".map", ".txt", ".xml", ".ico", ".wasm",
+                           ".webmanifest"}
+MINIMUM_SIZE = 1024
+
+# Encoding -> suffix of the precompressed variant of a file, best first
+VARIANTS = {"br": ".br", "gzip": ".gz"}
+
+# Bundles with a content hash in their name ("main-5J2QXUE4.js", "main.3f2a1b9c8d7e6f5a.js") never
+# change under that name: browsers keep them for a year without asking again. Anything else
+# (index.html first of all) is revalidated on every load with its ETag / Last-Modified.
+HASHED_NAME = re.compile(r"[.-]([A-Z0-9]{8}|[a-f0-9]{16,32})\.[a-z0-9]+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+def _write_atomic(path: str, data: bytes):
+    """Write through a temporary file and rename it, so a concurrent reader (or worker) never sees half a file."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o644)  # mkstemp creates it private
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles for the Angular build that sends .br / .gz variants of the text assets.
+
+    On start, every compressible file of `directory` gets its variants: an up to date foo.js.br /
+    foo.js.gz next to it is used as it is (the build may produce them), otherwise it is compressed
+    once, next to the file or, if the directory is read-only (installed or bundled app), under a
+    cache directory in the system temp folder. Brotli variants are only built when the brotli
+    module is installed, gzip always. Each request gets the best variant its Accept-Encoding allows.
+
+    Hashed bundle names are served with an immutable Cache-Control, the other files with no-cache.
+    """
+
+    def __init__(self, *, directory: str, html: bool = False, cache_dir: str | None = None):
+        super().__init__(directory=directory, html=html)
+        self.cache_dir = cache_dir or os.path.join(
+            tempfile.gettempdir(), "erp-static", hashlib.sha1(os.path.abspath(directory).encode()).hexdigest()[:12])
+        # absolute path of a file -> {encoding: path of its compressed variant}
+        self.variants: dict[str, dict[str, str]] = {}
+        self.prepare_time = 0.0
+        self._prepare()
+
+    def _variant_path(self, path: str, rel_path: str, encoding: str) -> str | None:
+        """Path of an up to date variant of `path`, compressing it if needed. None if it can't be built."""
+        suffix = VARIANTS[encoding]
+        mtime = os.stat(path).st_mtime
+        for candidate in (path + suffix, os.path.join(self.cache_dir, rel_path + suffix)):
+            if os.path.isfile(candidate) and os.stat(candidate).st_mtime >= mtime:
+                return candidate
+        if encoding == "br" and brotli is None:
+            return None
+
+        with open(path, "rb") as f:
+            data = _compress(f.read(), encoding)
+        try:
+            _write_atomic(path + suffix, data)
+            return path + suffix
+        except OSError:
+            cached = os.path.join(self.cache_dir, rel_path + suffix)
+            os.makedirs(os.path.dirname(cached), exist_ok=True)
+            _write_atomic(cached, data)
+            return cached
+
+    def _prepare(self):
+        started = time.perf_counter()
+        root = os.path.abspath(self.directory)
+        for folder, _, files in os.walk(root):
+            for name in files:
+                path = os.path.join(folder, name)
+                if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+                    continue
+                if os.path.getsize(path) < MINIMUM_SIZE:
+                    continue
+                rel_path = os.path.relpath(path, root)
+                variants = {}
+                for encoding in VARIANTS:
+                    variant = self._variant_path(path, rel_path, encoding)
+                    if variant is not None:
+                        variants[encoding] = variant
+                self.variants[os.path.normcase(os.path.abspath(path))] = variants
+        self.prepare_time = time.perf_counter() - started
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        headers = {"Cache-Control": IMMUTABLE if HASHED_NAME.search(os.path.basename(full_path)) else REVALIDATE}
+
+        variants = self.variants.get(os.path.normcase(os.path.abspath(full_path)), {})
+        if variants:
+            headers["Vary"] = "Accept-Encoding"
+        encoding = negotiate(request_headers.get("accept-encoding", ""), tuple(variants))
+        try:
+            variant_stat = os.stat(variants[encoding]) if encoding else None
+        except OSError:  # removed since the start, send the original
+            variant_stat = None
+        if variant_stat is None:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
+        else:
+            headers["Content-Encoding"] = encoding
+            # the media type of the original: foo.js.br is still JavaScript
+            response = FileResponse(variants[encoding], status_code=status_code, stat_result=variant_stat,
+                                    headers=headers, media_type=mimetypes.guess_type(str(full_path))[0] or "text/plain")
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
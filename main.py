@@ -1,39 +1,127 @@
-import threading
-import webbrowser
-
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from database import init_db
-from http_server.http import api_router  # your router
-import uvicorn
-from fastapi.staticfiles import StaticFiles
-app = FastAPI(title="ERP Backend")
-
-# Enable CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Register router
-app.include_router(api_router)
-
-# Mount Angular dist folder as frontend
-app.mount("/", StaticFiles(directory="erp-frontend/browser", html=True), name="frontend")
-
-def start_server():
-    init_db()
-    uvicorn.run(app, host="127.0.0.1", port=8787)
-
-if __name__ == "__main__":
-    # Open browser after short delay
-    threading.Timer(1.5, lambda: webbrowser.open("http://127.0.0.1:8787")).start()
-    start_server()
-
-# if __name__ == "__main__":
-#     # Mount Angular dist
-#     init_db()
-#     uvicorn.run("main:app", host="127.0.0.1", port=8787, reload=True)
+import time
+
+_started = time.perf_counter()
+
+import argparse  # noqa: E402
+import multiprocessing  # noqa: E402
+import os  # noqa: E402
+import threading  # noqa: E402
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
+from database import init_db, close_connections, shutdown_hash_pool, shutdown_executor  # noqa: E402
+from http_server.http import api_router  # noqa: E402
+from http_server.metrics import MetricsMiddleware, startup_seconds  # noqa: E402
+from http_server.compression import CompressionMiddleware  # noqa: E402
+from http_server.static import PrecompressedStaticFiles  # noqa: E402
+
+# Seconds spent in each phase of the start of this process, printed once the server is up and
+# exported as erp_startup_seconds. uvicorn and webbrowser are only imported when they are used.
+startup_phases: dict[str, float] = {"imports": time.perf_counter() - _started}
+_phase_started = time.perf_counter()
+
+app = FastAPI(title="ERP Backend")
+
+# Enable CORS
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# brotli / gzip for JSON pages, exports and metrics (the frontend files are precompressed)
+app.add_middleware(CompressionMiddleware)
+
+# Latency histograms, status counters and in-flight gauge for GET /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Register router
+app.include_router(api_router)
+
+
+@app.on_event("startup")
+def report_startup():
+    startup_phases["server"] = time.perf_counter() - _phase_started
+    for phase, seconds in startup_phases.items():
+        startup_seconds.add(seconds, phase)
+    print(f"Started in {time.perf_counter() - _started:.3f} s ("
+          + ", ".join(f"{phase} {seconds:.3f}" for phase, seconds in startup_phases.items()) + ")")
+
+
+@app.on_event("shutdown")
+def shutdown():
+    shutdown_executor()
+    close_connections()
+    shutdown_hash_pool()
+
+
+startup_phases["app"] = time.perf_counter() - _phase_started
+_phase_started = time.perf_counter()
+
+# Mount Angular dist folder as frontend, .br/.gz variants built on start, hashed bundles cached for good
+app.mount("/", PrecompressedStaticFiles(directory="erp-frontend/browser", html=True), name="frontend")
+
+startup_phases["static"] = time.perf_counter() - _phase_started
+_phase_started = time.perf_counter()
+
+
+def open_browser(port: int):
+    """Open the frontend as soon as the server accepts connections rather than after a fixed delay."""
+    import socket
+    import webbrowser
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    webbrowser.open(f"http://127.0.0.1:{port}")
+
+
+def start_server(host: str = "127.0.0.1", port: int = 8787, workers: int = 1):
+    global _phase_started
+    import uvicorn
+
+    # Schema and migrations once, before any worker starts
+    init_db()
+    startup_phases["init_db"] = time.perf_counter() - _phase_started
+    _phase_started = time.perf_counter()
+    if workers <= 1:
+        uvicorn.run(app, host=host, port=port)
+        return
+    # Each worker is a new process importing main:app, with its own connections, database
+    # workers and caches. Writes are coordinated by SQLite (see database/sql.py).
+    close_connections()
+    # Split the password hashing processes between the workers instead of starting them all in each
+    os.environ.setdefault("ERP_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2 // workers)))
+    uvicorn.run("main:app", host=host, port=port, workers=workers)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Start the ERP backend and frontend server.")
+    parser.add_argument("--host", default=os.getenv("ERP_HOST", "127.0.0.1"),
+                        help="address to listen on (ERP_HOST, default 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=int(os.getenv("ERP_PORT", "8787")),
+                        help="port to listen on (ERP_PORT, default 8787)")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("ERP_WORKERS", "1")),
+                        help="server processes (ERP_WORKERS, default 1), e.g. one per core in production")
+    parser.add_argument("--no-browser", action="store_true", default=os.getenv("ERP_NO_BROWSER", "0") != "0",
+                        help="don't open the frontend in a browser (ERP_NO_BROWSER=1)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()  # password hashing and server workers in the PyInstaller build
+    args = parse_args()
+    if not args.no_browser:
+        threading.Thread(target=open_browser, args=(args.port,), daemon=True).start()
+    start_server(args.host, args.port, args.workers)
+
+# if __name__ == "__main__":
+#     # Mount Angular dist
+#     init_db()
+#     uvicorn.run("main:app", host="127.0.0.1", port=8787, reload=True)
@@ -0,0 +1,2 @@
+# tests/__init__.py
+# Run with: python -m unittest discover tests
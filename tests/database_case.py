@@ -0,0 +1,25 @@
+# database_case.py
+import os
+import shutil
+import tempfile
+import unittest
+
+import database
+from database import sql
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """A test case on a fresh database in a temporary folder, never on erp.db."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.folder = tempfile.mkdtemp(prefix="erp-test-")
+        cls.previous_file = sql._db_file
+        database.get_connection(os.path.join(cls.folder, "erp.db"))
+        database.init_db()
+
+    @classmethod
+    def tearDownClass(cls):
+        database.close_connections()
+        sql._db_file = cls.previous_file
+        shutil.rmtree(cls.folder, ignore_errors=True)
@@ -0,0 +1,67 @@
+# test_archive.py
+from datetime import datetime
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import database
+from entities import Center, Product, Stock, Supplier, Transaction
+from http_server.http import api_router
+from tests.database_case import DatabaseTestCase
+
+
+class ArchivedWriteTest(DatabaseTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        app = FastAPI()
+        app.include_router(api_router)
+        cls.client = TestClient(app)
+        token = cls.client.post("/login", json={"username": "Manager", "password": "123456789"}).json()["token"]
+        cls.client.headers["Authorization"] = token
+        center_id = database.add_center(Center(name="Central", city="Oran", address="x"))
+        stock_id = database.add_stock(Stock(name="Main", city="Oran", address="x", center_id=center_id))
+        supplier_id = database.add_supplier(Supplier(firstname="Ann", lastname="Lee", type="both",
+                                                     contract_date=datetime(2020, 1, 1)))
+        cls.product_id = database.add_product(Product(name="Milk", stock_id=stock_id, quantity=0,
+                                                      expiration_date=datetime(2027, 1, 1)))
+        cls.sale = Transaction(supplier_id=supplier_id, product_id=cls.product_id, date=datetime(2023, 5, 1),
+                               type=1, price=3, quantity=2)
+        cls.archived_id = database.add_transaction(cls.sale)
+        database.archive_transactions(2024)
+
+    def test_archived_transaction_is_read_only(self):
+        quantity = database.get_product(self.product_id).quantity
+        self.assertEqual(self.client.get(f"/transactions/{self.archived_id}").status_code, 200)
+        edit = self.sale.model_copy(update={"id": self.archived_id, "quantity": 5}).model_dump(mode="json")
+        response = self.client.put("/transactions", json=edit)
+        self.assertEqual(response.status_code, 409)
+        self.assertIn("archived", response.json()["detail"])
+        self.assertEqual(self.client.delete(f"/transactions/{self.archived_id}").status_code, 409)
+        self.assertEqual(database.get_transaction(self.archived_id).quantity, 2)
+        self.assertEqual(database.get_product(self.product_id).quantity, quantity)
+
+    def test_bulk_refuses_archived_transactions(self):
+        quantity = database.get_product(self.product_id).quantity
+        archived = database.get_transaction(self.archived_id).model_dump(mode="json")
+        new = self.sale.model_copy(update={"date": datetime(2025, 6, 1)}).model_dump(mode="json")
+        response = self.client.post("/transactions/bulk", json=[archived, new]).json()
+        self.assertEqual((response["succeeded"], response["failed"]), (1, 1))
+        self.assertEqual(response["results"][0]["id"], None)
+        self.assertIn("archived", response["results"][0]["error"])
+        ids = [t.id for t in database.list_transactions(0, -1, date_from=datetime(2023, 1, 1)).body]
+        self.assertEqual(ids.count(self.archived_id), 1)
+        self.assertEqual(database.get_product(self.product_id).quantity, quantity - 2)  # the new sale only
+        database.delete_transaction(response["results"][1]["id"])
+
+    def test_unknown_transaction(self):
+        edit = self.sale.model_copy(update={"id": 999}).model_dump(mode="json")
+        self.assertEqual(self.client.put("/transactions", json=edit).json(), 0)
+        self.assertEqual(self.client.delete("/transactions/999").status_code, 404)
+
+    def test_live_transaction_is_written(self):
+        live_id = database.add_transaction(self.sale.model_copy(update={"date": datetime(2025, 5, 1)}))
+        edit = self.sale.model_copy(update={"id": live_id, "date": datetime(2025, 5, 1), "quantity": 1})
+        self.assertEqual(self.client.put("/transactions", json=edit.model_dump(mode="json")).json(), 1)
+        self.assertEqual(self.client.delete(f"/transactions/{live_id}").status_code, 200)
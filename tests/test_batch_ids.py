@@ -0,0 +1,41 @@
+# test_batch_ids.py
+from datetime import datetime
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import database
+from entities import Center, Product, Stock, Supplier, Transaction
+from http_server.http import api_router
+from tests.database_case import DatabaseTestCase
+
+
+class IdsListTest(DatabaseTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        app = FastAPI()
+        app.include_router(api_router)
+        cls.client = TestClient(app)
+        token = cls.client.post("/login", json={"username": "Manager", "password": "123456789"}).json()["token"]
+        cls.client.headers["Authorization"] = token
+        center_id = database.add_center(Center(name="Central", city="Oran", address="x"))
+        stock_id = database.add_stock(Stock(name="Main", city="Oran", address="x", center_id=center_id))
+        supplier_id = database.add_supplier(Supplier(firstname="Ann", lastname="Lee", type="both",
+                                                     contract_date=datetime(2024, 1, 1)))
+        product_ids = [database.add_product(Product(name=f"Milk {i}", stock_id=stock_id, quantity=2.5, price=1,
+                                                    expiration_date=datetime(2027, 1, 1))) for i in range(3)]
+        for product_id in product_ids:
+            database.add_transaction(Transaction(supplier_id=supplier_id, product_id=product_id, type=1, price=3,
+                                                 quantity=1, date=datetime(2024, 2, 1, 9, 30)))
+
+    def test_ids_list_items_are_the_list_items(self):
+        for path in ("/products", "/stocks", "/transactions"):
+            with self.subTest(path=path):
+                listed = self.client.get(path).json()["body"]
+                ids = [item["id"] for item in reversed(listed)]
+                response = self.client.get(path, params={"ids": ",".join(map(str, ids))})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), {"total": len(ids), "body": listed[::-1], "next_cursor": None})
+                self.assertIn("ETag", response.headers)
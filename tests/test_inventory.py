@@ -0,0 +1,59 @@
+# test_inventory.py
+from datetime import datetime
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import database
+from entities import Center, Product, Stock, Supplier, Transaction
+from http_server.http import api_router
+from tests.database_case import DatabaseTestCase
+
+
+class LedgerTest(DatabaseTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        app = FastAPI()
+        app.include_router(api_router)
+        cls.client = TestClient(app)
+        token = cls.client.post("/login", json={"username": "Manager", "password": "123456789"}).json()["token"]
+        cls.client.headers["Authorization"] = token
+
+    def setUp(self):
+        center_id = database.add_center(Center(name="Central", city="Oran", address="x"))
+        stock_id = database.add_stock(Stock(name="Main", city="Oran", address="x", center_id=center_id))
+        self.supplier_id = database.add_supplier(Supplier(firstname="Ann", lastname="Lee", type="both",
+                                                          contract_date=datetime(2024, 1, 1)))
+        self.product_id = database.add_product(Product(name="Milk", stock_id=stock_id, quantity=2,
+                                                       expiration_date=datetime(2027, 1, 1)))
+
+    def sale(self, quantity: float) -> Transaction:
+        return Transaction(supplier_id=self.supplier_id, product_id=self.product_id, date=datetime(2024, 2, 1),
+                           type=1, price=3, quantity=quantity)
+
+    def test_transactions_move_the_quantity(self):
+        transaction_id = database.add_transaction(self.sale(1.5))
+        self.assertEqual(database.get_product(self.product_id).quantity, 0.5)
+        database.delete_transaction(transaction_id)
+        self.assertEqual(database.get_product(self.product_id).quantity, 2)
+
+    def test_sale_beyond_the_stock_is_recorded(self):
+        transaction_id = database.add_transaction(self.sale(5))
+        self.assertIsNotNone(database.get_transaction(transaction_id))
+        self.assertEqual(database.get_product(self.product_id).quantity, -3)
+
+    def test_clients_cant_set_a_negative_quantity(self):
+        product = database.get_product(self.product_id).model_dump(mode="json")
+        product["quantity"] = -1
+        self.assertEqual(self.client.post("/products", json=product | {"id": None}).status_code, 422)
+        self.assertEqual(self.client.put("/products", json=product).status_code, 422)
+        self.assertIsNotNone(self.client.post("/products/bulk", json=[product]).json()["results"][0]["error"])
+        self.assertEqual(database.get_product(self.product_id).quantity, 2)
+
+    def test_oversold_product_is_read_back(self):
+        database.add_transaction(self.sale(5))
+        response = self.client.get(f"/products/{self.product_id}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["quantity"], -3)
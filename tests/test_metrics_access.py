@@ -0,0 +1,43 @@
+# test_metrics_access.py
+from unittest import mock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import database
+from entities import User
+from http_server import authorization
+from http_server.http import api_router
+from tests.database_case import DatabaseTestCase
+
+
+class MetricsAccessTest(DatabaseTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.app = FastAPI()
+        cls.app.include_router(api_router)
+
+    def client(self, host: str) -> TestClient:
+        return TestClient(self.app, client=(host, 50000))
+
+    def token(self, username: str) -> str:
+        return self.client("127.0.0.1").post("/login", json={"username": username, "password": "123456789"}).json()["token"]
+
+    def test_local_client_needs_no_token(self):
+        self.assertEqual(self.client("127.0.0.1").get("/metrics").status_code, 200)
+        self.assertEqual(self.client("::1").get("/metrics").status_code, 200)
+
+    def test_remote_client_needs_a_token(self):
+        remote = self.client("203.0.113.7")
+        self.assertEqual(remote.get("/metrics").status_code, 401)
+        with mock.patch.object(authorization, "METRICS_TOKEN", "scrape-secret"):
+            self.assertEqual(remote.get("/metrics", headers={"Authorization": "Bearer scrape-secret"}).status_code, 200)
+            self.assertEqual(remote.get("/metrics", headers={"Authorization": "Bearer guess"}).status_code, 401)
+
+    def test_remote_client_with_an_admin_token(self):
+        remote = self.client("203.0.113.7")
+        database.add_user(User(name="Clerk", username="clerk", password=database.hash_password("123456789"), rank=0))
+        self.assertEqual(remote.get("/metrics", headers={"Authorization": self.token("clerk")}).status_code, 403)
+        self.assertEqual(remote.get("/metrics", headers={"Authorization": self.token("Manager")}).status_code, 200)
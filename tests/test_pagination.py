@@ -0,0 +1,23 @@
+# test_pagination.py
+import database
+from entities import Center
+from tests.database_case import DatabaseTestCase
+
+
+class EstimateTest(DatabaseTestCase):
+
+    def total(self, count: str) -> int:
+        return database.list_centers(0, 1, count=count).total
+
+    def test_estimate_leaves_out_rows_deleted_from_the_ends(self):
+        ids = [database.add_center(Center(name=f"Center {i}", city="Oran", address="x")) for i in range(10)]
+        for center_id in ids[:4] + ids[-1:]:  # the oldest ones, as archiving does, and the newest
+            database.delete_center(center_id)
+        self.assertEqual(self.total("estimate"), 5)
+        database.delete_center(ids[6])  # a gap in the ids: an upper bound
+        self.assertEqual(self.total("estimate"), 5)
+        self.assertEqual(self.total("exact"), 4)
+        self.assertEqual(self.total("estimate"), 4)  # the exact total, once cached
+        for center_id in ids[4:6] + ids[7:9]:
+            database.delete_center(center_id)
+        self.assertEqual(self.total("estimate"), 0)
@@ -0,0 +1,54 @@
+# test_row_cache.py
+from datetime import datetime
+
+import database
+from entities import Center, Product, Stock, Supplier, Transaction
+from tests.database_case import DatabaseTestCase
+
+
+def product_hits() -> int:
+    return database.row_cache_stats().get("products", {}).get("hits", 0)
+
+
+class RowCacheTest(DatabaseTestCase):
+
+    def setUp(self):
+        center_id = database.add_center(Center(name="Central", city="Oran", address="x"))
+        stock_id = database.add_stock(Stock(name="Main", city="Oran", address="x", center_id=center_id))
+        self.supplier_id = database.add_supplier(Supplier(firstname="Ann", lastname="Lee", type="both",
+                                                          contract_date=datetime(2024, 1, 1)))
+        self.milk, self.bread = (database.add_product(Product(name=name, stock_id=stock_id, quantity=10,
+                                                              expiration_date=datetime(2027, 1, 1)))
+                                 for name in ("Milk", "Bread"))
+
+    def sale(self, product_id: int, transaction_id: int | None = None) -> Transaction:
+        return Transaction(id=transaction_id, supplier_id=self.supplier_id, product_id=product_id,
+                           date=datetime(2024, 2, 1), type=1, price=3, quantity=1)
+
+    def test_transaction_drops_its_product_only(self):
+        database.get_product(self.milk), database.get_product(self.bread)
+        database.add_transaction(self.sale(self.milk))
+        hits = product_hits()
+        self.assertEqual(database.get_product(self.bread).quantity, 10)
+        self.assertEqual(product_hits(), hits + 1)
+        self.assertEqual(database.get_product(self.milk).quantity, 9)
+        self.assertEqual(product_hits(), hits + 1)
+
+    def test_moved_transaction_drops_both_products(self):
+        transaction_id = database.add_transaction(self.sale(self.milk))
+        database.get_products([self.milk, self.bread])
+        database.update_transaction(self.sale(self.bread, transaction_id))
+        self.assertEqual([p.quantity for p in database.get_products([self.milk, self.bread])], [10, 9])
+
+    def test_added_row_replaces_cached_unknown_id(self):
+        next_id = self.bread + 1
+        self.assertIsNone(database.get_product(next_id))
+        self.assertEqual(database.add_product(Product(name="Eggs", stock_id=1, quantity=1,
+                                                      expiration_date=datetime(2027, 1, 1))), next_id)
+        self.assertEqual(database.get_product(next_id).name, "Eggs")
+
+    def test_bulk_write_drops_the_table(self):
+        database.get_product(self.milk)
+        database.upsert_products([Product(id=self.milk, name="Skimmed milk", stock_id=1, quantity=4,
+                                          expiration_date=datetime(2027, 1, 1))])
+        self.assertEqual(database.get_product(self.milk).name, "Skimmed milk")
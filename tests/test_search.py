@@ -0,0 +1,25 @@
+# test_search.py
+import database
+from entities import User
+from tests.database_case import DatabaseTestCase
+
+
+class UserFilterTest(DatabaseTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for name, rank in (("Clerk Ali", 0), ("Clerk Sam", 0), ("Boss Lee", 2)):
+            database.add_user(User(name=name, username=name.replace(" ", "").lower(), password="not-a-hash", rank=rank))
+
+    def names(self, filter: str) -> list[str]:
+        return [u.name for u in database.list_users(0, -1, filter).body]
+
+    def test_filter_matches_the_rank(self):
+        self.assertEqual(self.names("2"), ["Boss Lee"])
+        self.assertEqual(self.names(" 0 "), ["Clerk Ali", "Clerk Sam"])
+
+    def test_filter_matches_the_name(self):
+        self.assertEqual(self.names("cler"), ["Clerk Ali", "Clerk Sam"])
+        self.assertEqual(self.names("lee"), ["Boss Lee"])
+        self.assertEqual(self.names("zed"), [])
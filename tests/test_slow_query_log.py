@@ -0,0 +1,48 @@
+# test_slow_query_log.py
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+
+from database.slow_queries import _SharedRotatingFileHandler
+
+RECORDS = 200
+MAX_BYTES = 2048
+
+
+def _write(path: str, worker: int):
+    log = logging.getLogger(f"erp.test.{worker}")
+    log.propagate = False
+    log.addHandler(_SharedRotatingFileHandler(path, maxBytes=MAX_BYTES, backupCount=1000, encoding="utf-8", delay=True))
+    for i in range(RECORDS):
+        log.warning(json.dumps({"worker": worker, "i": i, "sql": "SELECT * FROM transactions WHERE id = ?"}))
+
+
+class SharedLogTest(unittest.TestCase):
+
+    def test_workers_rotating_one_log_lose_no_record(self):
+        folder = tempfile.mkdtemp(prefix="erp-test-")
+        try:
+            path = os.path.join(folder, "slow-queries.log")
+            context = multiprocessing.get_context("spawn")
+            workers = [context.Process(target=_write, args=(path, w)) for w in range(4)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            lines = []
+            for name in glob.glob(path + "*"):
+                if not name.endswith(".lock"):
+                    self.assertLessEqual(os.path.getsize(name), MAX_BYTES, name)
+                    with open(name, encoding="utf-8") as f:
+                        lines.extend(f.read().splitlines())
+            records = {(r["worker"], r["i"]) for r in map(json.loads, lines)}
+            self.assertEqual(len(lines), 4 * RECORDS)
+            self.assertEqual(len(records), 4 * RECORDS)
+            self.assertGreater(len(glob.glob(path + ".*")), 2)  # it did rotate
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
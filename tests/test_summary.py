@@ -0,0 +1,36 @@
+# test_summary.py
+from datetime import datetime
+
+import database
+from entities import Center, Product, Stock, Supplier, Transaction
+from tests.database_case import DatabaseTestCase
+
+
+class WeekSummaryTest(DatabaseTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        center_id = database.add_center(Center(name="Central", city="Oran", address="x"))
+        stock_id = database.add_stock(Stock(name="Main", city="Oran", address="x", center_id=center_id))
+        supplier_id = database.add_supplier(Supplier(firstname="Ann", lastname="Lee", type="both",
+                                                     contract_date=datetime(2020, 1, 1)))
+        product_id = database.add_product(Product(name="Milk", stock_id=stock_id, quantity=100,
+                                                  expiration_date=datetime(2027, 1, 1)))
+        for date in (datetime(2024, 12, 30), datetime(2025, 1, 2, 18), datetime(2025, 1, 5, 23, 59),
+                     datetime(2025, 1, 6), datetime(2021, 1, 3)):
+            database.add_transaction(Transaction(supplier_id=supplier_id, product_id=product_id, date=date,
+                                                 type=1, price=1, quantity=1))
+
+    def weeks(self) -> dict:
+        summary = database.summarize_transactions("week", datetime(2020, 1, 1), datetime(2026, 1, 1))
+        return {s.key: s.count for s in summary}
+
+    def test_weeks_are_iso_weeks(self):
+        # Monday 30 December 2024 to Sunday 5 January 2025 is week 1 of 2025; Sunday 3 January 2021
+        # ends week 53 of 2020
+        self.assertEqual(self.weeks(), {"2020-W53": 1, "2025-W01": 3, "2025-W02": 1})
+
+    def test_week_across_an_archived_year(self):
+        database.archive_transactions(2025)  # 30 December 2024 moves to its archive
+        self.assertEqual(self.weeks(), {"2020-W53": 1, "2025-W01": 3, "2025-W02": 1})
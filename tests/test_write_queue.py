@@ -0,0 +1,42 @@
+# test_write_queue.py
+import asyncio
+from unittest import mock
+
+from database import aio, executor, sql, write_queue
+from entities import Center
+from tests.database_case import DatabaseTestCase
+
+
+class AsyncWriteTest(DatabaseTestCase):
+
+    def test_batch_holds_more_writes_than_workers(self):
+        writes = executor.DB_WORKERS * 4
+
+        async def burst():
+            # The writer waits on db_lock while every write gets queued: no worker is held meanwhile,
+            # so the batch after the lock is released is not capped at DB_WORKERS writes
+            sql.db_lock.acquire()
+            try:
+                tasks = [asyncio.create_task(aio.add_center(Center(name=f"c{i}", city="Oran", address="x")))
+                         for i in range(writes)]
+                await asyncio.sleep(0.2)
+            finally:
+                sql.db_lock.release()
+            return await asyncio.gather(*tasks)
+
+        with mock.patch.object(write_queue, "_commit", wraps=write_queue._commit) as commit:
+            ids = asyncio.run(burst())
+        self.assertEqual(len(set(ids)), writes)
+        self.assertGreater(max(len(call.args[0]) for call in commit.call_args_list), executor.DB_WORKERS)
+
+    def test_results_and_errors(self):
+        async def run():
+            center_id = await aio.add_center(Center(name="Central", city="Oran", address="x"))
+            updated = await aio.update_center(Center(id=center_id, name="Renamed", city="Oran", address="x"))
+            deleted = await aio.delete_center(center_id)
+            missing = await aio.delete_center(center_id)
+            with self.assertRaises(ValueError):
+                await aio.update_center(Center(name="No id", city="Oran", address="x"))
+            return updated, deleted, missing
+
+        self.assertEqual(asyncio.run(run()), (1, True, False))